@@ -1,6 +1,38 @@
-"""Agent modules for the blog generation system."""
+"""Agent modules for the blog generation system.
 
-from agents.topic_agent import create_topic_ideation_graph
-from agents.outline_agent import create_outline_generation_graph
+Exports are loaded on first access (PEP 562), so ``import agents`` is cheap and
+LangGraph, LangChain and the LLM client are only imported once a graph or
+parser is actually used.
+"""
+import importlib
 
-__all__ = ["create_topic_ideation_graph", "create_outline_generation_graph"] 
\ No newline at end of file
+# Exported name -> module defining it
+_EXPORTS = {
+    "create_topic_ideation_graph": "agents.topic_agent",
+    "TopicStreamParser": "agents.topic_agent",
+    "create_outline_generation_graph": "agents.outline_agent",
+    "OutlineSectionStream": "agents.outline_agent",
+    "OutlineStreamParser": "agents.outline_agent",
+    "create_theme_to_outlines_graph": "agents.pipeline_agent",
+    "get_graph": "agents.registry",
+    "get_topic_ideation_graph": "agents.registry",
+    "get_outline_generation_graph": "agents.registry",
+    "get_theme_to_outlines_graph": "agents.registry",
+    "warm_graphs": "agents.registry",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    # Cache it so later lookups don't come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
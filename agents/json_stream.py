@@ -0,0 +1,379 @@
+"""Incremental (push) JSON parser for structured LLM output that arrives in chunks."""
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+# LLMs sometimes put raw newlines inside strings; json.loads(strict=False) accepts them
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+
+_TYPE_NAMES = {dict: "object", list: "array", str: "string", int: "number", float: "number",
+               bool: "boolean", type(None): "null"}
+
+# Parser states: what the next token may be. _SKIP discards a broken element.
+_START, _VALUE, _VALUE_OR_CLOSE, _KEY, _KEY_OR_CLOSE, _COLON, _COMMA_OR_CLOSE, _END, _SKIP = range(9)
+
+
+class JsonStreamError(ValueError):
+    """Raised as soon as streamed text can no longer become JSON matching the schema."""
+
+    def __init__(self, message: str, path: Tuple = (), position: int = 0):
+        super().__init__(message)
+        self.path = path
+        self.position = position
+
+
+class JsonDefect(NamedTuple):
+    """A broken element the parser skipped over, left as ``None`` in the parsed value."""
+    path: Tuple
+    fragment: str
+    error: str
+
+
+class JsonStreamParser:
+    """
+    Parse one JSON object from text fed in arbitrary chunks.
+
+    Each character is examined once, so the total cost is linear in the
+    response length rather than re-parsing the whole buffer per chunk. Text
+    before the first ``{``/``[`` (such as a markdown code fence) and after the
+    closing bracket is ignored.
+
+    ``schema`` maps value paths to the allowed Python type(s); ``"*"`` in a
+    path matches any array index and paths not listed are unchecked. A value
+    of the wrong type raises JsonStreamError when it *starts*, not when the
+    response ends. ``on_close(path, value)`` is called as each object or
+    array completes and may raise JsonStreamError itself.
+
+    With ``lenient=True`` trailing commas are accepted and ``close`` finishes
+    truncated input by dropping an unterminated string and closing open
+    brackets. Errors inside an element whose path matches one of ``recover``
+    don't abort the parse: the element becomes ``None``, its raw text is
+    recorded in ``defects`` and parsing resumes after it.
+    """
+
+    def __init__(self, schema: Optional[Dict[Tuple, Any]] = None,
+                 on_close: Optional[Callable[[Tuple, Any], None]] = None,
+                 lenient: bool = False, recover: Iterable[Tuple] = ()):
+        self.schema = schema or {}
+        self.on_close = on_close
+        self.lenient = lenient
+        self.recover = tuple(recover)
+        self.value: Any = None
+        self.text = ""
+        self.defects: List[JsonDefect] = []
+        self._buffer = ""
+        self._consumed = 0
+        self._state = _START
+        # One [container, path, pending_key, start_offset] frame per open object/array
+        self._stack: List[list] = []
+        self._skip: Optional[dict] = None
+
+    @property
+    def done(self) -> bool:
+        return self._state == _END
+
+    def feed(self, text: str) -> None:
+        """Consume the next chunk of text."""
+        self.text += text
+        buffer = self._buffer + text
+        pos = self._parse(buffer)
+        # Keep only the incomplete token at the end, if any
+        self._buffer = buffer[pos:]
+        self._consumed += pos
+
+    def close(self) -> Any:
+        """Finish parsing and return the complete value."""
+        if self._state != _END and self._buffer.strip():
+            # A number at the very end of the input can only be completed now
+            self.feed(" ")
+        if self._state != _END and self.lenient and self._state != _START:
+            self._complete_truncated()
+        if self._state != _END:
+            raise self._error("Response ended before the JSON value was complete", len(self._buffer))
+        return self.value
+
+    def _complete_truncated(self) -> None:
+        """Close a response that was cut off, e.g. by the max_tokens limit."""
+        if self._state == _SKIP:
+            self._finish_skip(len(self.text))
+        # Whatever is left is an unterminated string or key; drop it
+        self._consumed += len(self._buffer)
+        self._buffer = ""
+        if self._state in (_COLON, _KEY):
+            self._state = _COMMA_OR_CLOSE if self._state == _COLON else _KEY_OR_CLOSE
+        elif self._state == _VALUE and isinstance(self._stack[-1][0], dict):
+            # The key was read but its value never arrived
+            self._stack[-1][2] = None
+            self._state = _COMMA_OR_CLOSE
+        while self._stack and self._state != _END:
+            container = self._stack[-1][0]
+            if isinstance(container, dict):
+                container.pop(None, None)
+            self._close_container(0)
+
+    def _parse(self, buffer: str) -> int:
+        pos = 0
+        end = len(buffer)
+        while pos < end:
+            try:
+                pos = self._step(buffer, pos, end)
+            except JsonStreamError as e:
+                if not self._start_recovery(e):
+                    raise
+                pos = e.position - self._consumed
+            if pos is None:
+                # Need more text to finish the current token
+                return self._incomplete_pos
+        return pos
+
+    def _step(self, buffer: str, pos: int, end: int) -> Optional[int]:
+        """Consume one token at ``pos``; return the new position, or None if it is incomplete."""
+        state = self._state
+        if state == _START:
+            starts = [i for i in (buffer.find("{", pos), buffer.find("[", pos)) if i >= 0]
+            if not starts:
+                return end
+            self._state = _VALUE
+            return min(starts)
+        if state == _END:
+            return end
+        if state == _SKIP:
+            return self._scan_skip(buffer, pos, end)
+
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos >= end:
+            return pos
+        char = buffer[pos]
+
+        if state in (_VALUE, _VALUE_OR_CLOSE):
+            container = self._stack[-1][0] if self._stack else None
+            trailing_comma = self.lenient and state == _VALUE and isinstance(container, list) and container
+            if char == "]" and (state == _VALUE_OR_CLOSE or trailing_comma):
+                self._close_container(pos)
+                return pos + 1
+            if char == "{":
+                self._open_container({}, pos)
+                self._state = _KEY_OR_CLOSE
+                return pos + 1
+            if char == "[":
+                self._open_container([], pos)
+                self._state = _VALUE_OR_CLOSE
+                return pos + 1
+            scalar_end = self._scan_scalar(buffer, pos)
+            if scalar_end is None:
+                self._incomplete_pos = pos
+            return scalar_end
+        if state in (_KEY, _KEY_OR_CLOSE):
+            if char == "}" and (state == _KEY_OR_CLOSE or self.lenient):
+                self._close_container(pos)
+                return pos + 1
+            if char == '"':
+                match = _STRING.match(buffer, pos)
+                if match is None:
+                    self._incomplete_pos = pos
+                    return None
+                self._stack[-1][2] = json.loads(match.group(), strict=False)
+                self._state = _COLON
+                return match.end()
+            raise self._error(f"Expected an object key, got {char!r}", pos)
+        if state == _COLON:
+            if char != ":":
+                raise self._error(f"Expected ':', got {char!r}", pos)
+            self._state = _VALUE
+            return pos + 1
+
+        # _COMMA_OR_CLOSE
+        container = self._stack[-1][0]
+        closer = "}" if isinstance(container, dict) else "]"
+        if char == ",":
+            self._state = _KEY if isinstance(container, dict) else _VALUE
+            return pos + 1
+        if char == closer:
+            self._close_container(pos)
+            return pos + 1
+        raise self._error(f"Expected ',' or {closer!r}, got {char!r}", pos)
+
+    def _scan_scalar(self, buffer: str, pos: int) -> Optional[int]:
+        """Add the string/number/literal at ``pos``; return its end, or None if incomplete."""
+        char = buffer[pos]
+        if char == '"':
+            match = _STRING.match(buffer, pos)
+            if match is None:
+                return None
+            self._add_value(json.loads(match.group(), strict=False), pos)
+            return match.end()
+        if char == "-" or char.isdigit():
+            match = _NUMBER.match(buffer, pos)
+            # A number touching the end of the buffer may still grow
+            if match is None or match.end() == len(buffer):
+                if match is None and len(buffer) - pos > 1:
+                    raise self._error(f"Invalid number at {buffer[pos:pos + 10]!r}", pos)
+                return None
+            self._add_value(json.loads(match.group()), pos)
+            return match.end()
+        for literal, value in _LITERALS.items():
+            if buffer.startswith(literal, pos):
+                self._add_value(value, pos)
+                return pos + len(literal)
+            if literal.startswith(buffer[pos:pos + len(literal)]) and len(buffer) - pos < len(literal):
+                return None
+        raise self._error(f"Unexpected {char!r}", pos)
+
+    def _child_path(self) -> Tuple:
+        if not self._stack:
+            return ()
+        container, path, key, _ = self._stack[-1]
+        return path + ((key,) if isinstance(container, dict) else (len(container),))
+
+    def _check_type(self, path: Tuple, value: Any, pos: int) -> None:
+        expected = self.schema.get(_pattern(path))
+        if expected is None:
+            return
+        expected = expected if isinstance(expected, tuple) else (expected,)
+        # bool is an int subclass; don't let true/false pass for a number
+        if not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected):
+            names = " or ".join(sorted({_TYPE_NAMES.get(t, t.__name__) for t in expected}))
+            raise self._error(
+                f"{_format_path(path)} should be {names}, got {_TYPE_NAMES.get(type(value), type(value).__name__)}", pos, path
+            )
+
+    def _attach(self, value: Any) -> None:
+        if not self._stack:
+            self.value = value
+            return
+        container, _, key, _ = self._stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container.append(value)
+
+    def _add_value(self, value: Any, pos: int) -> None:
+        self._check_type(self._child_path(), value, pos)
+        self._attach(value)
+        self._state = _COMMA_OR_CLOSE if self._stack else _END
+
+    def _open_container(self, container: Any, pos: int) -> None:
+        path = self._child_path()
+        self._check_type(path, container, pos)
+        self._attach(container)
+        self._stack.append([container, path, None, self._consumed + pos])
+
+    def _close_container(self, pos: int) -> None:
+        container, path, _, start = self._stack.pop()
+        self._state = _COMMA_OR_CLOSE if self._stack else _END
+        if not self.on_close:
+            return
+        try:
+            self.on_close(path, container)
+        except JsonStreamError as e:
+            e.position = self._consumed + pos
+            if not self._is_recoverable(path):
+                raise
+            # The element is complete, so nothing needs skipping
+            self._record_defect(path, self.text[start:self._consumed + pos + 1], str(e))
+
+    def _is_recoverable(self, path: Tuple) -> bool:
+        return bool(path) and any(_matches(pattern, path) for pattern in self.recover)
+
+    def _start_recovery(self, error: JsonStreamError) -> bool:
+        """Switch to skipping the innermost recoverable element containing the error."""
+        position = error.position
+        for index, frame in enumerate(self._stack):
+            if self._is_recoverable(frame[1]):
+                # Error inside an open element: drop it and everything opened within it
+                path, start = frame[1], frame[3]
+                depth = len(self._stack) - index
+                del self._stack[index:]
+                break
+        else:
+            path = self._child_path()
+            if not self._is_recoverable(path):
+                return False
+            # Error at the start of (or just before) the element: skip the value at ``position``
+            start, depth = position, 0
+        self._skip = {"path": path, "start": start, "depth": depth, "in_string": False,
+                      "escaped": False, "error": str(error)}
+        self._state = _SKIP
+        return True
+
+    def _scan_skip(self, buffer: str, pos: int, end: int) -> int:
+        skip = self._skip
+        while pos < end:
+            char = buffer[pos]
+            if skip["in_string"]:
+                if skip["escaped"]:
+                    skip["escaped"] = False
+                elif char == "\\":
+                    skip["escaped"] = True
+                elif char == '"':
+                    skip["in_string"] = False
+            elif char == '"':
+                skip["in_string"] = True
+            elif char in "{[":
+                skip["depth"] += 1
+            elif char in "}]":
+                if skip["depth"] == 0:
+                    # This bracket closes the parent; the broken element ended before it
+                    self._finish_skip(self._consumed + pos)
+                    return pos
+                skip["depth"] -= 1
+                if skip["depth"] == 0:
+                    self._finish_skip(self._consumed + pos + 1)
+                    return pos + 1
+            elif char == "," and skip["depth"] == 0:
+                self._finish_skip(self._consumed + pos)
+                return pos
+            pos += 1
+        return pos
+
+    def _finish_skip(self, end_offset: int) -> None:
+        skip, self._skip = self._skip, None
+        self._record_defect(skip["path"], self.text[skip["start"]:end_offset].strip(), skip["error"])
+        self._state = _COMMA_OR_CLOSE if self._stack else _END
+
+    def _record_defect(self, path: Tuple, fragment: str, error: str) -> None:
+        """Leave ``None`` where the broken element was and remember what went wrong."""
+        parent = self._stack[-1][0] if self._stack else None
+        index = path[-1]
+        if isinstance(parent, list):
+            if index < len(parent):
+                parent[index] = None
+            else:
+                parent.append(None)
+        elif isinstance(parent, dict):
+            parent[index] = None
+        self.defects.append(JsonDefect(path, fragment, error))
+
+    def _error(self, message: str, pos: int, path: Optional[Tuple] = None) -> JsonStreamError:
+        position = self._consumed + pos
+        return JsonStreamError(f"{message} (at character {position})",
+                               self._child_path() if path is None else path, position)
+
+
+def _pattern(path: Tuple) -> Tuple:
+    return tuple("*" if isinstance(part, int) else part for part in path)
+
+
+def _matches(pattern: Tuple, path: Tuple) -> bool:
+    return len(pattern) == len(path) and all(p == "*" or p == part for p, part in zip(pattern, _pattern(path)))
+
+
+def _format_path(path: Tuple) -> str:
+    if not path:
+        return "The response"
+    return "".join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in path).lstrip(".")
+
+
+def parse_json_leniently(text: str, schema: Optional[Dict[Tuple, Any]] = None) -> Any:
+    """
+    Local fix-up for malformed JSON: ignores code fences and surrounding
+    prose, trailing commas and a truncated end. Raises JsonStreamError if
+    the text is broken in some other way.
+    """
+    parser = JsonStreamParser(schema, lenient=True)
+    parser.feed(text)
+    return parser.close()
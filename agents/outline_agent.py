@@ -1,15 +1,32 @@
 """Outline generation agent for blog post creation."""
+import asyncio
+import copy
+import time
+from functools import partial
 from states import OutlineGenerationState
-from llm_services import get_llm
-from langchain_core.prompts import ChatPromptTemplate
+from llm_services import get_llm, get_response_text
+from model_router import OUTLINE
 from langchain_core.output_parsers import JsonOutputParser
-from pydantic import BaseModel, Field
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Dict, Optional
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import HumanMessage
+from config import OUTLINE_SCHEMA_RETRIES
+from usage import metered
+from tracing import TIMING_ENABLED, observe_parse, timed_node
+from agents.json_stream import JsonStreamError, JsonStreamParser, parse_json_leniently
 
 # Import prompts
-from prompts import OUTLINE_GENERATION_SYSTEM_PROMPT, OUTLINE_GENERATION_HUMAN_PROMPT
+from prompts import (
+    OUTLINE_GENERATION_SYSTEM_PROMPT,
+    OUTLINE_GENERATION_HUMAN_PROMPT,
+    OUTLINE_REPAIR_SYSTEM_PROMPT,
+    OUTLINE_SECTION_REPAIR_PROMPT,
+    OUTLINE_FIELDS_REPAIR_PROMPT,
+    system_message,
+    human_message,
+)
 
 
 # Pydantic models for outline structure
@@ -28,75 +45,378 @@ class BlogOutline(BaseModel):
     call_to_action: Optional[str] = Field(default=None, description="A suggested call to action, if applicable")
 
 
-def generate_outline_node(state: OutlineGenerationState) -> dict:
-    """Node to generate a blog post outline."""
-    print("---NODE: GENERATE OUTLINE---")
-    topic = state["selected_topic"]
+# Expected JSON types by path, checked as the response streams in
+OUTLINE_SCHEMA = {
+    (): dict,
+    ("title_suggestion",): str,
+    ("introduction_hook",): str,
+    ("sections",): list,
+    ("sections", "*"): dict,
+    ("sections", "*", "heading"): str,
+    ("sections", "*", "key_points"): list,
+    ("sections", "*", "key_points", "*"): str,
+    ("conclusion_summary",): str,
+    ("call_to_action",): (str, type(None)),
+}
+# Schema description for the system prompt; depends only on BlogOutline, so computed once
+OUTLINE_FORMAT_INSTRUCTIONS = JsonOutputParser(pydantic_object=BlogOutline).get_format_instructions()
+
+# The same checks for a section parsed on its own
+SECTION_SCHEMA = {path[2:]: kind for path, kind in OUTLINE_SCHEMA.items() if path[:2] == ("sections", "*")}
+REQUIRED_OUTLINE_FIELDS = [name for name, field in BlogOutline.model_fields.items() if field.is_required()]
+
+
+class OutlineStreamParser:
+    """
+    Incrementally parse a streamed BlogOutline response.
+
+    Every section is validated as an ``OutlineSection`` the moment its object
+    closes, and any value of the wrong type is caught as soon as it starts.
+    Together with ``defects`` this is the outline's only validation pass.
+
+    Parsing is lenient about code fences, trailing commas and a truncated
+    end. A broken section is skipped (left as ``None`` in ``sections``) and
+    reported by ``defects`` for targeted repair; any other schema violation
+    raises JsonStreamError immediately so the stream can be abandoned.
+    """
+
+    def __init__(self):
+        # Index -> validated section, in completion order
+        self.completed: Dict[int, OutlineSection] = {}
+        self._new_sections: List[OutlineSection] = []
+        # Time spent inside the parser, reported once the response is closed
+        self.parse_seconds = 0.0
+        self._parser = JsonStreamParser(OUTLINE_SCHEMA, on_close=self._on_close,
+                                        lenient=True, recover=[("sections", "*")])
+
+    def feed(self, text: str) -> List[OutlineSection]:
+        """Consume a chunk of streamed text and return sections completed by it."""
+        if TIMING_ENABLED:
+            started = time.perf_counter()
+            try:
+                self._parser.feed(text)
+            finally:
+                self.parse_seconds += time.perf_counter() - started
+        else:
+            self._parser.feed(text)
+        new_sections, self._new_sections = self._new_sections, []
+        return new_sections
+
+    def close(self) -> Dict:
+        """Finish the stream and return the outline dict, possibly with defects."""
+        started = time.perf_counter()
+        try:
+            outline = self._parser.close()
+        finally:
+            observe_parse("outline", self.parse_seconds + time.perf_counter() - started)
+        if not outline.get("sections"):
+            raise JsonStreamError("Outline has no sections")
+        return outline
+
+    def defects(self, outline: Dict) -> List[Dict]:
+        """
+        Describe what still needs repairing in ``outline``: broken sections
+        (with their raw text) and missing required fields.
+        """
+        defects = [
+            {"kind": "section", "index": defect.path[1], "fragment": defect.fragment, "error": defect.error}
+            for defect in self._parser.defects
+        ]
+        missing = [name for name in REQUIRED_OUTLINE_FIELDS if outline.get(name) is None]
+        if missing:
+            defects.append({"kind": "fields", "fields": missing, "error": f"Missing required fields: {', '.join(missing)}"})
+        return defects
+
+    def _on_close(self, path, value) -> None:
+        if len(path) == 2 and path[0] == "sections":
+            try:
+                section = OutlineSection.model_validate(value)
+            except ValidationError as e:
+                raise JsonStreamError(f"sections[{path[1]}] is not a valid section: {e}", path)
+            self.completed[path[1]] = section
+            self._new_sections.append(section)
+
+
+class OutlineSectionStream:
+    """
+    Report sections of a streamed outline as they complete, for clients that
+    only see the raw tokens (such as the NDJSON streaming endpoint).
+
+    Sections are reported in order. Once the token stream hits a broken
+    section or stops parsing (e.g. the node retried), the remaining sections
+    are taken from the final, repaired outline instead.
+    """
+
+    def __init__(self):
+        self.sections_emitted = 0
+        self._parser: Optional[OutlineStreamParser] = OutlineStreamParser()
+
+    def feed(self, text: str) -> List[Dict]:
+        """Consume a chunk of streamed text and return newly completed sections."""
+        if self._parser is None:
+            return []
+        try:
+            self._parser.feed(text)
+        except JsonStreamError:
+            self._parser = None
+            return []
+        new_sections = []
+        while self.sections_emitted in self._parser.completed:
+            new_sections.append(self._parser.completed[self.sections_emitted].model_dump())
+            self.sections_emitted += 1
+        return new_sections
+
+    def close(self, outline: Dict) -> List[Dict]:
+        """Return the sections not yet emitted from the final outline."""
+        new_sections = (outline.get("sections") or [])[self.sections_emitted:]
+        self.sections_emitted += len(new_sections)
+        return new_sections
+
+
+def _build_outline_messages(state: OutlineGenerationState) -> list:
+    """Build the LLM messages for an outline generation request."""
     audience = state.get("target_audience") or "a general audience"  # Ensure default if None
-    llm = get_llm()  # You could pass a specific model for outlining if desired
-
-    parser = JsonOutputParser(pydantic_object=BlogOutline)
-    format_instructions = parser.get_format_instructions()
-
-    # Create properly formatted messages for the LLM
-    formatted_system_prompt = OUTLINE_GENERATION_SYSTEM_PROMPT.format(format_instructions=format_instructions)
-    formatted_human_prompt = OUTLINE_GENERATION_HUMAN_PROMPT.format(topic=topic, audience=audience)
-    
-    messages = [
-        SystemMessage(content=formatted_system_prompt),
-        HumanMessage(content=formatted_human_prompt)
+    # The system prompt (with the schema's format instructions) is built once and shared
+    return [
+        system_message(OUTLINE_GENERATION_SYSTEM_PROMPT, format_instructions=OUTLINE_FORMAT_INSTRUCTIONS),
+        human_message(OUTLINE_GENERATION_HUMAN_PROMPT, topic=state["selected_topic"], audience=audience),
     ]
 
+
+def _outline_error(e: Exception) -> dict:
+    """Log an outline generation failure and return the node's error update."""
+    print(f"Error in generate_outline_node: {e}")
+    return {"generated_outline": None, "error_message": str(e)}
+
+
+def _outline_request(state: OutlineGenerationState) -> list:
+    """Build the outline messages, telling the model what went wrong on a retry."""
+    messages = _build_outline_messages(state)
+    if state.get("outline_feedback"):
+        messages.append(HumanMessage(content=(
+            f"Your previous response did not match the required JSON schema: {state['outline_feedback']}. "
+            "Respond again with only the complete JSON object."
+        )))
+    return messages
+
+
+def _outline_update(outline_parser: OutlineStreamParser, attempts: int) -> dict:
+    """Turn a parsed (possibly defective) outline into the generate node's state update."""
+    outline = outline_parser.close()
+    defects = outline_parser.defects(outline)
+    if defects:
+        print(f"Outline has {len(defects)} defect(s); repairing")
+        return {"generated_outline": None, "outline_draft": outline, "outline_defects": defects,
+                "outline_attempts": attempts, "error_message": None}
+    return {"generated_outline": outline, "outline_draft": None, "outline_defects": None,
+            "outline_feedback": None, "outline_attempts": attempts, "error_message": None}
+
+
+def _schema_failure(e: JsonStreamError, attempts: int) -> dict:
+    """State update after the stream diverged from the schema beyond local repair."""
+    print(f"Outline response diverged from the schema ({e})")
+    return {"generated_outline": None, "outline_draft": None, "outline_defects": None,
+            "outline_feedback": str(e), "outline_attempts": attempts, "error_message": str(e)}
+
+
+def generate_outline_node(state: OutlineGenerationState, model_name: Optional[str] = None) -> dict:
+    """Node to generate a blog post outline."""
+    print("---NODE: GENERATE OUTLINE---")
+    llm = get_llm(model_name, task=OUTLINE)
+    attempts = state.get("outline_attempts", 0) + 1
+
+    # Parse while streaming so a malformed response is abandoned at the first bad token
+    outline_parser = OutlineStreamParser()
+    stream = llm.stream(_outline_request(state))
     try:
-        # Call the LLM directly with the messages
-        llm_response = llm.invoke(messages)
-        
-        # Extract the text from the response
-        # The response could be a ChatResult, Message, or a string
-        if hasattr(llm_response, 'generations') and llm_response.generations:
-            # It's a ChatResult
-            response_text = llm_response.generations[0].message.content
-        elif hasattr(llm_response, 'content'):
-            # It's a Message
-            response_text = llm_response.content
-        else:
-            # Assume it's a string or something we can convert to string
-            response_text = str(llm_response)
-        
-        # Parse the response content with JSON parser
-        response = parser.invoke(response_text)
-        
-        return {"generated_outline": response, "error_message": None}
+        for chunk in stream:
+            outline_parser.feed(chunk.content)
+        return _outline_update(outline_parser, attempts)
+    except JsonStreamError as e:
+        return _schema_failure(e, attempts)
     except Exception as e:
-        print(f"Error in generate_outline_node: {e}")
-        # Try to capture more info if it's a parsing error
-        if "OutputParserException" in str(type(e)):
-            print(f"LLM Output likely did not conform to JSON schema. Raw LLM output: {getattr(e, 'llm_output', 'N/A')}")
-        return {"generated_outline": None, "error_message": str(e)}
+        return {**_outline_error(e), "outline_feedback": None, "outline_attempts": attempts}
+    finally:
+        stream.close()
 
 
-def format_outline_node(state: OutlineGenerationState) -> dict:
-    """Node to format outline (currently a pass-through)."""
-    print("---NODE: FORMAT OUTLINE---")
-    # Could add validation against Pydantic model here if not already done by parser
-    if state["generated_outline"]:
+async def agenerate_outline_node(state: OutlineGenerationState, model_name: Optional[str] = None) -> dict:
+    """Async variant of ``generate_outline_node`` used by ``ainvoke``/``astream``."""
+    print("---NODE: GENERATE OUTLINE---")
+    llm = get_llm(model_name, task=OUTLINE)
+    attempts = state.get("outline_attempts", 0) + 1
+
+    outline_parser = OutlineStreamParser()
+    stream = llm.astream(_outline_request(state))
+    try:
+        async for chunk in stream:
+            outline_parser.feed(chunk.content)
+        return _outline_update(outline_parser, attempts)
+    except JsonStreamError as e:
+        return _schema_failure(e, attempts)
+    except Exception as e:
+        return {**_outline_error(e), "outline_feedback": None, "outline_attempts": attempts}
+    finally:
+        await stream.aclose()
+
+
+def _repair_locally(defect: Dict) -> Optional[Dict]:
+    """Re-parse a broken section fragment leniently; return the section if that fixes it."""
+    if defect["kind"] != "section":
+        return None
+    try:
+        return OutlineSection.model_validate(parse_json_leniently(defect["fragment"], SECTION_SCHEMA)).model_dump()
+    except (JsonStreamError, ValidationError):
+        return None
+
+
+def _repair_messages(state: OutlineGenerationState, defect: Dict, draft: Dict) -> list:
+    """Build a repair request carrying only the broken part and its error."""
+    if defect["kind"] == "section":
+        prompt = OUTLINE_SECTION_REPAIR_PROMPT.format(fragment=defect["fragment"], error=defect["error"])
+    else:
+        headings = [section["heading"] for section in draft.get("sections") or [] if section]
+        prompt = OUTLINE_FIELDS_REPAIR_PROMPT.format(
+            topic=state["selected_topic"],
+            headings="; ".join(headings),
+            fields="\n".join(f"- {name}: {BlogOutline.model_fields[name].description}" for name in defect["fields"]),
+        )
+    return [system_message(OUTLINE_REPAIR_SYSTEM_PROMPT), HumanMessage(content=prompt)]
+
+
+def _parse_repair(defect: Dict, text: str) -> Optional[Dict]:
+    """Validate an LLM repair response; return the replacement value or None."""
+    started = time.perf_counter()
+    try:
+        if defect["kind"] == "section":
+            return OutlineSection.model_validate(parse_json_leniently(text, SECTION_SCHEMA)).model_dump()
+        fields = parse_json_leniently(text)
+        if all(isinstance(fields.get(name), str) for name in defect["fields"]):
+            return {name: fields[name] for name in defect["fields"]}
+    except (JsonStreamError, ValidationError, AttributeError) as e:
+        print(f"Outline repair response was unusable: {e}")
+    finally:
+        observe_parse("outline_repair", time.perf_counter() - started)
+    return None
+
+
+def _apply_repairs(state: OutlineGenerationState, repairs: List[tuple]) -> dict:
+    """Fill repaired parts into the draft, or fall back to a full retry if any failed."""
+    draft = copy.deepcopy(state["outline_draft"])
+    log = list(state.get("outline_repairs") or [])
+    failed = []
+    for defect, value, strategy in repairs:
+        if value is None:
+            failed.append(defect["error"])
+        elif defect["kind"] == "section":
+            draft["sections"][defect["index"]] = value
+        else:
+            draft.update(value)
+        log.append({"kind": defect["kind"], "strategy": strategy if value is not None else "failed"})
+
+    if failed:
+        error = "Outline repair failed: " + "; ".join(failed)
+        print(error)
+        return {"generated_outline": None, "outline_draft": None, "outline_defects": None,
+                "outline_feedback": "; ".join(failed), "outline_repairs": log, "error_message": error}
+    return {"generated_outline": draft, "outline_draft": None, "outline_defects": None,
+            "outline_feedback": None, "outline_repairs": log, "error_message": None}
+
+
+def repair_outline_node(state: OutlineGenerationState, model_name: Optional[str] = None) -> dict:
+    """
+    Node to fix the defects found while parsing, cheapest first: a local
+    re-parse of the broken fragment, then an LLM call with only that
+    fragment and its error.
+    """
+    print("---NODE: REPAIR OUTLINE---")
+    llm = get_llm(model_name, task=OUTLINE)
+    repairs = []
+    for defect in state["outline_defects"]:
+        value = _repair_locally(defect)
+        if value is not None:
+            repairs.append((defect, value, "local"))
+            continue
         try:
-            # Validate it's parseable into our Pydantic model,
-            # even if parser already did. This node could do extra transformations.
-            BlogOutline(**state["generated_outline"])
+            response = llm.invoke(_repair_messages(state, defect, state["outline_draft"]))
+            value = _parse_repair(defect, get_response_text(response))
         except Exception as e:
-            print(f"Error validating outline structure in format_outline_node: {e}")
-            return {"error_message": f"Outline structure invalid: {e}"}
+            print(f"Error in repair_outline_node: {e}")
+        repairs.append((defect, value, "llm"))
+    return _apply_repairs(state, repairs)
+
+
+async def arepair_outline_node(state: OutlineGenerationState, model_name: Optional[str] = None) -> dict:
+    """Async variant of ``repair_outline_node``; LLM repairs run concurrently."""
+    print("---NODE: REPAIR OUTLINE---")
+    llm = get_llm(model_name, task=OUTLINE)
+
+    async def repair(defect: Dict) -> tuple:
+        value = _repair_locally(defect)
+        if value is not None:
+            return defect, value, "local"
+        try:
+            response = await llm.ainvoke(_repair_messages(state, defect, state["outline_draft"]))
+            value = _parse_repair(defect, get_response_text(response))
+        except Exception as e:
+            print(f"Error in repair_outline_node: {e}")
+        return defect, value, "llm"
+
+    repairs = await asyncio.gather(*(repair(defect) for defect in state["outline_defects"]))
+    return _apply_repairs(state, list(repairs))
+
+
+def route_after_generate(state: OutlineGenerationState) -> str:
+    """Repair defects if there are any, otherwise continue like ``route_after_repair``."""
+    if state.get("outline_defects"):
+        return "repair_outline"
+    return route_after_repair(state)
+
+
+def route_after_repair(state: OutlineGenerationState) -> str:
+    """Regenerate the whole outline only if repair wasn't possible and attempts remain."""
+    retryable = state.get("generated_outline") is None and state.get("outline_feedback")
+    if retryable and state.get("outline_attempts", 0) <= OUTLINE_SCHEMA_RETRIES:
+        return "generate_outline"
+    return "format_outline"
+
+
+def format_outline_node(state: OutlineGenerationState) -> dict:
+    """Node to format outline (currently a pass-through; validation happens while parsing)."""
+    print("---NODE: FORMAT OUTLINE---")
     return {}
 
 
-def create_outline_generation_graph():
-    """Create and return the outline generation workflow graph."""
+def create_outline_generation_graph(model_name: Optional[str] = None):
+    """
+    Create and return the outline generation workflow graph.
+
+    Building and compiling the graph is comparatively expensive; request
+    handlers should use ``agents.registry.get_outline_generation_graph`` instead,
+    which compiles it once per process.
+
+    Args:
+        model_name (str, optional): The model used by the LLM node. Defaults to the per-task routed model.
+    """
     workflow = StateGraph(OutlineGenerationState)
-    workflow.add_node("generate_outline", generate_outline_node)
-    workflow.add_node("format_outline", format_outline_node)
+    # Sync and async implementations, so both invoke() and ainvoke() avoid blocking
+    # LLM nodes are metered: their calls' usage is appended to the state's llm_usage.
+    # Every node is timed into tracing.node_latency
+    workflow.add_node("generate_outline", RunnableLambda(
+        timed_node("generate_outline", metered(partial(generate_outline_node, model_name=model_name))),
+        afunc=timed_node("generate_outline", metered(partial(agenerate_outline_node, model_name=model_name))),
+    ))
+    workflow.add_node("repair_outline", RunnableLambda(
+        timed_node("repair_outline", metered(partial(repair_outline_node, model_name=model_name))),
+        afunc=timed_node("repair_outline", metered(partial(arepair_outline_node, model_name=model_name))),
+    ))
+    workflow.add_node("format_outline", timed_node("format_outline", format_outline_node))
     workflow.set_entry_point("generate_outline")
-    workflow.add_edge("generate_outline", "format_outline")
+    # Defects go to the repair stage; unrepairable output is regenerated, up to OUTLINE_SCHEMA_RETRIES times
+    workflow.add_conditional_edges("generate_outline", route_after_generate,
+                                   ["repair_outline", "generate_outline", "format_outline"])
+    workflow.add_conditional_edges("repair_outline", route_after_repair,
+                                   ["generate_outline", "format_outline"])
     workflow.add_edge("format_outline", END)
     return workflow.compile()
 
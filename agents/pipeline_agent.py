@@ -0,0 +1,194 @@
+"""Combined theme-to-outlines agent: topic ideation pipelined into outline generation."""
+import asyncio
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from states import ThemeToOutlinesState, OutlineGenerationState
+from llm_services import get_llm
+from model_router import TOPICS
+from config import PIPELINE_MAX_CONCURRENCY
+from usage import metered, summarize_usage
+from tracing import timed_node
+from checkpointing import invoke_run
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_config
+from langgraph.graph import StateGraph, END
+
+from agents.topic_agent import TopicStreamParser, _build_topic_messages, _cached_topics, _remember_topics
+
+
+def _outline_inputs(state: ThemeToOutlinesState, topic: str) -> OutlineGenerationState:
+    return OutlineGenerationState(
+        selected_topic=topic,
+        target_audience=state.get("target_audience")
+    )
+
+
+def _parent_run_id() -> Optional[str]:
+    """The run id of the durable pipeline run calling this node, if it is one."""
+    try:
+        return get_config().get("configurable", {}).get("thread_id")
+    except RuntimeError:
+        # Called outside a graph run
+        return None
+
+
+def _outline_entry(topic: str, result: Any) -> Dict[str, Any]:
+    """Summarize one outline run (or the exception it raised) for the pipeline state."""
+    if isinstance(result, Exception):
+        return {"selected_topic": topic, "generated_outline": None, "error_message": str(result)}
+    return {
+        "selected_topic": topic,
+        "generated_outline": result.get("generated_outline"),
+        "error_message": result.get("error_message"),
+        "usage": summarize_usage(result.get("llm_usage")),
+    }
+
+
+def generate_topics_and_outlines_node(state: ThemeToOutlinesState, model_name: Optional[str] = None) -> dict:
+    """
+    Node to stream topics from the LLM and start each topic's outline as soon
+    as its line is parsed, instead of waiting for the whole topic list.
+    """
+    print("---NODE: GENERATE TOPICS AND OUTLINES---")
+    # Imported here: the registry itself imports this module
+    from agents.registry import get_outline_generation_graph
+
+    num_suggestions = state.get("num_suggestions", 5)
+    # In a durable run each outline is a durable run of its own, keyed by its topic,
+    # so resuming the pipeline reuses every outline that already succeeded
+    run_id = _parent_run_id()
+    outline_graph = get_outline_generation_graph(model_name, durable=bool(run_id))
+
+    def run_outline(topic: str) -> Dict[str, Any]:
+        if not run_id:
+            return outline_graph.invoke(_outline_inputs(state, topic))
+        topic_key = hashlib.sha256(topic.encode("utf-8")).hexdigest()[:16]
+        return invoke_run(outline_graph, _outline_inputs(state, topic), f"{run_id}:outline:{topic_key}")
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=max(1, min(num_suggestions, PIPELINE_MAX_CONCURRENCY)),
+                            thread_name_prefix="pipeline-outline") as pool:
+        def start(topics: List[str]):
+            for topic in topics:
+                # Each outline runs in a copy of this context, so the request's cache
+                # bypass and usage budget apply to it
+                futures.append((topic, pool.submit(contextvars.copy_context().run, run_outline, topic)))
+
+        try:
+            topics = _cached_topics(state)
+            if topics:
+                start(topics)
+            else:
+                parser = TopicStreamParser(num_suggestions)
+                for chunk in get_llm(model_name, task=TOPICS).stream(_build_topic_messages(state)):
+                    start(parser.feed(chunk.content))
+                start(parser.close())
+                topics = parser.topics
+                _remember_topics(state, topics)
+        except Exception as e:
+            print(f"Error in generate_topics_and_outlines_node: {e}")
+            for _, future in futures:
+                future.cancel()
+            return {"generated_topics": None, "generated_outlines": None, "error_message": str(e)}
+
+        outlines = []
+        for topic, future in futures:
+            try:
+                outlines.append(_outline_entry(topic, future.result()))
+            except Exception as e:
+                outlines.append(_outline_entry(topic, e))
+
+    return {"generated_topics": topics, "generated_outlines": outlines, "error_message": None}
+
+
+async def agenerate_topics_and_outlines_node(state: ThemeToOutlinesState, model_name: Optional[str] = None) -> dict:
+    """Async variant of ``generate_topics_and_outlines_node`` used by ``ainvoke``/``astream``."""
+    print("---NODE: GENERATE TOPICS AND OUTLINES---")
+    from agents.registry import get_outline_generation_graph
+
+    num_suggestions = state.get("num_suggestions", 5)
+    outline_graph = get_outline_generation_graph(model_name)
+    semaphore = asyncio.Semaphore(max(1, PIPELINE_MAX_CONCURRENCY))
+    tasks = []
+
+    async def run_outline(topic: str):
+        async with semaphore:
+            return await outline_graph.ainvoke(_outline_inputs(state, topic))
+
+    def start(topics: List[str]):
+        for topic in topics:
+            tasks.append((topic, asyncio.create_task(run_outline(topic))))
+
+    try:
+        topics = _cached_topics(state)
+        if topics:
+            start(topics)
+        else:
+            parser = TopicStreamParser(num_suggestions)
+            async for chunk in get_llm(model_name, task=TOPICS).astream(_build_topic_messages(state)):
+                start(parser.feed(chunk.content))
+            start(parser.close())
+            topics = parser.topics
+            _remember_topics(state, topics)
+    except Exception as e:
+        print(f"Error in generate_topics_and_outlines_node: {e}")
+        for _, task in tasks:
+            task.cancel()
+        return {"generated_topics": None, "generated_outlines": None, "error_message": str(e)}
+
+    results = await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+    outlines = [_outline_entry(topic, result) for (topic, _), result in zip(tasks, results)]
+    return {"generated_topics": topics, "generated_outlines": outlines, "error_message": None}
+
+
+def format_outlines_node(state: ThemeToOutlinesState) -> dict:
+    """Node to flag the run as failed if no topic produced an outline."""
+    print("---NODE: FORMAT OUTLINES---")
+    outlines = state.get("generated_outlines")
+    if outlines is not None and not any(entry["generated_outline"] for entry in outlines):
+        return {"error_message": "No outline could be generated for any topic."}
+    return {}
+
+
+def create_theme_to_outlines_graph(model_name: Optional[str] = None):
+    """
+    Create and return the combined theme-to-outlines workflow graph.
+
+    Outlines are generated concurrently, each starting as soon as its topic
+    line has streamed in, so the total time approaches the topic stream plus
+    the slowest single outline rather than the sum of all outlines.
+
+    Args:
+        model_name (str, optional): The model used by the LLM calls. Defaults to the per-task routed model.
+    """
+    workflow = StateGraph(ThemeToOutlinesState)
+    # Sync and async implementations, so both invoke() and ainvoke() avoid blocking
+    # Metered: llm_usage covers the topic stream and every outline run
+    workflow.add_node("generate_topics_and_outlines", RunnableLambda(
+        timed_node("generate_topics_and_outlines", metered(partial(generate_topics_and_outlines_node, model_name=model_name))),
+        afunc=timed_node("generate_topics_and_outlines", metered(partial(agenerate_topics_and_outlines_node, model_name=model_name))),
+    ))
+    workflow.add_node("format_outlines", timed_node("format_outlines", format_outlines_node))
+    workflow.set_entry_point("generate_topics_and_outlines")
+    workflow.add_edge("generate_topics_and_outlines", "format_outlines")
+    workflow.add_edge("format_outlines", END)
+    return workflow.compile()
+
+
+# Example usage for testing
+if __name__ == "__main__":
+    app = create_theme_to_outlines_graph()
+    inputs = ThemeToOutlinesState(
+        original_theme="The impact of remote work on team collaboration",
+        num_suggestions=3,
+        target_audience="engineering managers"
+    )
+    result = app.invoke(inputs)
+    print(f"Generated Topics: {result.get('generated_topics')}")
+    for entry in result.get("generated_outlines") or []:
+        print(f"  {entry['selected_topic']}: {'ok' if entry['generated_outline'] else entry['error_message']}")
+    print(f"Error: {result.get('error_message')}")
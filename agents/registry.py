@@ -0,0 +1,105 @@
+"""Process-wide registry of compiled LangGraph workflows.
+
+Compiling a ``StateGraph`` is pure CPU work that only depends on the workflow
+and the model it is bound to, so every process compiles each combination once
+and shares the result. Compiled graphs are safe to invoke concurrently from
+multiple threads; per-run data lives in the state passed to ``invoke``.
+
+Durable variants share the compiled graph and add the SQLite checkpointer
+from ``checkpointing``; they are made on first use, after any fork.
+"""
+import importlib
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+TOPIC_IDEATION = "topic_ideation"
+OUTLINE_GENERATION = "outline_generation"
+THEME_TO_OUTLINES = "theme_to_outlines"
+
+# Workflow name -> (module, factory) where the factory takes the model name and
+# returns a compiled graph; the module is imported the first time it's compiled
+GRAPH_FACTORIES: Dict[str, Tuple[str, str]] = {
+    TOPIC_IDEATION: ("agents.topic_agent", "create_topic_ideation_graph"),
+    OUTLINE_GENERATION: ("agents.outline_agent", "create_outline_generation_graph"),
+    THEME_TO_OUTLINES: ("agents.pipeline_agent", "create_theme_to_outlines_graph"),
+}
+
+_compiled_graphs: Dict[Tuple[str, Optional[str], bool], Any] = {}
+_lock = threading.Lock()
+
+
+def get_graph(name: str, model_name: Optional[str] = None, durable: bool = False):
+    """
+    Return the compiled graph for a workflow, compiling it on first use.
+
+    Args:
+        name (str): The workflow name, one of ``GRAPH_FACTORIES``.
+        model_name (str, optional): The model the graph is bound to. Defaults to
+            the per-task routing in ``model_router``, which is cached separately
+            from graphs pinned to a model.
+        durable (bool): Checkpoint every node so runs can be resumed; see
+            ``checkpointing.invoke_run``. The plain graph is returned when
+            checkpoints are disabled.
+
+    Returns:
+        CompiledStateGraph: The shared compiled graph.
+
+    Raises:
+        KeyError: If the workflow name is unknown.
+    """
+    key = (name, model_name or None, durable)
+    graph = _compiled_graphs.get(key)
+    if graph is not None:
+        return graph
+
+    checkpointer = None
+    if durable:
+        from checkpointing import get_checkpointer
+        checkpointer = get_checkpointer()
+        if checkpointer is None:
+            return get_graph(name, model_name)
+        graph = get_graph(name, model_name)
+
+    with _lock:
+        # Another thread may have compiled it while we waited for the lock
+        cached = _compiled_graphs.get(key)
+        if cached is not None:
+            return cached
+        if checkpointer is not None:
+            # A shallow copy: the nodes and channels stay shared with the plain graph
+            graph = graph.copy(update={"checkpointer": checkpointer})
+        else:
+            if name not in GRAPH_FACTORIES:
+                raise KeyError(f"Unknown workflow: {name}")
+            module, factory = GRAPH_FACTORIES[name]
+            graph = getattr(importlib.import_module(module), factory)(model_name=key[1])
+        _compiled_graphs[key] = graph
+        return graph
+
+
+def get_topic_ideation_graph(model_name: Optional[str] = None, durable: bool = False):
+    """Return the shared compiled topic ideation graph."""
+    return get_graph(TOPIC_IDEATION, model_name, durable)
+
+
+def get_outline_generation_graph(model_name: Optional[str] = None, durable: bool = False):
+    """Return the shared compiled outline generation graph."""
+    return get_graph(OUTLINE_GENERATION, model_name, durable)
+
+
+def get_theme_to_outlines_graph(model_name: Optional[str] = None, durable: bool = False):
+    """Return the shared compiled theme-to-outlines graph."""
+    return get_graph(THEME_TO_OUTLINES, model_name, durable)
+
+
+def warm_graphs(names: Optional[Iterable[str]] = None, model_name: Optional[str] = None) -> None:
+    """Compile the given workflows (all by default) ahead of the first request."""
+    for name in names or GRAPH_FACTORIES:
+        get_graph(name, model_name)
+
+
+def clear_graphs() -> None:
+    """Drop all compiled graphs, e.g. after changing configuration."""
+    with _lock:
+        _compiled_graphs.clear()
@@ -1,72 +1,142 @@
 """Topic ideation agent for blog post generation."""
-from typing import List
+import time
+from functools import partial
+from typing import List, Optional
 from states import TopicIdeationState
-from llm_services import get_llm
-from langchain_core.prompts import ChatPromptTemplate
+from llm_services import get_llm, get_response_text
+from model_router import TOPICS
+from llm_cache import is_cache_bypassed
+from semantic_cache import get_semantic_cache
+from usage import metered
+from tracing import observe_parse, timed_node
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import SystemMessage, HumanMessage
 
 # Import prompts
-from prompts import TOPIC_IDEATION_SYSTEM_PROMPT, TOPIC_IDEATION_HUMAN_PROMPT
+from prompts import TOPIC_IDEATION_SYSTEM_PROMPT, TOPIC_IDEATION_HUMAN_PROMPT, system_message, human_message
 
 
-def brainstorm_topics_node(state: TopicIdeationState) -> dict:
+def _build_topic_messages(state: TopicIdeationState) -> list:
+    """Build the LLM messages for a topic ideation request."""
+    # The system prompt is static; only the human message varies per request
+    return [
+        system_message(TOPIC_IDEATION_SYSTEM_PROMPT),
+        human_message(TOPIC_IDEATION_HUMAN_PROMPT, theme=state["original_theme"],
+                      num_suggestions=state.get("num_suggestions", 5)),
+    ]
+
+
+def parse_topic_line(line: str) -> Optional[str]:
+    """Return the topic on one line of the numbered list, or None for blank lines."""
+    rt = line.strip()
+    # Remove leading numbers like "1. ", "2. ", etc.
+    if '.' in rt and rt.split('.', 1)[0].isdigit():
+        return rt.split('.', 1)[1].strip() or None
+    return rt or None  # If no numbering but still valid text
+
+
+class TopicStreamParser:
+    """Incrementally parse topics out of streamed LLM text, one per completed line."""
+
+    def __init__(self, num_suggestions: int):
+        self.num_suggestions = num_suggestions
+        self.topics: List[str] = []
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Consume a chunk of streamed text and return any topics it completed."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        return self._accept(lines)
+
+    def close(self) -> List[str]:
+        """Flush the final, unterminated line once the stream has ended."""
+        line, self._buffer = self._buffer, ""
+        return self._accept([line])
+
+    def _accept(self, lines: List[str]) -> List[str]:
+        new_topics = []
+        for line in lines:
+            topic = parse_topic_line(line)
+            if topic and len(self.topics) < self.num_suggestions:
+                self.topics.append(topic)
+                new_topics.append(topic)
+        return new_topics
+
+
+def _parse_topics(response_text: str, num_suggestions: int) -> List[str]:
+    """Parse the numbered topic list out of the LLM response text."""
+    started = time.perf_counter()
+    # Parse the response content
+    response = StrOutputParser().invoke(response_text)
+    
+    # Basic parsing - ensure robustness
+    generated_topics = [topic for topic in map(parse_topic_line, response.split('\n')) if topic]
+
+    # Ensure we return the requested number of topics, or what was generated
+    final_topics = generated_topics[:num_suggestions] if generated_topics else []
+
+    if not final_topics and response:  # If parsing failed but got a response
+         print(f"Warning: Could not parse topics as expected. Raw response: {response}")
+         # Attempt a more generic split or return raw as a fallback for debugging
+         final_topics = [response] if len(response) < 200 else ["Could not parse topics, see logs."]
+
+    observe_parse("topics", time.perf_counter() - started)
+    return final_topics
+
+
+def _cached_topics(state: TopicIdeationState) -> Optional[List[str]]:
+    """Return topics generated earlier for a near-identical theme, if any."""
+    cache = get_semantic_cache()
+    if cache is None or is_cache_bypassed():
+        return None
+    return cache.lookup(state["original_theme"], state.get("num_suggestions", 5))
+
+
+def _remember_topics(state: TopicIdeationState, topics: List[str]) -> None:
+    """Index a complete set of generated topics under the request's theme."""
+    cache = get_semantic_cache()
+    # Partial or fallback results are not worth serving to the next caller
+    if cache is not None and len(topics) == state.get("num_suggestions", 5):
+        cache.add(state["original_theme"], topics)
+
+
+def brainstorm_topics_node(state: TopicIdeationState, model_name: Optional[str] = None) -> dict:
     """Node to brainstorm blog topics using an LLM."""
     print("---NODE: BRAINSTORM TOPICS---")
-    theme = state["original_theme"]
-    num_suggestions = state.get("num_suggestions", 5)
-    llm = get_llm()
+    cached_topics = _cached_topics(state)
+    if cached_topics:
+        return {"generated_topics": cached_topics, "error_message": None}
 
-    # Create properly formatted messages for the LLM
-    formatted_system_prompt = TOPIC_IDEATION_SYSTEM_PROMPT.format(num_suggestions=num_suggestions)
-    formatted_human_prompt = TOPIC_IDEATION_HUMAN_PROMPT.format(theme=theme, num_suggestions=num_suggestions)
-    
-    messages = [
-        SystemMessage(content=formatted_system_prompt),
-        HumanMessage(content=formatted_human_prompt)
-    ]
-    
-    parser = StrOutputParser()
+    llm = get_llm(model_name, task=TOPICS)
+    messages = _build_topic_messages(state)
 
     try:
         # Call the LLM directly with the messages
         llm_response = llm.invoke(messages)
-        
-        # Extract the text from the response
-        # The response could be a ChatResult, Message, or a string
-        if hasattr(llm_response, 'generations') and llm_response.generations:
-            # It's a ChatResult
-            response_text = llm_response.generations[0].message.content
-        elif hasattr(llm_response, 'content'):
-            # It's a Message
-            response_text = llm_response.content
-        else:
-            # Assume it's a string or something we can convert to string
-            response_text = str(llm_response)
-            
-        # Parse the response content
-        response = parser.invoke(response_text)
-        
-        # Basic parsing - ensure robustness
-        raw_topics = [topic.strip() for topic in response.split('\n') if topic.strip()]
-        generated_topics = []
-        for rt in raw_topics:
-            # Remove leading numbers like "1. ", "2. ", etc.
-            if '.' in rt and rt.split('.', 1)[0].isdigit():
-                topic_text = rt.split('.', 1)[1].strip()
-                generated_topics.append(topic_text)
-            elif rt:  # If no numbering but still valid text
-                 generated_topics.append(rt)
-
-        # Ensure we return the requested number of topics, or what was generated
-        final_topics = generated_topics[:num_suggestions] if generated_topics else []
-
-        if not final_topics and response:  # If parsing failed but got a response
-             print(f"Warning: Could not parse topics as expected. Raw response: {response}")
-             # Attempt a more generic split or return raw as a fallback for debugging
-             final_topics = [response] if len(response) < 200 else ["Could not parse topics, see logs."]
+        final_topics = _parse_topics(get_response_text(llm_response), state.get("num_suggestions", 5))
+        _remember_topics(state, final_topics)
+        return {"generated_topics": final_topics, "error_message": None}
+    except Exception as e:
+        print(f"Error in brainstorm_topics_node: {e}")
+        return {"generated_topics": None, "error_message": str(e)}
+
+
+async def abrainstorm_topics_node(state: TopicIdeationState, model_name: Optional[str] = None) -> dict:
+    """Async variant of ``brainstorm_topics_node`` used by ``ainvoke``/``astream``."""
+    print("---NODE: BRAINSTORM TOPICS---")
+    cached_topics = _cached_topics(state)
+    if cached_topics:
+        return {"generated_topics": cached_topics, "error_message": None}
 
+    llm = get_llm(model_name, task=TOPICS)
+    messages = _build_topic_messages(state)
+
+    try:
+        llm_response = await llm.ainvoke(messages)
+        final_topics = _parse_topics(get_response_text(llm_response), state.get("num_suggestions", 5))
+        _remember_topics(state, final_topics)
         return {"generated_topics": final_topics, "error_message": None}
     except Exception as e:
         print(f"Error in brainstorm_topics_node: {e}")
@@ -81,11 +151,26 @@ def format_topics_node(state: TopicIdeationState) -> dict:
     return {}
 
 
-def create_topic_ideation_graph():
-    """Create and return the topic ideation workflow graph."""
+def create_topic_ideation_graph(model_name: Optional[str] = None):
+    """
+    Create and return the topic ideation workflow graph.
+
+    Building and compiling the graph is comparatively expensive; request
+    handlers should use ``agents.registry.get_topic_ideation_graph`` instead,
+    which compiles it once per process.
+
+    Args:
+        model_name (str, optional): The model used by the LLM node. Defaults to the per-task routed model.
+    """
     workflow = StateGraph(TopicIdeationState)
-    workflow.add_node("brainstorm_topics", brainstorm_topics_node)
-    workflow.add_node("format_topics", format_topics_node)
+    # Sync and async implementations, so both invoke() and ainvoke() avoid blocking
+    # LLM nodes are metered: their calls' usage is appended to the state's llm_usage.
+    # Every node is timed into tracing.node_latency
+    workflow.add_node("brainstorm_topics", RunnableLambda(
+        timed_node("brainstorm_topics", metered(partial(brainstorm_topics_node, model_name=model_name))),
+        afunc=timed_node("brainstorm_topics", metered(partial(abrainstorm_topics_node, model_name=model_name))),
+    ))
+    workflow.add_node("format_topics", timed_node("format_topics", format_topics_node))
     workflow.set_entry_point("brainstorm_topics")
     workflow.add_edge("brainstorm_topics", "format_topics")
     workflow.add_edge("format_topics", END)
@@ -0,0 +1,832 @@
+"""
+Agentic Blog API - the Flask REST API for topic ideation and outline generation.
+
+Imports only what serving the API needs (no Streamlit). Run it in production
+with ``gunicorn -c gunicorn.conf.py api:app``, or ``python api.py`` for development.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask_cors import CORS
+
+from states import TopicIdeationState, OutlineGenerationState, ThemeToOutlinesState
+from config import (
+    DEFAULT_NUM_TOPICS,
+    DEFAULT_AUDIENCE,
+    BATCH_MAX_CONCURRENCY,
+    BATCH_MAX_ITEMS,
+    REQUEST_MAX_TOKENS,
+    REQUEST_MAX_COST,
+    API_BIND,
+    API_GRACEFUL_TIMEOUT,
+    API_KEY,
+    SEMANTIC_CACHE_ENABLED,
+    STARTUP_PRELOAD,
+)
+from checkpointing import RunConflictError, invoke_run, new_run_id, plan_run
+from llm_cache import bypass_cache, get_response_cache
+from job_queue import (
+    FINISHED,
+    JOB_TYPES,
+    JobConflictError,
+    get_job_queue,
+    get_job_workers,
+    start_job_workers,
+    stop_job_workers,
+)
+from scheduler import (
+    BULK,
+    DEFAULT_TENANT,
+    INTERACTIVE,
+    AdmissionError,
+    UnknownTenantError,
+    get_scheduler,
+    resolve_tenant,
+    scheduled,
+)
+from semantic_cache import get_semantic_cache
+from singleflight import generation_flights
+from speculation import get_speculator
+from resilience import get_openrouter_guard
+from metrics import llm_latency, render_prometheus
+from tracing import http_latency, node_latency, parse_latency
+from usage import inflight_calls, summarize_usage, track_usage, usage_stats
+# Loads its graphs, and with them LangGraph, LangChain and the LLM client, on first use
+import agents
+
+# Initialize Flask app
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+
+# Set once the process starts shutting down; /healthz then answers 503 so load
+# balancers stop routing new requests here while in-flight ones finish
+_draining = threading.Event()
+_drain_started = 0.0
+
+
+def warm_up() -> None:
+    """
+    Import everything the API loads lazily, compile every graph and build the
+    LLM clients ahead of the first request.
+
+    Nothing here opens a connection or a cache file, so it is safe to run once
+    in gunicorn's master before forking (``API_PRELOAD``); the workers then
+    share the compiled graphs copy-on-write.
+    """
+    from llm_services import get_llm
+    from model_router import OUTLINE, TOPICS
+
+    agents.warm_graphs()
+    if API_KEY:
+        for task in (TOPICS, OUTLINE):
+            get_llm(task=task)
+    if SEMANTIC_CACHE_ENABLED:
+        import numpy  # noqa: F401
+
+
+def begin_drain() -> None:
+    """Start failing /healthz; the drain deadline counts from the first call."""
+    global _drain_started
+    if not _draining.is_set():
+        _drain_started = time.monotonic()
+        _draining.set()
+
+
+def drain(timeout: float = API_GRACEFUL_TIMEOUT) -> int:
+    """
+    Let running background jobs finish and wait for in-flight LLM calls, up
+    to ``timeout`` seconds after draining began, then close the pooled
+    OpenRouter connections. Jobs still running at the deadline go back in
+    the queue for another process.
+
+    Returns:
+        int: The number of LLM calls still in flight when the wait ended.
+    """
+    begin_drain()
+    speculator = get_speculator()
+    if speculator is not None:
+        speculator.stop()
+    requeued = stop_job_workers(max(0.0, _drain_started + timeout - time.monotonic()))
+    if requeued:
+        print(f"WARNING: put {requeued} unfinished jobs back in the queue")
+    remaining = inflight_calls.wait_idle(max(0.0, _drain_started + timeout - time.monotonic()))
+    # Nothing to close if no LLM call was ever made
+    if "llm_services" in sys.modules:
+        sys.modules["llm_services"].close_http_session()
+    return remaining
+
+
+def run_topic_ideation(theme: str, num_topics: int, skip_cache: bool = False,
+                       max_tokens: int = REQUEST_MAX_TOKENS, max_cost: float = REQUEST_MAX_COST,
+                       run_id: Optional[str] = None, tenant: str = DEFAULT_TENANT) -> Dict[str, Any]:
+    """
+    Run the topic ideation graph, sharing one run between identical concurrent requests of a tenant.
+
+    ``max_tokens``/``max_cost`` bound the run's LLM usage (0 = unlimited).
+    Passing the ``run_id`` of an earlier run resumes it (see ``checkpointing``);
+    the result carries the run's id under ``run_id``. The run waits for an
+    interactive scheduler slot of ``tenant``.
+    """
+    inputs = TopicIdeationState(
+        original_theme=theme,
+        num_suggestions=num_topics
+    )
+
+    def execute():
+        # Reuse the process-wide compiled topic ideation graph
+        with scheduled(tenant, INTERACTIVE), bypass_cache(skip_cache), track_usage("topics", max_tokens, max_cost):
+            return invoke_run(agents.get_topic_ideation_graph(durable=True), inputs, run_id)
+
+    # Keyed by tenant too, so each tenant queues for and is charged for its own runs
+    result = generation_flights.do(("topics", theme, num_topics, skip_cache, max_tokens, max_cost, run_id, tenant),
+                                   execute)
+    _speculate(result, tenant)
+    return result
+
+
+def _speculate(result: Dict[str, Any], tenant: str) -> None:
+    """Start generating outlines for a topic run's most likely picks, if speculation is enabled."""
+    speculator = get_speculator()
+    if speculator is not None and result.get("generated_topics") and not result.get("error_message"):
+        speculator.schedule(result["generated_topics"], tenant=tenant)
+
+
+def run_outline_generation(selected_topic: str, target_audience: str, skip_cache: bool = False,
+                           max_tokens: int = REQUEST_MAX_TOKENS, max_cost: float = REQUEST_MAX_COST,
+                           endpoint: str = "outline", run_id: Optional[str] = None,
+                           tenant: str = DEFAULT_TENANT, priority: str = INTERACTIVE) -> Dict[str, Any]:
+    """
+    Run the outline generation graph, sharing one run between identical concurrent requests of a tenant.
+
+    ``max_tokens``/``max_cost`` bound the run's LLM usage (0 = unlimited);
+    its calls are aggregated in ``usage_stats`` under ``endpoint``. Passing the
+    ``run_id`` of an earlier run resumes it. Outlines generated speculatively
+    for this topic and audience are returned without calling the model,
+    unless ``skip_cache`` is set. Otherwise the run waits for a scheduler
+    slot of ``tenant`` and ``priority``.
+    """
+    speculator = get_speculator()
+    if speculator is not None and not skip_cache and run_id is None:
+        speculated = speculator.lookup(selected_topic, target_audience)
+        if speculated is not None:
+            return speculated
+
+    inputs = OutlineGenerationState(
+        selected_topic=selected_topic,
+        target_audience=target_audience
+    )
+
+    def execute():
+        # Reuse the process-wide compiled outline generation graph
+        with scheduled(tenant, priority), bypass_cache(skip_cache), track_usage(endpoint, max_tokens, max_cost):
+            return invoke_run(agents.get_outline_generation_graph(durable=True), inputs, run_id)
+
+    return generation_flights.do(("outline", selected_topic, target_audience, skip_cache, max_tokens, max_cost, run_id,
+                                  tenant, priority), execute)
+
+
+def run_theme_to_outlines(theme: str, num_topics: int, target_audience: str, skip_cache: bool = False,
+                          max_tokens: int = REQUEST_MAX_TOKENS, max_cost: float = REQUEST_MAX_COST,
+                          run_id: Optional[str] = None, tenant: str = DEFAULT_TENANT) -> Dict[str, Any]:
+    """
+    Run the combined theme-to-outlines graph, sharing one run between identical concurrent requests of a tenant.
+
+    ``max_tokens``/``max_cost`` bound the whole run's LLM usage, topics and all outlines (0 = unlimited).
+    Passing the ``run_id`` of an earlier run resumes it, reusing every outline it completed.
+    The run waits for a bulk scheduler slot of ``tenant``.
+    """
+    inputs = ThemeToOutlinesState(
+        original_theme=theme,
+        num_suggestions=num_topics,
+        target_audience=target_audience
+    )
+
+    def execute():
+        with scheduled(tenant, BULK), bypass_cache(skip_cache), track_usage("pipeline", max_tokens, max_cost):
+            return invoke_run(agents.get_theme_to_outlines_graph(durable=True), inputs, run_id)
+
+    return generation_flights.do(("pipeline", theme, num_topics, target_audience, skip_cache, max_tokens, max_cost,
+                                  run_id, tenant), execute)
+
+
+def _request_budget(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read the optional ``max_tokens``/``max_cost`` usage budget from a request
+    body, defaulting to REQUEST_MAX_TOKENS/REQUEST_MAX_COST.
+
+    Raises:
+        ValueError: If a budget is not a non-negative number.
+    """
+    budget = {
+        "max_tokens": int(data.get('max_tokens') or REQUEST_MAX_TOKENS),
+        "max_cost": float(data.get('max_cost') or REQUEST_MAX_COST),
+    }
+    if budget["max_tokens"] < 0 or budget["max_cost"] < 0:
+        raise ValueError("Budgets must not be negative")
+    return budget
+
+
+def _budget_or_error(data: Dict[str, Any]) -> tuple:
+    """Return ``(budget, None)``, or ``(None, error response)`` for an invalid budget."""
+    try:
+        return _request_budget(data), None
+    except (TypeError, ValueError):
+        return None, (jsonify({"error": "max_tokens and max_cost must be non-negative numbers"}), 400)
+
+
+def _concurrency_or_error(data: Dict[str, Any]) -> tuple:
+    """Return ``(concurrency, None)`` clamped to ``BATCH_MAX_CONCURRENCY``, or ``(None, error response)`` if invalid."""
+    try:
+        return max(1, min(int(data.get('concurrency', BATCH_MAX_CONCURRENCY)), BATCH_MAX_CONCURRENCY)), None
+    except (TypeError, ValueError):
+        return None, (jsonify({"error": "concurrency must be an integer"}), 400)
+
+
+def _run_id_or_error(data: Dict[str, Any]) -> tuple:
+    """Return ``(run_id, None)`` (None for a new run), or ``(None, error response)`` for an invalid run_id."""
+    run_id = data.get('run_id')
+    if run_id is not None and (not isinstance(run_id, str) or not run_id or len(run_id) > 128):
+        return None, (jsonify({"error": "run_id must be a non-empty string of at most 128 characters"}), 400)
+    return run_id, None
+
+
+def _tenant_or_error() -> tuple:
+    """Return ``(tenant, None)`` for the request's X-API-Key header, or ``(None, error response)`` for an unknown key."""
+    try:
+        return resolve_tenant(request.headers.get('X-API-Key')), None
+    except UnknownTenantError as e:
+        return None, (jsonify({"error": str(e)}), 401)
+
+
+def _admission_error(error: AdmissionError) -> tuple:
+    """Answer a request the scheduler turned away, with Retry-After when it is known."""
+    response = jsonify({"error": str(error)})
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response, error.status_code
+
+
+# API endpoint for topic ideation
+@app.route('/api/topics', methods=['POST'])
+def api_generate_topics():
+    data = request.get_json()
+    if not data or 'theme' not in data:
+        return jsonify({"error": "Theme is required"}), 400
+
+    theme = data['theme']
+    num_topics = data.get('num_topics', DEFAULT_NUM_TOPICS)
+    budget, error = _budget_or_error(data)
+    if error:
+        return error
+    run_id, error = _run_id_or_error(data)
+    if error:
+        return error
+    tenant, error = _tenant_or_error()
+    if error:
+        return error
+
+    try:
+        # Execute the graph
+        result = run_topic_ideation(theme, num_topics, bool(data.get('bypass_cache')), **budget, run_id=run_id,
+                                    tenant=tenant)
+        generated_topics = result.get("generated_topics", [])
+        error_message = result.get("error_message")
+        usage = summarize_usage(result.get("llm_usage"))
+
+        if error_message:
+            return jsonify({"error": error_message, "usage": usage, "run_id": result["run_id"]}), 500
+        
+        return jsonify({"generated_topics": generated_topics, "usage": usage, "run_id": result["run_id"]})
+
+    except RunConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except AdmissionError as e:
+        return _admission_error(e)
+    except Exception as e:
+        return jsonify({"error": f"Error generating topics: {str(e)}"}), 500
+
+
+# API endpoint for outline generation
+@app.route('/api/outline', methods=['POST'])
+def api_generate_outline():
+    data = request.get_json()
+    if not data or 'selected_topic' not in data or 'target_audience' not in data:
+        return jsonify({"error": "Selected topic and target audience are required"}), 400
+
+    selected_topic = data['selected_topic']
+    target_audience = data['target_audience']
+    budget, error = _budget_or_error(data)
+    if error:
+        return error
+    run_id, error = _run_id_or_error(data)
+    if error:
+        return error
+    tenant, error = _tenant_or_error()
+    if error:
+        return error
+
+    try:
+        # Execute the graph
+        result = run_outline_generation(selected_topic, target_audience, bool(data.get('bypass_cache')), **budget,
+                                        run_id=run_id, tenant=tenant)
+        generated_outline = result.get("generated_outline")
+        error_message = result.get("error_message")
+        usage = summarize_usage(result.get("llm_usage"))
+
+        if error_message:
+            return jsonify({"error": error_message, "usage": usage, "run_id": result["run_id"]}), 500
+        
+        if not generated_outline:
+             return jsonify({"error": "Outline generation failed to produce an outline.", "usage": usage,
+                             "run_id": result["run_id"]}), 500
+
+        return jsonify({"generated_outline": generated_outline, "usage": usage, "run_id": result["run_id"]})
+
+    except RunConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except AdmissionError as e:
+        return _admission_error(e)
+    except Exception as e:
+        return jsonify({"error": f"Error generating outline: {str(e)}"}), 500
+
+
+# API endpoint for the combined theme-to-outlines pipeline
+@app.route('/api/pipeline', methods=['POST'])
+def api_theme_to_outlines():
+    """Generate topics for a theme and an outline for every topic in one run."""
+    data = request.get_json()
+    if not data or 'theme' not in data:
+        return jsonify({"error": "Theme is required"}), 400
+
+    theme = data['theme']
+    num_topics = data.get('num_topics', DEFAULT_NUM_TOPICS)
+    target_audience = data.get('target_audience') or DEFAULT_AUDIENCE
+    budget, error = _budget_or_error(data)
+    if error:
+        return error
+    run_id, error = _run_id_or_error(data)
+    if error:
+        return error
+    tenant, error = _tenant_or_error()
+    if error:
+        return error
+
+    try:
+        result = run_theme_to_outlines(theme, num_topics, target_audience, bool(data.get('bypass_cache')), **budget,
+                                       run_id=run_id, tenant=tenant)
+        usage = summarize_usage(result.get("llm_usage"))
+        if result.get("error_message"):
+            return jsonify({"error": result["error_message"], "usage": usage, "run_id": result["run_id"]}), 500
+
+        return jsonify({
+            "generated_topics": result.get("generated_topics", []),
+            "generated_outlines": result.get("generated_outlines", []),
+            "usage": usage,
+            "run_id": result["run_id"],
+        })
+
+    except RunConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except AdmissionError as e:
+        return _admission_error(e)
+    except Exception as e:
+        return jsonify({"error": f"Error generating outlines: {str(e)}"}), 500
+
+
+# API endpoint for batch outline generation
+@app.route('/api/outlines/batch', methods=['POST'])
+def api_generate_outlines_batch():
+    """
+    Generate outlines for many (selected_topic, target_audience) pairs.
+
+    Items run on a bounded worker pool and results stream back as NDJSON in
+    completion order, each tagged with its position in the request. A failed
+    item produces an error event without stopping the rest of the batch.
+    ``max_tokens``/``max_cost`` budget the batch as a whole. Items take bulk
+    scheduler slots, so interactive requests go first.
+    """
+    data = request.get_json()
+    items = data.get('items') if data else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty list of items is required"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items are allowed per batch"}), 400
+    for item in items:
+        if not isinstance(item, dict) or 'selected_topic' not in item:
+            return jsonify({"error": "Each item requires a selected topic"}), 400
+
+    concurrency, error = _concurrency_or_error(data)
+    if error:
+        return error
+    skip_cache = bool(data.get('bypass_cache'))
+    budget, error = _budget_or_error(data)
+    if error:
+        return error
+    tenant, error = _tenant_or_error()
+    if error:
+        return error
+
+    def generate(item: Dict[str, Any]) -> Dict[str, Any]:
+        # Items only carry the batch's budget (through the context), not one of their own
+        result = run_outline_generation(item['selected_topic'], item.get('target_audience') or DEFAULT_AUDIENCE,
+                                        skip_cache, max_tokens=0, max_cost=0, endpoint="outlines/batch",
+                                        tenant=tenant, priority=BULK)
+        if result.get("error_message"):
+            raise ValueError(result["error_message"])
+        if not result.get("generated_outline"):
+            raise ValueError("Outline generation failed to produce an outline.")
+        return result["generated_outline"]
+
+    def events():
+        succeeded = 0
+        with track_usage("outlines/batch", **budget) as meter, \
+                ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="outline-batch") as pool:
+            futures = {pool.submit(contextvars.copy_context().run, generate, item): index
+                       for index, item in enumerate(items)}
+            for future in as_completed(futures):
+                index = futures[future]
+                selected_topic = items[index]['selected_topic']
+                try:
+                    outline = future.result()
+                except Exception as e:
+                    yield {"type": "error", "index": index, "selected_topic": selected_topic,
+                           "error": f"Error generating outline: {str(e)}"}
+                else:
+                    succeeded += 1
+                    yield {"type": "outline", "index": index, "selected_topic": selected_topic,
+                           "generated_outline": outline}
+        yield {"type": "done", "total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded,
+               "usage": meter.summary()}
+
+    return _ndjson_response(events())
+
+
+# API endpoint for runtime statistics
+@app.route('/api/stats', methods=['GET'])
+def api_stats():
+    """Report in-process counters such as LLM cache hits and misses."""
+    from llm_services import prompt_prefix_stats
+    from model_router import hedge_stats
+
+    cache = get_response_cache()
+    semantic_cache = get_semantic_cache()
+    workers = get_job_workers()
+    speculator = get_speculator()
+    scheduler = get_scheduler()
+    return jsonify({
+        "llm_cache": cache.stats() if cache else {"enabled": False},
+        "semantic_cache": semantic_cache.stats() if semantic_cache else {"enabled": False},
+        "singleflight": generation_flights.stats(),
+        "openrouter": get_openrouter_guard().stats(),
+        "model_latency": llm_latency.snapshot(),
+        "hedging": hedge_stats(),
+        "prompt_prefix": prompt_prefix_stats.stats(),
+        "usage": usage_stats.stats(),
+        "node_latency": node_latency.snapshot(),
+        "http_latency": http_latency.snapshot(),
+        "parse_latency": parse_latency.snapshot(),
+        "jobs": {**get_job_queue().stats(), "workers": workers.stats() if workers else None},
+        "speculative_outlines": speculator.stats() if speculator else {"enabled": False},
+        "scheduler": scheduler.stats() if scheduler else {"enabled": False},
+    })
+
+
+def _job_params(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a job submission and return the job's parameters, with the
+    defaults and budgets the synchronous endpoints would apply filled in.
+
+    Raises:
+        ValueError: With a message for the client if the submission is invalid.
+    """
+    job_type = data.get('type')
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"type must be one of {', '.join(JOB_TYPES)}")
+    if job_type == "outline":
+        if 'selected_topic' not in data or 'target_audience' not in data:
+            raise ValueError("Selected topic and target audience are required")
+        params = {"selected_topic": data['selected_topic'], "target_audience": data['target_audience']}
+    else:
+        if 'theme' not in data:
+            raise ValueError("Theme is required")
+        params = {"theme": data['theme'], "num_topics": data.get('num_topics', DEFAULT_NUM_TOPICS)}
+        if job_type == "pipeline":
+            params["target_audience"] = data.get('target_audience') or DEFAULT_AUDIENCE
+    try:
+        params.update(_request_budget(data))
+    except (TypeError, ValueError):
+        raise ValueError("max_tokens and max_cost must be non-negative numbers")
+    params["bypass_cache"] = bool(data.get('bypass_cache'))
+    return params
+
+
+def _job_workers_started() -> None:
+    # Workers start with the process (gunicorn's post_worker_init, __main__);
+    # this covers other servers, e.g. flask run
+    if get_job_workers() is None and not _draining.is_set():
+        start_job_workers()
+
+
+# Background job endpoints
+@app.route('/api/jobs', methods=['POST'])
+def api_submit_job():
+    """
+    Queue a topics, outline or pipeline run and return at once with its job id.
+
+    The body takes the fields of the matching synchronous endpoint plus
+    ``type`` and an optional integer ``priority`` (higher runs first).
+    Resubmitting with the same ``Idempotency-Key`` header (or
+    ``idempotency_key`` field) returns the original job instead of a new one.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "A job type is required"}), 400
+    try:
+        params = _job_params(data)
+        priority = data.get('priority')
+        if priority is None:
+            priority = 0
+        elif isinstance(priority, bool) or not isinstance(priority, int):
+            raise ValueError("priority must be an integer")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    tenant, error = _tenant_or_error()
+    if error:
+        return error
+    # Jobs run as bulk work of the tenant that submitted them
+    params["tenant"] = tenant
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+    _job_workers_started()
+    try:
+        job, created = get_job_queue().submit(data['type'], params, priority, idempotency_key)
+    except JobConflictError as e:
+        return jsonify({"error": str(e)}), 409
+
+    workers = get_job_workers()
+    if created and workers is not None:
+        workers.wake()
+    response = jsonify(job)
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response, 202 if created else 200
+
+
+@app.route('/api/jobs', methods=['GET'])
+def api_list_jobs():
+    """List the most recent jobs, optionally filtered by ``status``."""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"jobs": get_job_queue().list_jobs(request.args.get('status'), limit)})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id: str):
+    """Poll a job: its status, progress and, once finished, result or error and usage."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id: str):
+    """Cancel a queued or running job; cancelling a finished job changes nothing."""
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    workers = get_job_workers()
+    if workers is not None and workers.cancel_local(job_id):
+        job["cancel_requested"] = True
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def api_stream_job(job_id: str):
+    """
+    Stream a job's status and progress changes as NDJSON until it finishes;
+    the last event carries the finished job. ``interval`` sets the polling
+    interval in seconds (0.1 to 10, default 0.5).
+    """
+    queue = get_job_queue()
+    if queue.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    try:
+        interval = max(0.1, min(float(request.args.get('interval') or 0.5), 10.0))
+    except ValueError:
+        return jsonify({"error": "interval must be a number of seconds"}), 400
+
+    def events():
+        last: Optional[tuple] = None
+        while True:
+            job = queue.get(job_id)
+            if job is None:
+                yield {"type": "error", "error": "Job not found"}
+                return
+            if job["status"] in FINISHED:
+                yield {"type": "done", "job": job}
+                return
+            state = (job["status"], json.dumps(job["progress"]))
+            if state != last:
+                yield {"type": "status", "status": job["status"], "progress": job["progress"]}
+                last = state
+            time.sleep(interval)
+
+    return _ndjson_response(events())
+
+
+# Readiness probe
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Report whether this process accepts work: 503 once it is draining for shutdown."""
+    body = {"status": "draining" if _draining.is_set() else "ok", "inflight_llm_calls": inflight_calls.count}
+    return jsonify(body), 503 if _draining.is_set() else 200
+
+
+# Prometheus scrape endpoint
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Export the latency histograms (nodes, OpenRouter HTTP phases, parsing,
+    scheduler waits) and the scheduler's per-tenant queue depths in the Prometheus text format.
+    """
+    scheduler = get_scheduler()
+    body = render_prometheus() + (scheduler.render_prometheus() if scheduler else "")
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+def _ndjson_response(events) -> Response:
+    """Stream an iterable of event dicts as newline-delimited JSON."""
+    lines = (json.dumps(event) + "\n" for event in events)
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+
+def _stream_graph(graph, inputs, node: str, run_id: str):
+    """
+    Run a durable graph as run ``run_id``, yielding ("token", text) for the LLM
+    output of ``node`` as it streams and finally ("result", state) with the
+    graph's final state. A resumed run only streams the nodes it still runs.
+    """
+    graph_input, config, finished = plan_run(graph, inputs, run_id)
+    if finished is not None:
+        yield "result", finished
+        return
+    result = None
+    for mode, payload in graph.stream(graph_input, config, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == node and chunk.content:
+                yield "token", chunk.content
+        else:
+            result = payload
+    yield "result", result
+
+
+# Streaming API endpoint for topic ideation
+@app.route('/api/topics/stream', methods=['POST'])
+def api_stream_topics():
+    """Stream topics as NDJSON events, one as soon as each numbered line completes."""
+    data = request.get_json()
+    if not data or 'theme' not in data:
+        return jsonify({"error": "Theme is required"}), 400
+
+    num_topics = data.get('num_topics', DEFAULT_NUM_TOPICS)
+    budget, error = _budget_or_error(data)
+    if error:
+        return error
+    run_id, error = _run_id_or_error(data)
+    if error:
+        return error
+    tenant, error = _tenant_or_error()
+    if error:
+        return error
+    run_id = run_id or new_run_id()
+    inputs = TopicIdeationState(
+        original_theme=data['theme'],
+        num_suggestions=num_topics
+    )
+
+    def events():
+        parser = agents.TopicStreamParser(num_topics)
+        try:
+            with scheduled(tenant, INTERACTIVE), bypass_cache(bool(data.get('bypass_cache'))), \
+                    track_usage("topics/stream", **budget):
+                graph = agents.get_topic_ideation_graph(durable=True)
+                for kind, payload in _stream_graph(graph, inputs, "brainstorm_topics", run_id):
+                    if kind == "token":
+                        new_topics = parser.feed(payload)
+                    elif payload.get("error_message"):
+                        yield {"type": "error", "error": payload["error_message"],
+                               "usage": summarize_usage(payload.get("llm_usage")), "run_id": run_id}
+                        return
+                    else:
+                        new_topics = parser.close()
+                        if not parser.topics:
+                            # Topics served from the semantic cache never stream as tokens
+                            new_topics = list(payload.get("generated_topics") or [])
+                            parser.topics.extend(new_topics)
+                    for offset, topic in enumerate(new_topics):
+                        yield {"type": "topic", "index": len(parser.topics) - len(new_topics) + offset, "topic": topic}
+                    if kind == "result":
+                        _speculate(payload, tenant)
+                        yield {"type": "done", "generated_topics": payload.get("generated_topics", []),
+                               "usage": summarize_usage(payload.get("llm_usage")), "run_id": run_id}
+        except RunConflictError as e:
+            yield {"type": "error", "error": str(e)}
+        except AdmissionError as e:
+            yield {"type": "error", "error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            yield {"type": "error", "error": f"Error generating topics: {str(e)}", "run_id": run_id}
+
+    return _ndjson_response(events())
+
+
+# Streaming API endpoint for outline generation
+@app.route('/api/outline/stream', methods=['POST'])
+def api_stream_outline():
+    """Stream outline sections as NDJSON events as each one is parsed."""
+    data = request.get_json()
+    if not data or 'selected_topic' not in data or 'target_audience' not in data:
+        return jsonify({"error": "Selected topic and target audience are required"}), 400
+
+    budget, error = _budget_or_error(data)
+    if error:
+        return error
+    run_id, error = _run_id_or_error(data)
+    if error:
+        return error
+    tenant, error = _tenant_or_error()
+    if error:
+        return error
+    run_id = run_id or new_run_id()
+    inputs = OutlineGenerationState(
+        selected_topic=data['selected_topic'],
+        target_audience=data['target_audience']
+    )
+
+    def outline_events(speculated):
+        # A speculatively generated outline "streams" all at once
+        if speculated is not None:
+            yield "result", speculated
+            return
+        graph = agents.get_outline_generation_graph(durable=True)
+        yield from _stream_graph(graph, inputs, "generate_outline", run_id)
+
+    def events():
+        sections = agents.OutlineSectionStream()
+        speculator = get_speculator()
+        try:
+            speculated = None
+            if speculator is not None and not data.get('bypass_cache') and not data.get('run_id'):
+                speculated = speculator.lookup(data['selected_topic'], data['target_audience'])
+            # A speculative hit needs no slot
+            with scheduled(tenant, INTERACTIVE) if speculated is None else contextlib.nullcontext(), \
+                    bypass_cache(bool(data.get('bypass_cache'))), track_usage("outline/stream", **budget):
+                for kind, payload in outline_events(speculated):
+                    if kind == "token":
+                        new_sections = sections.feed(payload)
+                    elif payload.get("error_message") or not payload.get("generated_outline"):
+                        yield {"type": "error", "error": payload.get("error_message") or "Outline generation failed to produce an outline.",
+                               "usage": summarize_usage(payload.get("llm_usage")), "run_id": run_id}
+                        return
+                    else:
+                        new_sections = sections.close(payload["generated_outline"])
+                    for offset, section in enumerate(new_sections):
+                        yield {"type": "section", "index": sections.sections_emitted - len(new_sections) + offset, "section": section}
+                    if kind == "result":
+                        yield {"type": "done", "generated_outline": payload["generated_outline"],
+                               "usage": summarize_usage(payload.get("llm_usage")),
+                               "run_id": payload.get("run_id") or run_id}
+        except RunConflictError as e:
+            yield {"type": "error", "error": str(e)}
+        except AdmissionError as e:
+            yield {"type": "error", "error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            yield {"type": "error", "error": f"Error generating outline: {str(e)}", "run_id": run_id}
+
+    return _ndjson_response(events())
+
+
+if STARTUP_PRELOAD:
+    warm_up()
+
+
+if __name__ == "__main__":
+    # Development server. In production run gunicorn -c gunicorn.conf.py api:app
+    host, port = API_BIND.rsplit(":", 1)
+    warm_up()
+    start_job_workers()
+    try:
+        app.run(host=host, port=int(os.getenv("PORT") or port), threaded=True)
+    finally:
+        remaining = drain()
+        if remaining:
+            print(f"WARNING: exiting with {remaining} LLM calls still in flight")
@@ -3,18 +3,21 @@ Agentic Blog App - A Streamlit application for automated blog post planning.
 Uses LangChain and LangGraph to orchestrate a series of LLM-powered agents.
 """
 import streamlit as st
-import json
-from typing import List, Dict, Any
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from typing import Dict, Any, Union
 
-from states import TopicIdeationState, OutlineGenerationState
 from config import DEFAULT_NUM_TOPICS, DEFAULT_AUDIENCE
-from agents import create_topic_ideation_graph, create_outline_generation_graph
+from outlines import EXPORT_FORMATS, Outline
+
+
+# The API (and with it the graphs) is imported when a button first needs it,
+# so the page renders without loading Flask, LangGraph or LangChain
+def __getattr__(name):
+    # ``app`` is the Flask API from api.py, kept here so ``FLASK_APP=app.py`` keeps working
+    if name == "app":
+        from api import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
 
 # Initialize app state
 def init_session_state():
@@ -37,95 +40,17 @@ def init_session_state():
         st.session_state.outline_error = None
 
 
-# API endpoint for topic ideation
-@app.route('/api/topics', methods=['POST'])
-def api_generate_topics():
-    data = request.get_json()
-    if not data or 'theme' not in data:
-        return jsonify({"error": "Theme is required"}), 400
-
-    theme = data['theme']
-    num_topics = data.get('num_topics', DEFAULT_NUM_TOPICS)
-
-    # Create topic ideation graph
-    topic_graph = create_topic_ideation_graph()
-
-    # Prepare input state
-    inputs = TopicIdeationState(
-        original_theme=theme,
-        num_suggestions=num_topics
-    )
-
-    try:
-        # Execute the graph
-        result = topic_graph.invoke(inputs)
-        generated_topics = result.get("generated_topics", [])
-        error_message = result.get("error_message")
-
-        if error_message:
-            return jsonify({"error": error_message}), 500
-        
-        return jsonify({"generated_topics": generated_topics})
-
-    except Exception as e:
-        return jsonify({"error": f"Error generating topics: {str(e)}"}), 500
-
-
-# API endpoint for outline generation
-@app.route('/api/outline', methods=['POST'])
-def api_generate_outline():
-    data = request.get_json()
-    if not data or 'selected_topic' not in data or 'target_audience' not in data:
-        return jsonify({"error": "Selected topic and target audience are required"}), 400
-
-    selected_topic = data['selected_topic']
-    target_audience = data['target_audience']
-
-    # Create outline generation graph
-    outline_graph = create_outline_generation_graph()
-
-    # Prepare input state
-    inputs = OutlineGenerationState(
-        selected_topic=selected_topic,
-        target_audience=target_audience
-    )
-
-    try:
-        # Execute the graph
-        result = outline_graph.invoke(inputs)
-        generated_outline = result.get("generated_outline")
-        error_message = result.get("error_message")
-
-        if error_message:
-            return jsonify({"error": error_message}), 500
-        
-        if not generated_outline:
-             return jsonify({"error": "Outline generation failed to produce an outline."}), 500
-
-        return jsonify({"generated_outline": generated_outline})
-
-    except Exception as e:
-        return jsonify({"error": f"Error generating outline: {str(e)}"}), 500
-
-
 # Function to generate topics (Streamlit)
 def generate_topics_streamlit():
     """Generate topic ideas based on the theme for Streamlit."""
     st.session_state.topic_error = None
     
-    # Create topic ideation graph
-    topic_graph = create_topic_ideation_graph()
-    
-    # Prepare input state
-    inputs = TopicIdeationState(
-        original_theme=st.session_state.theme,
-        num_suggestions=st.session_state.num_topics
-    )
-    
     with st.spinner("Generating topic ideas..."):
         try:
+            from api import run_topic_ideation
+
             # Execute the graph
-            result = topic_graph.invoke(inputs)
+            result = run_topic_ideation(st.session_state.theme, st.session_state.num_topics)
             
             # Update session state with results
             st.session_state.generated_topics = result.get("generated_topics", [])
@@ -141,22 +66,16 @@ def generate_outline_streamlit():
     """Generate blog post outline for the selected topic for Streamlit."""
     st.session_state.outline_error = None
     
-    # Create outline generation graph
-    outline_graph = create_outline_generation_graph()
-    
-    # Prepare input state
-    inputs = OutlineGenerationState(
-        selected_topic=st.session_state.selected_topic,
-        target_audience=st.session_state.target_audience
-    )
-    
     with st.spinner("Generating blog outline..."):
         try:
+            from api import run_outline_generation
+
             # Execute the graph
-            result = outline_graph.invoke(inputs)
+            result = run_outline_generation(st.session_state.selected_topic, st.session_state.target_audience)
             
-            # Update session state with results
-            st.session_state.generated_outline = result.get("generated_outline")
+            # Update session state with results; the Outline keeps its exports across reruns
+            outline = result.get("generated_outline")
+            st.session_state.generated_outline = Outline.from_dict(outline) if outline else None
             st.session_state.outline_error = result.get("error_message")
             
         except Exception as e:
@@ -165,26 +84,11 @@ def generate_outline_streamlit():
 
 
 # Helper to format the outline for display
-def format_outline_display(outline: Dict[str, Any]) -> str:
-    """Format the outline JSON into readable markdown."""
+def format_outline_display(outline: Union[Outline, Dict[str, Any], None]) -> str:
+    """Format the outline into readable markdown, rendered once per Outline."""
     if not outline:
         return ""
-    
-    md = f"# {outline['title_suggestion']}\n\n"
-    md += f"## Introduction\n{outline['introduction_hook']}\n\n"
-    
-    for i, section in enumerate(outline['sections'], 1):
-        md += f"## {section['heading']}\n"
-        for point in section['key_points']:
-            md += f"- {point}\n"
-        md += "\n"
-    
-    md += f"## Conclusion\n{outline['conclusion_summary']}\n\n"
-    
-    if outline.get('call_to_action'):
-        md += f"### Call to Action\n{outline['call_to_action']}\n"
-    
-    return md
+    return Outline.coerce(outline).to_markdown()
 
 
 # Main app function
@@ -282,22 +186,18 @@ def main():
         
         # Display the outline
         if st.session_state.generated_outline:
-            st.markdown(format_outline_display(st.session_state.generated_outline))
-            
-            # Add export options
-            st.download_button(
-                label="Export Outline as JSON",
-                data=json.dumps(st.session_state.generated_outline, indent=2),
-                file_name="blog_outline.json",
-                mime="application/json"
-            )
+            outline = st.session_state.generated_outline
+            st.markdown(format_outline_display(outline))
             
-            st.download_button(
-                label="Export Outline as Markdown",
-                data=format_outline_display(st.session_state.generated_outline),
-                file_name="blog_outline.md",
-                mime="text/markdown"
-            )
+            # Add export options; each format is rendered once per outline, not on every rerun
+            for export_format, (name, mime, extension) in EXPORT_FORMATS.items():
+                st.download_button(
+                    label=f"Export Outline as {name}",
+                    data=outline.render(export_format),
+                    file_name=f"blog_outline.{extension}",
+                    mime=mime,
+                    key=f"export_{export_format}"
+                )
         elif not st.session_state.selected_topic:
             st.info("Select a topic from the left panel to generate an outline.")
 
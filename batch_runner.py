@@ -0,0 +1,242 @@
+"""
+Offline bulk runner for topic/outline jobs described in a JSONL file.
+
+Each input line is one job:
+    {"id": "job-1", "type": "topics", "theme": "...", "num_topics": 5}
+    {"id": "job-2", "type": "outline", "selected_topic": "...", "target_audience": "..."}
+    {"id": "job-3", "type": "pipeline", "theme": "...", "num_topics": 3, "target_audience": "..."}
+
+``type`` may be omitted when it is implied by ``theme``/``selected_topic``,
+and ``id`` defaults to ``request_id`` or the line number. The input is read
+line by line, results are appended to the output JSONL as each job finishes,
+and completed job IDs are checkpointed so a restarted run skips them. A line
+that isn't a JSON object gets an error record with id ``line-<N>``.
+
+Usage:
+    python batch_runner.py jobs.jsonl -o results.jsonl --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, Set, TextIO, Tuple, Union
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config import DEFAULT_NUM_TOPICS, DEFAULT_AUDIENCE
+from states import TopicIdeationState, OutlineGenerationState, ThemeToOutlinesState
+from llm_cache import bypass_cache
+from usage import track_usage
+from agents import get_topic_ideation_graph, get_outline_generation_graph, get_theme_to_outlines_graph
+
+
+class TokenCounter(BaseCallbackHandler):
+    """Sums the token usage OpenRouter reports for every LLM call in a run."""
+
+    # Called on the event loop thread, so plain integer updates are safe
+    run_inline = True
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = generation.generation_info or {}
+                self.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+                self.completion_tokens += usage.get("completion_tokens", 0) or 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class InvalidLine(ValueError):
+    """An input line that isn't a JSON object; reported as a failed job instead of stopping the run."""
+
+
+def iter_jobs(path: str) -> Iterator[Tuple[int, Union[Dict[str, Any], InvalidLine]]]:
+    """Yield ``(line_number, job)`` pairs without loading the whole file; malformed lines yield an InvalidLine."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, InvalidLine(f"Invalid JSON on line {line_number}: {e}")
+                continue
+            if not isinstance(job, dict):
+                yield line_number, InvalidLine(f"Line {line_number} is not a JSON object")
+                continue
+            yield line_number, job
+
+
+def job_id(line_number: int, job: Dict[str, Any]) -> str:
+    return str(job.get("id") or job.get("request_id") or f"line-{line_number}")
+
+
+def job_type(job: Dict[str, Any]) -> Optional[str]:
+    if job.get("type"):
+        return job["type"]
+    if "selected_topic" in job:
+        return "outline"
+    if "theme" in job:
+        return "topics"
+    return None
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Return the IDs of jobs completed by previous runs."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+async def run_job(job: Dict[str, Any], config: Dict[str, Any], model_name: Optional[str] = None) -> Dict[str, Any]:
+    """Execute one job against the shared compiled graphs and return its result fields."""
+    kind = job_type(job)
+    if kind == "topics":
+        result = await get_topic_ideation_graph(model_name).ainvoke(TopicIdeationState(
+            original_theme=job["theme"],
+            num_suggestions=job.get("num_topics", DEFAULT_NUM_TOPICS)
+        ), config)
+        fields = {"generated_topics": result.get("generated_topics")}
+    elif kind == "outline":
+        result = await get_outline_generation_graph(model_name).ainvoke(OutlineGenerationState(
+            selected_topic=job["selected_topic"],
+            target_audience=job.get("target_audience") or DEFAULT_AUDIENCE
+        ), config)
+        fields = {"generated_outline": result.get("generated_outline")}
+    elif kind == "pipeline":
+        result = await get_theme_to_outlines_graph(model_name).ainvoke(ThemeToOutlinesState(
+            original_theme=job["theme"],
+            num_suggestions=job.get("num_topics", DEFAULT_NUM_TOPICS),
+            target_audience=job.get("target_audience") or DEFAULT_AUDIENCE
+        ), config)
+        fields = {
+            "generated_topics": result.get("generated_topics"),
+            "generated_outlines": result.get("generated_outlines"),
+        }
+    else:
+        raise ValueError(f"Unknown job type: {job.get('type')!r}")
+
+    if result.get("error_message"):
+        raise ValueError(result["error_message"])
+    return fields
+
+
+class BatchRunner:
+    """Runs jobs with bounded concurrency, writing results and checkpoints incrementally."""
+
+    def __init__(self, output: TextIO, checkpoint: TextIO, concurrency: int = 4,
+                 model_name: Optional[str] = None, report_every: float = 5.0):
+        self.output = output
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.model_name = model_name
+        self.report_every = report_every
+        self.tokens = TokenCounter()
+        self.counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+        self._started = time.perf_counter()
+        self._last_report = self._started
+
+    async def run(self, jobs: Iterator[Tuple[int, Union[Dict[str, Any], InvalidLine]]],
+                  done_ids: Set[str]) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+
+        for line_number, job in jobs:
+            if isinstance(job, InvalidLine):
+                self.counts["failed"] += 1
+                self._write({"id": f"line-{line_number}", "status": "error", "error": str(job)})
+                continue
+            identifier = job_id(line_number, job)
+            if identifier in done_ids:
+                self.counts["skipped"] += 1
+                continue
+            # Wait for a free slot before reading further, so the file is consumed lazily
+            await semaphore.acquire()
+            task = asyncio.create_task(self._run_one(identifier, job))
+            task.add_done_callback(lambda _: semaphore.release())
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+        self.report(final=True)
+        return self.summary()
+
+    async def _run_one(self, identifier: str, job: Dict[str, Any]) -> None:
+        record = {"id": identifier, "type": job_type(job)}
+        with track_usage("batch_runner") as meter:
+            try:
+                record.update(status="ok", **await run_job(job, {"callbacks": [self.tokens]}, self.model_name))
+                self.counts["succeeded"] += 1
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                self.counts["failed"] += 1
+        record["usage"] = meter.summary()
+        self._write(record)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self.output.write(json.dumps(record) + "\n")
+        self.output.flush()
+        if record["status"] == "ok":
+            # Failed jobs are not checkpointed, so a restart retries them
+            self.checkpoint.write(record["id"] + "\n")
+            self.checkpoint.flush()
+
+        if time.perf_counter() - self._last_report >= self.report_every:
+            self.report()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        completed = self.counts["succeeded"] + self.counts["failed"]
+        return {
+            **self.counts,
+            "elapsed_seconds": round(elapsed, 2),
+            "jobs_per_second": round(completed / elapsed, 3) if elapsed else 0.0,
+            "tokens": self.tokens.total_tokens,
+            "tokens_per_second": round(self.tokens.total_tokens / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def report(self, final: bool = False) -> None:
+        self._last_report = time.perf_counter()
+        s = self.summary()
+        print(
+            f"[batch] {'finished' if final else 'progress'}: {s['succeeded']} ok, {s['failed']} failed, "
+            f"{s['skipped']} skipped | {s['jobs_per_second']} jobs/s, {s['tokens_per_second']} tokens/s",
+            file=sys.stderr,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run topic/outline jobs from a JSONL file.")
+    parser.add_argument("input", help="JSONL file with one job per line")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", help="file of completed job IDs (default: <output>.done)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="jobs in flight at once")
+    parser.add_argument("--model", help="model to use instead of the per-task routed models")
+    parser.add_argument("--bypass-cache", action="store_true", help="don't serve LLM responses from the cache")
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    checkpoint_path = args.checkpoint or f"{args.output}.done"
+    done_ids = load_checkpoint(checkpoint_path)
+
+    with open(args.output, "a", encoding="utf-8") as output, open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        runner = BatchRunner(output, checkpoint, max(1, args.concurrency), args.model, args.report_every)
+        with bypass_cache(args.bypass_cache):
+            summary = asyncio.run(runner.run(iter_jobs(args.input), done_ids))
+    print(json.dumps(summary))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
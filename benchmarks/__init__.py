@@ -0,0 +1 @@
+"""Benchmarks and local test doubles for the Agentic Blog App."""
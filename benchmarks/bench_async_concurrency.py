@@ -0,0 +1,48 @@
+"""Benchmark: in-flight LLM calls on a single thread via ainvoke.
+
+Every call waits on the fake server's simulated model latency, so with a
+non-blocking client the wall time stays close to one latency period no matter
+how many calls are in flight:
+    python benchmarks/bench_async_concurrency.py [concurrent_runs] [latency_seconds]
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+
+async def _run(graph, concurrency):
+    inputs = [{"original_theme": f"Theme {i}", "num_suggestions": 3} for i in range(concurrency)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(graph.ainvoke(state) for state in inputs))
+    elapsed = time.perf_counter() - start
+    failures = sum(1 for result in results if result.get("error_message"))
+    return elapsed, failures
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    server, url = start_fake_server(latency=latency)
+    os.environ["OPENROUTER_API_URL"] = url
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    from agents import get_topic_ideation_graph
+
+    threads_before = threading.active_count()
+    elapsed, failures = asyncio.run(_run(get_topic_ideation_graph(), concurrency))
+    server.shutdown()
+
+    print(f"{concurrency} concurrent topic runs, {latency:.2f}s simulated latency each")
+    print(f"wall time: {elapsed:.2f}s (serial would be {concurrency * latency:.0f}s), failures: {failures}")
+    print(f"client threads before run: {threads_before}")
+
+
+if __name__ == "__main__":
+    main()
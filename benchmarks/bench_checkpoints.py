@@ -0,0 +1,98 @@
+"""Benchmark: cost of checkpointing every node, and tokens saved by resuming.
+
+1. Mean time per outline run on the plain graph versus the durable one
+   (SQLite checkpoint after every node), with an instant fake model, so the
+   difference is all checkpointing overhead.
+2. An outline run that dies after ``generate_outline`` has paid for the
+   completion: restarting it buys the completion again, resuming doesn't.
+3. A pipeline run in which one outline fails: resuming it re-runs only the
+   topic stream and the failed outline.
+
+Tokens are counted at the local fake OpenRouter server:
+    python benchmarks/bench_checkpoints.py [runs]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+
+def _billed(server, since: int) -> tuple:
+    """(calls, total tokens) the fake server billed since ``since`` calls."""
+    log = server.usage_log[since:]
+    return len(log), sum(usage["total_tokens"] for usage in log)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    server, url = start_fake_server()
+    os.environ.update({
+        "OPENROUTER_API_URL": url,
+        "CHECKPOINT_PATH": os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite3"),
+        "LLM_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "METRICS_ENABLED": "false",
+    })
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    from agents import get_outline_generation_graph, get_theme_to_outlines_graph
+    from checkpointing import invoke_run
+
+    plain, durable = get_outline_generation_graph(), get_outline_generation_graph(durable=True)
+    timings = {}
+    for label, run in (("plain", lambda i: plain.invoke(inputs(i))),
+                       ("durable", lambda i: invoke_run(durable, inputs(i)))):
+        def inputs(i):
+            return {"selected_topic": f"Checkpoint overhead #{i}", "target_audience": "engineers"}
+        # Node banners would dominate the timings
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(-1)
+            started = time.perf_counter()
+            for i in range(runs):
+                run(i)
+            timings[label] = (time.perf_counter() - started) / runs * 1000
+    print(f"outline run, instant model ({runs} runs)")
+    print(f"  plain graph    {timings['plain']:6.2f}ms")
+    print(f"  durable graph  {timings['durable']:6.2f}ms  (+{timings['durable'] - timings['plain']:.2f}ms per run)")
+
+    # Crash after generate_outline: stop the run before format_outline
+    crashed = {"selected_topic": "Resuming interrupted runs", "target_audience": "engineers"}
+    config = {"configurable": {"thread_id": "crashed-outline"}}
+    with contextlib.closing(durable.stream(crashed, config, stream_mode="updates")) as updates:
+        next(updates)
+    start = len(server.usage_log)
+    plain.invoke(crashed)
+    restart = _billed(server, start)
+    start = len(server.usage_log)
+    resumed = invoke_run(durable, crashed, "crashed-outline")
+    resume = _billed(server, start)
+    print(f"\noutline interrupted after generate_outline ({'completed' if resumed.get('generated_outline') else 'FAILED'})")
+    print(f"  restart: {restart[0]} LLM calls, {restart[1]} tokens   resume: {resume[0]} LLM calls, {resume[1]} tokens")
+
+    # Pipeline with one outline failing
+    pipeline = get_theme_to_outlines_graph(durable=True)
+    theme = {"original_theme": "Durable pipelines", "num_suggestions": 5, "target_audience": "engineers"}
+    server.scripted_statuses = [200, 400]
+    start = len(server.usage_log)
+    first = invoke_run(pipeline, theme, "pipeline-run")
+    original = _billed(server, start)
+    start = len(server.usage_log)
+    resumed = invoke_run(pipeline, theme, "pipeline-run")
+    resume = _billed(server, start)
+    def ok(result):
+        outlines = result["generated_outlines"]
+        return f"{sum(bool(entry['generated_outline']) for entry in outlines)}/{len(outlines)}"
+    print(f"\npipeline, one outline failed ({ok(first)} outlines -> {ok(resumed)} after resuming)")
+    print(f"  restart: {original[0]} LLM calls, {original[1]} tokens   resume: {resume[0]} LLM calls, {resume[1]} tokens")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark: API cold start, memory per gunicorn worker and graceful drain.
+
+1. Import time and peak RSS of a fresh interpreter importing ``app`` (the
+   Streamlit module, which used to carry the API) versus ``api``.
+2. gunicorn with and without API_PRELOAD: seconds until /healthz answers,
+   then RSS, PSS (RSS with shared pages split between the processes sharing
+   them) and USS (memory private to the worker) per worker after some traffic.
+3. Drain: SIGTERM gunicorn while an outline request waits on the model and
+   check that it still completes.
+
+Runs against the local fake OpenRouter server; memory figures need Linux /proc:
+    python benchmarks/bench_cold_start.py [workers]
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+IMPORT_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(**overrides):
+    env = {**os.environ, **overrides}
+    env.setdefault("NON_REASONING_API_KEY", "fake")
+    return env
+
+
+def measure_import(module: str, runs: int = 5) -> dict:
+    """Median import seconds and peak RSS of ``runs`` fresh interpreters importing ``module``."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_PROBE, module], cwd=ROOT, env=_env(),
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    samples.sort(key=lambda sample: sample["seconds"])
+    return samples[len(samples) // 2]
+
+
+def memory_mb(pid: int) -> dict:
+    """RSS, PSS and USS of a process in MB, from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def _children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def start_gunicorn(openrouter_url: str, workers: int, preload: bool) -> tuple:
+    """Start gunicorn serving api:app; return (process, base URL, seconds until /healthz answered)."""
+    port = _free_port()
+    env = _env(OPENROUTER_API_URL=openrouter_url, API_BIND=f"127.0.0.1:{port}", API_WORKERS=str(workers),
+               API_PRELOAD="true" if preload else "false", LLM_CACHE_ENABLED="false",
+               SEMANTIC_CACHE_ENABLED="false", API_GRACEFUL_TIMEOUT="30")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "api:app"],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    while time.perf_counter() - started < 120:
+        try:
+            if requests.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return process, base_url, time.perf_counter() - started
+        except requests.RequestException:
+            # Not bound yet, or bound with no worker accepting yet
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("gunicorn did not come up")
+
+
+def _traffic(base_url: str, requests_count: int) -> None:
+    def send(index):
+        endpoint, body = (("/api/topics", {"theme": f"Remote work #{index}", "num_topics": 3})
+                          if index % 2 else
+                          ("/api/outline", {"selected_topic": f"Remote work habits #{index}",
+                                            "target_audience": "managers"}))
+        requests.post(base_url + endpoint, json=body, timeout=60).raise_for_status()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(send, range(requests_count)))
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    print("import (median of 5 fresh interpreters)")
+    for module, label in (("app", "app (Streamlit + API, before)"), ("api", "api (API only, after)")):
+        result = measure_import(module)
+        print(f"  {label:<32} {result['seconds'] * 1000:7.0f}ms  peak RSS {result['rss_mb']:6.1f}MB")
+
+    server, url = start_fake_server()
+    print(f"\ngunicorn, {workers} workers, after 200 requests")
+    for preload in (False, True):
+        process, base_url, ready = start_gunicorn(url, workers, preload)
+        _traffic(base_url, 200)
+        per_worker = [memory_mb(pid) for pid in _children(process.pid)]
+        master = memory_mb(process.pid)
+        mean = {key: sum(worker[key] for worker in per_worker) / len(per_worker) for key in ("rss", "pss", "uss")}
+        print(f"  preload={str(preload).lower():<5} ready in {ready:5.2f}s  per worker: RSS {mean['rss']:6.1f}MB "
+              f"PSS {mean['pss']:6.1f}MB USS {mean['uss']:6.1f}MB  "
+              f"total PSS {master['pss'] + mean['pss'] * len(per_worker):6.1f}MB")
+        process.terminate()
+        process.wait()
+
+    # Drain: stop the server while a slow outline request is in flight
+    server.latency = 2.0
+    process, base_url, _ = start_gunicorn(url, 1, True)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(requests.post, base_url + "/api/outline", timeout=60,
+                              json={"selected_topic": "Draining workers", "target_audience": "operators"})
+        time.sleep(0.5)
+        stopping = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        response = pending.result()
+    process.wait()
+    print(f"\ndrain: request in flight at SIGTERM answered {response.status_code} "
+          f"{'with' if response.json().get('generated_outline') else 'WITHOUT'} an outline; "
+          f"server exited {time.perf_counter() - stopping:.1f}s after SIGTERM")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Micro-benchmark: per-request graph construction vs. the compiled-graph registry.
+
+Run from the project root:
+    python benchmarks/bench_graph_registry.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import create_topic_ideation_graph, create_outline_generation_graph  # noqa: E402
+from agents.registry import get_topic_ideation_graph, get_outline_generation_graph, clear_graphs  # noqa: E402
+
+
+def _time_per_call(fn, iterations: int) -> float:
+    """Return the mean wall time of ``fn()`` in microseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    clear_graphs()
+
+    cases = [
+        ("topic_ideation", create_topic_ideation_graph, get_topic_ideation_graph),
+        ("outline_generation", create_outline_generation_graph, get_outline_generation_graph),
+    ]
+    print(f"{'workflow':<20} {'per-request build':>20} {'registry lookup':>18} {'speedup':>10}")
+    for name, build, lookup in cases:
+        before = _time_per_call(build, iterations)
+        lookup()  # first call compiles; exclude it from the steady-state number
+        after = _time_per_call(lookup, iterations)
+        print(f"{name:<20} {before:>17.1f} us {after:>15.2f} us {before / after:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
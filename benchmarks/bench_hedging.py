@@ -0,0 +1,75 @@
+"""Benchmark: tail latency with and without hedged requests.
+
+The fake primary model usually answers in 100ms but 5% of its calls stall for
+2s; the hedge model always takes 150ms. Hedging after the primary's p90
+should pull p99 down to roughly p90 + 150ms:
+    python benchmarks/bench_hedging.py [calls] [concurrency]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+PRIMARY, HEDGE = "fake/fast-but-spiky", "fake/steady"
+
+
+def _spiky_latency():
+    return 2.0 if random.random() < 0.05 else 0.1
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _run(llm, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await llm.ainvoke(f"Suggest blog topics #{i}")
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(i) for i in range(calls)))
+
+
+def _report(label, samples):
+    print(f"{label:<12} p50={_percentile(samples, 50) * 1000:6.0f}ms  "
+          f"p95={_percentile(samples, 95) * 1000:6.0f}ms  p99={_percentile(samples, 99) * 1000:6.0f}ms")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    random.seed(7)
+    server, url = start_fake_server(model_latency={PRIMARY: _spiky_latency, HEDGE: 0.15})
+    os.environ.update({
+        "OPENROUTER_API_URL": url,
+        "LLM_CACHE_ENABLED": "false",
+        "TOPIC_MODEL": PRIMARY,
+        "HEDGE_PERCENTILE": "90",
+        "HEDGE_MIN_SAMPLES": "20",
+    })
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    from llm_services import get_llm
+    from model_router import HedgedChatModel, hedge_stats
+
+    plain = get_llm(task="topics")
+    # Warm-up calls also fill the primary's latency histogram used for the deadline
+    _report("unhedged", asyncio.run(_run(plain, calls, concurrency)))
+    hedged = HedgedChatModel(primary=plain, hedge=get_llm(HEDGE))
+    _report("hedged", asyncio.run(_run(hedged, calls, concurrency)))
+    print(f"hedge stats: {hedge_stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
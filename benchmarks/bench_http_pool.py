@@ -0,0 +1,59 @@
+"""Benchmark: pooled keep-alive session vs. a fresh connection per LLM call.
+
+Runs against the local fake OpenRouter server, so no API key is spent:
+    python benchmarks/bench_http_pool.py [requests] [threads]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+from llm_services import get_http_session, close_http_session  # noqa: E402
+
+PAYLOAD = json.dumps({"model": "fake/model", "messages": [{"role": "user", "content": "hi"}]})
+HEADERS = {"Content-Type": "application/json", "Authorization": "Bearer fake"}
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _run(post, url, total, threads):
+    def one(_):
+        start = time.perf_counter()
+        response = post(url, headers=HEADERS, data=PAYLOAD, timeout=(5, 30))
+        response.json()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(one, range(total)))
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    server, url = start_fake_server()
+
+    results = {
+        "requests.post (no pool)": _run(requests.post, url, total, threads),
+        "shared session (pooled)": _run(get_http_session().post, url, total, threads),
+    }
+    close_http_session()
+    server.shutdown()
+
+    print(f"{total} requests, {threads} threads")
+    print(f"{'transport':<26} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, samples in results.items():
+        print(f"{name:<26} {_percentile(samples, 50):>8.2f} {_percentile(samples, 99):>8.2f} {statistics.mean(samples):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
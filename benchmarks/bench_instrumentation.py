@@ -0,0 +1,84 @@
+"""Benchmark: overhead of the timing instrumentation (node, HTTP phase and parse histograms).
+
+Runs the outline graph against the local fake OpenRouter server with zero
+model latency, once per process with METRICS_ENABLED=false and =true, so the
+difference is the instrumentation's cost per graph run:
+    python benchmarks/bench_instrumentation.py [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _measure(runs):
+    """Child process: time ``runs`` outline graph invocations and print the result as JSON."""
+    import contextlib
+    import io
+
+    from benchmarks.fake_openrouter import start_fake_server
+
+    with open(os.path.join(ROOT, "benchmarks", "data", "valid_outline.json"), encoding="utf-8") as f:
+        server, url = start_fake_server(content=f.read())
+    os.environ.update({"OPENROUTER_API_URL": url, "LLM_CACHE_ENABLED": "false"})
+    from agents import get_outline_generation_graph
+
+    graph = get_outline_generation_graph()
+    inputs = {"selected_topic": "Exploring the Ethics of AI in Creative Writing", "target_audience": "writers"}
+    # Silence the per-node progress prints, which would dominate the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph.invoke(inputs)  # warm up connections and imports
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            graph.invoke(inputs)
+            samples.append(time.perf_counter() - start)
+    server.shutdown()
+    samples.sort()
+    print(json.dumps({"median": samples[len(samples) // 2], "mean": sum(samples) / len(samples)}))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    results = {}
+    for enabled in ("false", "true"):
+        env = {**os.environ, "METRICS_ENABLED": enabled, "OTEL_ENABLED": "false"}
+        env.setdefault("NON_REASONING_API_KEY", "fake")
+        output = subprocess.run([sys.executable, __file__, "--child", str(runs)], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        results[enabled] = json.loads(output.strip().splitlines()[-1])
+        print(f"METRICS_ENABLED={enabled:<5}  median {results[enabled]['median'] * 1000:7.2f}ms  "
+              f"mean {results[enabled]['mean'] * 1000:7.2f}ms per outline graph run")
+
+    overhead = results["true"]["median"] - results["false"]["median"]
+    print(f"instrumentation overhead: {overhead * 1e6:+.0f}us per run "
+          f"({overhead / results['false']['median']:+.1%}); real runs take seconds, so this is noise")
+
+    # Cost of the primitives themselves, in-process
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+    from tracing import node_latency, timed_node
+
+    def node(state):
+        return state
+
+    calls = 200000
+    for label, fn in (("bare node", node), ("timed node", timed_node("bench", node))):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn({})
+        print(f"{label:<12} {(time.perf_counter() - start) / calls * 1e9:6.0f}ns per call")
+    start = time.perf_counter()
+    for _ in range(calls):
+        node_latency.observe(0.001, "bench")
+    print(f"{'observe':<12} {(time.perf_counter() - start) / calls * 1e9:6.0f}ns per call")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        _measure(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,131 @@
+"""Benchmark: background jobs (/api/jobs) against synchronous generation.
+
+With the fake server answering every LLM call after ``latency`` seconds:
+1. Submit latency of POST /api/jobs versus the blocking /api/outline.
+2. Throughput of the job workers draining a burst of outline jobs.
+3. Priorities, idempotency keys and cancellation of a streaming job.
+4. Recovery: a job leased to a worker that died is picked up again once its
+   lease lapses.
+
+Runs in-process with Flask's test client and a throwaway queue file:
+    python benchmarks/bench_job_queue.py [jobs] [latency_seconds] [job_workers]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+
+def _outline_job(index: int, **extra) -> dict:
+    return {"type": "outline", "selected_topic": f"Background jobs #{index}", "target_audience": "engineers",
+            **extra}
+
+
+def _wait(client, job_id: str, statuses=("succeeded", "failed", "cancelled"), timeout: float = 120) -> dict:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise RuntimeError(f"job {job_id} still {job['status']} after {timeout}s")
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    server, url = start_fake_server(latency=latency)
+    os.environ.update({
+        "OPENROUTER_API_URL": url,
+        "JOB_QUEUE_PATH": os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"),
+        "JOB_WORKERS": str(workers),
+        "JOB_LEASE_SECONDS": "3",
+        "JOB_POLL_INTERVAL": "0.2",
+        "LLM_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+    })
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    import api
+    from job_queue import get_job_queue, start_job_workers
+
+    client = api.app.test_client()
+    api.warm_up()
+    start_job_workers()
+
+    # 1. Submit latency vs. a synchronous request
+    started = time.perf_counter()
+    client.post("/api/outline", json={"selected_topic": "Synchronous outline", "target_audience": "engineers"})
+    sync_seconds = time.perf_counter() - started
+
+    submit_ms, ids = [], []
+    burst_started = time.perf_counter()
+    for index in range(jobs):
+        started = time.perf_counter()
+        response = client.post("/api/jobs", json=_outline_job(index))
+        submit_ms.append((time.perf_counter() - started) * 1000)
+        ids.append(response.get_json()["id"])
+    print(f"{latency:.1f}s model latency")
+    print(f"  POST /api/outline (blocking)  {sync_seconds * 1000:8.0f}ms")
+    print(f"  POST /api/jobs (x{jobs})        p50 {statistics.median(submit_ms):6.2f}ms  "
+          f"max {max(submit_ms):6.2f}ms")
+
+    # 2. Throughput
+    finished = [_wait(client, job_id) for job_id in ids]
+    elapsed = time.perf_counter() - burst_started
+    succeeded = sum(job["status"] == "succeeded" for job in finished)
+    print(f"  {jobs} outline jobs on {workers} workers: {elapsed:.1f}s "
+          f"({jobs / elapsed:.2f} jobs/s, serial would take {jobs * sync_seconds:.0f}s), {succeeded} succeeded")
+
+    # 3a. Priorities: with every worker busy, a high-priority job overtakes earlier low-priority ones
+    low = [client.post("/api/jobs", json=_outline_job(1000 + index)).get_json()["id"] for index in range(workers * 2)]
+    high = client.post("/api/jobs", json=_outline_job(2000, priority=10)).get_json()["id"]
+    finished_at = {job_id: _wait(client, job_id)["finished_at"] for job_id in low + [high]}
+    overtaken = sum(finished_at[job_id] > finished_at[high] for job_id in low)
+    print(f"\npriority: high-priority job finished ahead of {overtaken}/{len(low)} earlier low-priority jobs")
+
+    # 3b. Idempotency
+    first = client.post("/api/jobs", json=_outline_job(3000), headers={"Idempotency-Key": "bench-1"})
+    again = client.post("/api/jobs", json=_outline_job(3000), headers={"Idempotency-Key": "bench-1"})
+    other = client.post("/api/jobs", json=_outline_job(3001), headers={"Idempotency-Key": "bench-1"})
+    print(f"idempotency: first {first.status_code}, retry {again.status_code} "
+          f"({'same' if first.get_json()['id'] == again.get_json()['id'] else 'DIFFERENT'} job), "
+          f"different body {other.status_code}")
+    _wait(client, first.get_json()["id"])
+
+    # 3c. Cancellation while the model streams slowly
+    server.latency, server.token_latency = 0.0, 0.05
+    job_id = client.post("/api/jobs", json=_outline_job(4000, bypass_cache=True)).get_json()["id"]
+    _wait(client, job_id, statuses=("running",))
+    time.sleep(1.0)
+    started = time.perf_counter()
+    client.post(f"/api/jobs/{job_id}/cancel")
+    cancelled = _wait(client, job_id)
+    print(f"cancellation: {cancelled['status']} {(time.perf_counter() - started) * 1000:.0f}ms after the request, "
+          f"{cancelled['usage']['total_tokens']} tokens used")
+    server.token_latency = 0.0
+
+    # 4. Recovery from a dead worker: lease a job to a worker that never runs it
+    server.latency = latency
+    queue = get_job_queue()
+    orphan = client.post("/api/jobs", json=_outline_job(5000, priority=100)).get_json()["id"]
+    claimed = queue.claim("dead-worker")
+    started = time.perf_counter()
+    recovered = _wait(client, orphan)
+    print(f"recovery: job leased to a dead worker ({'claimed' if claimed and claimed['id'] == orphan else 'MISSED'}) "
+          f"{recovered['status']} after {time.perf_counter() - started:.1f}s, attempts {recovered['attempts']}")
+
+    print(f"\nstats: {client.get('/api/stats').get_json()['jobs']}")
+    api.drain(10)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark: rendering and serializing large outlines for display and export.
+
+The Streamlit page used to rebuild the Markdown with repeated ``+=`` twice on
+every rerun (once for the view, once for the download button) and
+``json.dumps`` the outline dict for the JSON download. Now the session keeps
+an ``Outline``, whose exports are each rendered in one pass on first use and
+cached. Reports single-render throughput per format and the cost of one
+page rerun that shows the outline and offers the downloads:
+    python benchmarks/bench_outline_export.py [sections] [points_per_section] [reruns]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outlines import Outline  # noqa: E402
+
+
+def _large_outline(num_sections, num_points):
+    return {
+        "title_suggestion": "A Very Long Outline",
+        "introduction_hook": "Start with a surprising statistic about the topic.",
+        "sections": [
+            {
+                "heading": f"Section {i}: an aspect of the topic worth covering",
+                "key_points": [f"Key point {j} of section {i}, explained in a full sentence & <em>tagged</em>."
+                               for j in range(num_points)],
+            }
+            for i in range(num_sections)
+        ],
+        "conclusion_summary": "Summarize the main ideas and why they matter.",
+        "call_to_action": "Subscribe for more.",
+    }
+
+
+def concatenated_markdown(outline):
+    """The previous ``format_outline_display``."""
+    md = f"# {outline['title_suggestion']}\n\n"
+    md += f"## Introduction\n{outline['introduction_hook']}\n\n"
+    for i, section in enumerate(outline['sections'], 1):
+        md += f"## {section['heading']}\n"
+        for point in section['key_points']:
+            md += f"- {point}\n"
+        md += "\n"
+    md += f"## Conclusion\n{outline['conclusion_summary']}\n\n"
+    if outline.get('call_to_action'):
+        md += f"### Call to Action\n{outline['call_to_action']}\n"
+    return md
+
+
+def _best_ms(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    num_sections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    num_points = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    reruns = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    data = _large_outline(num_sections, num_points)
+    markdown = concatenated_markdown(data)
+    assert Outline.from_dict(data).to_markdown() == markdown
+    print(f"outline: {num_sections} sections x {num_points} points, {len(markdown) / 1e6:.2f} MB of Markdown")
+
+    # One uncached render of each format
+    outline = Outline.from_dict(data)
+
+    def uncached(render):
+        def fn():
+            outline._exports.clear()
+            return render()
+        return fn
+
+    renders = {
+        "markdown +=": lambda: concatenated_markdown(data),
+        "markdown one pass": uncached(outline.to_markdown),
+        "json.dumps(dict)": lambda: json.dumps(data, indent=2),
+        "Outline.to_json": uncached(outline.to_json),
+        "Outline.to_html": uncached(outline.to_html),
+    }
+    for label, fn in renders.items():
+        ms = _best_ms(fn)
+        print(f"  {label:<18} {ms:8.2f}ms  {len(fn()) / 1e6 / ms * 1000:7.1f} MB/s")
+    print(f"  {'Outline.from_dict':<18} {_best_ms(lambda: Outline.from_dict(data)):8.2f}ms")
+
+    # A rerun shows the Markdown and offers the downloads
+    def legacy_reruns():
+        for _ in range(reruns):
+            concatenated_markdown(data)
+            json.dumps(data, indent=2)
+            concatenated_markdown(data)
+
+    def cached_reruns():
+        outline = Outline.from_dict(data)
+        for _ in range(reruns):
+            outline.to_markdown()
+            outline.to_json()
+            outline.to_markdown()
+            outline.to_html()
+
+    legacy, cached = _best_ms(legacy_reruns, 3), _best_ms(cached_reruns, 3)
+    print(f"\n{reruns} page reruns showing the outline with its downloads")
+    print(f"  dicts, rendered every rerun      {legacy:8.1f}ms  ({legacy / reruns:.2f}ms per rerun)")
+    print(f"  Outline, rendered once (+HTML)   {cached:8.1f}ms  ({cached / reruns:.3f}ms per rerun)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: CPU time to parse a streamed outline, incremental vs. re-parse per chunk.
+
+The previous approach re-parsed the whole buffer with ``parse_json_markdown``
+on every chunk to find finished sections, then parsed the complete text again
+with ``JsonOutputParser`` and validated it a second time with ``BlogOutline``.
+That cost grows much faster than the outline, so it is only timed on a small
+one; the incremental parser is also timed on a large outline to show it
+stays linear:
+    python benchmarks/bench_outline_parse.py [sections] [chunk_chars]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+from langchain_core.output_parsers import JsonOutputParser  # noqa: E402
+from langchain_core.utils.json import parse_json_markdown  # noqa: E402
+
+from agents.outline_agent import BlogOutline, OutlineStreamParser  # noqa: E402
+
+
+def _large_outline(num_sections):
+    return "```json\n" + json.dumps({
+        "title_suggestion": "A Very Long Outline",
+        "introduction_hook": "Start with a surprising statistic about the topic.",
+        "sections": [
+            {
+                "heading": f"Section {i}: an aspect of the topic worth covering",
+                "key_points": [f"Key point {j} of section {i}, explained in a full sentence." for j in range(6)],
+            }
+            for i in range(num_sections)
+        ],
+        "conclusion_summary": "Summarize the main ideas and why they matter.",
+        "call_to_action": "Subscribe for more.",
+    }, indent=2) + "\n```"
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def reparse_per_chunk(chunks):
+    buffer, emitted = "", 0
+    for chunk in chunks:
+        buffer += chunk
+        try:
+            sections = (parse_json_markdown(buffer) or {}).get("sections") or []
+        except Exception:
+            continue
+        emitted = max(emitted, len(sections) - 1)
+    outline = JsonOutputParser(pydantic_object=BlogOutline).invoke(buffer)
+    BlogOutline(**outline)
+    return outline
+
+
+def incremental(chunks):
+    parser = OutlineStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def _cpu_ms(fn, chunks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(chunks)
+        best = min(best, time.process_time() - start)
+    return best * 1000
+
+
+def main():
+    num_sections = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    chunk_chars = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    text = _large_outline(num_sections)
+    chunks = _chunks(text, chunk_chars)
+    assert incremental(chunks) == reparse_per_chunk(chunks)
+
+    old = _cpu_ms(reparse_per_chunk, chunks, 1)
+    new = _cpu_ms(incremental, chunks, 10)
+    print(f"{num_sections} sections, {len(text)} chars in {len(chunks)} chunks of {chunk_chars}")
+    print(f"re-parse per chunk + validate twice: {old:8.1f} ms CPU")
+    print(f"incremental, validate once:          {new:8.1f} ms CPU ({old / new:.0f}x less)")
+
+    for large in (50, 200):
+        large_text = _large_outline(large)
+        large_ms = _cpu_ms(incremental, _chunks(large_text, chunk_chars), 5)
+        print(f"incremental, {large} sections ({len(large_text)} chars): {large_ms:8.1f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
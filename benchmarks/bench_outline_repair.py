@@ -0,0 +1,89 @@
+"""Benchmark: tokens and seconds saved by repairing malformed outlines instead of regenerating them.
+
+Replays the recorded malformed responses in benchmarks/data/malformed_outlines.jsonl
+through the outline graph twice: once with the repair stage (local fix-up,
+then a targeted LLM repair of just the broken part) and once regenerating
+the whole outline as soon as anything is wrong. The fake model streams at a
+fixed rate, so seconds scale with generated tokens:
+    python benchmarks/bench_outline_repair.py [seconds_per_chunk]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def _load_corpus():
+    with open(os.path.join(DATA_DIR, "malformed_outlines.jsonl"), encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    with open(os.path.join(DATA_DIR, "valid_outline.json"), encoding="utf-8") as f:
+        valid = f.read()
+    return cases, valid
+
+
+def _regenerate_on_defects(state):
+    """Routing used for the baseline: any defect means a full regeneration."""
+    if state.get("outline_defects"):
+        return "generate_outline"
+    return outline_agent.route_after_repair(state)
+
+
+def _run(graph, server, contents):
+    server.script_contents(contents)
+    first = len(server.usage_log)
+    start = time.perf_counter()
+    result = graph.invoke({"selected_topic": "The impact of remote work on team collaboration",
+                           "target_audience": "engineering managers"})
+    elapsed = time.perf_counter() - start
+    # Drop scripted responses the run didn't use
+    server.scripted_contents.clear()
+    tokens = sum(usage["total_tokens"] for usage in server.usage_log[first:])
+    return result, tokens, elapsed
+
+
+def main():
+    global outline_agent
+    seconds_per_chunk = float(sys.argv[1]) if len(sys.argv) > 1 else 0.002
+
+    server, url = start_fake_server(token_latency=seconds_per_chunk)
+    os.environ.update({"OPENROUTER_API_URL": url, "LLM_CACHE_ENABLED": "false"})
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    from agents import outline_agent
+    repairing = outline_agent.create_outline_generation_graph()
+    outline_agent.route_after_generate, original = _regenerate_on_defects, outline_agent.route_after_generate
+    regenerating = outline_agent.create_outline_generation_graph()
+    outline_agent.route_after_generate = original
+
+    cases, valid = _load_corpus()
+    print(f"{'case':<32} {'strategy':<14} {'repair':>14} {'regenerate':>14}")
+    totals = [0, 0.0, 0, 0.0]
+    for case in cases:
+        # Repair responses only get used by the repair run; the baseline gets the valid outline
+        repair_contents = [case["response"]] + ([case["repair"]] if case.get("repair") else []) + [valid]
+        result, repair_tokens, repair_seconds = _run(repairing, server, repair_contents)
+        assert result.get("generated_outline"), result.get("error_message")
+        strategy = ",".join(entry["strategy"] for entry in result.get("outline_repairs") or []) or (
+            "regenerate" if result.get("outline_attempts", 1) > 1 else "lenient parse")
+
+        result, base_tokens, base_seconds = _run(regenerating, server, [case["response"], valid])
+        assert result.get("generated_outline"), result.get("error_message")
+
+        totals = [totals[0] + repair_tokens, totals[1] + repair_seconds, totals[2] + base_tokens, totals[3] + base_seconds]
+        print(f"{case['name']:<32} {strategy:<14} {repair_tokens:>6} tok {repair_seconds:4.2f}s "
+              f"{base_tokens:>6} tok {base_seconds:4.2f}s")
+
+    print(f"{'total':<32} {'':<14} {totals[0]:>6} tok {totals[1]:4.2f}s {totals[2]:>6} tok {totals[3]:4.2f}s")
+    print(f"repairs saved {totals[2] - totals[0]} tokens ({1 - totals[0] / totals[2]:.0%}) "
+          f"and {totals[3] - totals[1]:.2f}s ({1 - totals[1] / totals[3]:.0%})")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark: building outline/topic request messages, per call vs. precompiled.
+
+Previously every outline request constructed a JsonOutputParser, regenerated
+its format instructions and re-formatted the system prompt:
+    python benchmarks/bench_prompt_build.py [calls]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+from langchain_core.messages import HumanMessage, SystemMessage  # noqa: E402
+from langchain_core.output_parsers import JsonOutputParser  # noqa: E402
+
+from agents.outline_agent import BlogOutline, _build_outline_messages  # noqa: E402
+from agents.topic_agent import _build_topic_messages  # noqa: E402
+from prompts import OUTLINE_GENERATION_SYSTEM_PROMPT, OUTLINE_GENERATION_HUMAN_PROMPT  # noqa: E402
+
+STATE = {"selected_topic": "Exploring the Ethics of AI in Creative Writing", "target_audience": "writers"}
+
+
+def per_call(state):
+    parser = JsonOutputParser(pydantic_object=BlogOutline)
+    return [
+        SystemMessage(content=OUTLINE_GENERATION_SYSTEM_PROMPT.format(format_instructions=parser.get_format_instructions())),
+        HumanMessage(content=OUTLINE_GENERATION_HUMAN_PROMPT.format(topic=state["selected_topic"], audience=state["target_audience"])),
+    ]
+
+
+def _us_per_call(fn, state, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(state)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    assert [m.content for m in per_call(STATE)] == [m.content for m in _build_outline_messages(STATE)]
+
+    print(f"outline messages, built per call:  {_us_per_call(per_call, STATE, calls):8.1f} us")
+    print(f"outline messages, precompiled:     {_us_per_call(_build_outline_messages, STATE, calls):8.1f} us")
+    topic_state = {"original_theme": "Remote work", "num_suggestions": 5}
+    print(f"topic messages, precompiled:       {_us_per_call(_build_topic_messages, topic_state, calls):8.1f} us")
+
+    first, second = _build_topic_messages(topic_state), _build_topic_messages({**topic_state, "num_suggestions": 7})
+    print(f"topic system prompt shared across num_suggestions: {first[0] is second[0]}")
+
+
+if __name__ == "__main__":
+    main()
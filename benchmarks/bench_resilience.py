@@ -0,0 +1,88 @@
+"""Scenarios: rate limiting, retries and circuit breaking against injected failures.
+
+Runs against the local fake OpenRouter server, so no API key is spent:
+    python benchmarks/bench_resilience.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+
+def _use_guard(**kwargs):
+    """Install a fresh guard so each scenario starts with empty buckets and a closed circuit."""
+    import resilience
+    resilience._guard = resilience.OpenRouterGuard(**kwargs)
+    return resilience._guard
+
+
+def _call(llm):
+    start = time.perf_counter()
+    try:
+        llm.invoke("Suggest blog topics")
+        outcome = "ok"
+    except Exception as e:
+        outcome = type(e).__name__
+    return outcome, time.perf_counter() - start
+
+
+def throttled_then_ok(llm, server):
+    """Two 429s with Retry-After, then success: the caller only sees the success."""
+    guard = _use_guard(max_attempts=4, base_delay=0.05)
+    server.retry_after = 0.2
+    server.script_statuses([429, 429])
+    outcome, elapsed = _call(llm)
+    server.retry_after = None
+    print(f"429 x2 then 200: {outcome} after {elapsed:.2f}s (Retry-After honoured), stats={guard.stats()}")
+
+
+def outage_opens_circuit(llm, server):
+    """A hard outage trips the breaker; later calls fail fast without reaching the server."""
+    guard = _use_guard(max_attempts=3, base_delay=0.02, failure_threshold=5, recovery_timeout=0.5)
+    server.error_status, server.error_rate = 503, 1.0
+    seen_before = server.requests_seen
+    outcomes = [_call(llm) for _ in range(6)]
+    sent = server.requests_seen - seen_before
+    print(f"503 outage: outcomes={[o for o, _ in outcomes]}, requests reaching server={sent}, "
+          f"fast-fail latency={outcomes[-1][1] * 1000:.1f}ms")
+
+    server.error_rate = 0.0
+    time.sleep(0.6)
+    outcome, _ = _call(llm)
+    print(f"after recovery window: {outcome}, circuit={guard.breaker.state}, stats={guard.stats()}")
+
+
+def rate_limited_burst(llm, server, requests_per_minute=600, total=30):
+    """A burst larger than the bucket is spread out instead of drawing 429s."""
+    guard = _use_guard(requests_per_minute=requests_per_minute)
+    guard.request_bucket.capacity = guard.request_bucket._tokens = 10
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=total) as pool:
+        outcomes = [o for o, _ in pool.map(lambda _: _call(llm), range(total))]
+    elapsed = time.perf_counter() - start
+    print(f"{total} calls at {requests_per_minute}/min with a burst of 10: {elapsed:.2f}s "
+          f"(expected ~{(total - 10) * 60 / requests_per_minute:.1f}s), ok={outcomes.count('ok')}, "
+          f"stats={guard.stats()}")
+
+
+def main():
+    server, url = start_fake_server()
+    os.environ["OPENROUTER_API_URL"] = url
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    from llm_services import get_llm
+
+    llm = get_llm()
+    llm.use_cache = False
+    throttled_then_ok(llm, server)
+    outage_opens_circuit(llm, server)
+    rate_limited_burst(llm, server)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark: interactive latency and bulk fairness with and without the fair scheduler.
+
+Two bulk tenants share the API with interactive users. "heavy" sends four
+outline batches at once, "light" one; meanwhile two users keep requesting
+topics under their own key. The fake provider completes at most a few
+requests at a time and queues the rest, so without scheduling every caller
+waits in the same provider queue. The run reports topic latency while the
+batches run and when each bulk tenant's batches finished.
+
+Each mode runs in a fresh process against the local fake OpenRouter server:
+    python benchmarks/bench_scheduler.py [items_per_batch] [provider_capacity] [latency_seconds]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import start_fake_server  # noqa: E402
+
+TENANTS = {
+    "key-heavy": {"name": "heavy"},
+    "key-light": {"name": "light"},
+    "key-web": {"name": "web"},
+}
+BATCHES = {"heavy": 4, "light": 1}
+USERS = 2
+
+
+def _limited_capacity(capacity: int, latency: float):
+    """A latency sampler that lets ``capacity`` requests be served at once; the rest wait their turn."""
+    slots = threading.Semaphore(capacity)
+
+    def serve() -> float:
+        with slots:
+            time.sleep(latency)
+        return 0.0
+    return serve
+
+
+def run_phase(items: int, capacity: int, latency: float) -> dict:
+    """Run the workload in this process and return topic latencies and batch finish times."""
+    server, url = start_fake_server(latency=_limited_capacity(capacity, latency))
+    os.environ.update({"OPENROUTER_API_URL": url, "LLM_CACHE_ENABLED": "false", "SEMANTIC_CACHE_ENABLED": "false"})
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    import api
+
+    client = api.app.test_client()
+    api.warm_up()
+    keys = {spec["name"]: key for key, spec in TENANTS.items()}
+    started = time.perf_counter()
+    finished = {}
+    done = threading.Event()
+
+    def batch(tenant: str, index: int) -> None:
+        body = {"items": [{"selected_topic": f"{tenant} batch {index} item {item}"} for item in range(items)],
+                "concurrency": 4}
+        response = client.post("/api/outlines/batch", json=body, headers={"X-API-Key": keys[tenant]})
+        summary = json.loads(response.get_data(as_text=True).strip().splitlines()[-1])
+        assert summary["failed"] == 0, summary
+        finished.setdefault(tenant, []).append(time.perf_counter() - started)
+
+    def user(index: int) -> list:
+        latencies, request = [], 0
+        while not done.is_set():
+            request_started = time.perf_counter()
+            response = client.post("/api/topics", json={"theme": f"User {index} theme {request}", "num_topics": 3},
+                                   headers={"X-API-Key": keys["web"]})
+            assert response.status_code == 200, response.get_json()
+            latencies.append(time.perf_counter() - request_started)
+            request += 1
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=sum(BATCHES.values()) + USERS) as pool:
+        users = [pool.submit(user, index) for index in range(USERS)]
+        batches = [pool.submit(batch, tenant, index) for tenant, count in BATCHES.items() for index in range(count)]
+        for future in batches:
+            future.result()
+        done.set()
+        latencies = [latency for future in users for latency in future.result()]
+    server.shutdown()
+    return {"latencies": latencies, "finished": finished}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--phase":
+        print(json.dumps(run_phase(int(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4]))))
+        return
+
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    capacity = sys.argv[2] if len(sys.argv) > 2 else "6"
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+
+    print(f"heavy: {BATCHES['heavy']} batches, light: {BATCHES['light']} batch, {items} outlines each; "
+          f"{USERS} topic users; provider serves {capacity} requests at a time, {latency:.1f}s each")
+    for enabled in ("false", "true"):
+        env = {**os.environ, "SCHEDULER_ENABLED": enabled, "TENANTS": json.dumps(TENANTS),
+               "SCHEDULER_CONCURRENCY": "8", "SCHEDULER_BULK_CONCURRENCY": "6", "METRICS_ENABLED": "false",
+               "CHECKPOINT_PATH": os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite3")}
+        command = [sys.executable, os.path.abspath(__file__), "--phase", str(items), capacity, str(latency)]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        latencies = sorted(result["latencies"])
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        finished = {tenant: max(times) for tenant, times in result["finished"].items()}
+        print(f"  scheduler {'on ' if enabled == 'true' else 'off'}  topics p50 {statistics.median(latencies):5.2f}s  "
+              f"p95 {p95:5.2f}s ({len(latencies)} requests)  light done {finished['light']:5.1f}s  "
+              f"heavy done {finished['heavy']:5.1f}s")
+
+
+if __name__ == "__main__":
+    main()
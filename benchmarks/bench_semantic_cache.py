@@ -0,0 +1,59 @@
+"""Benchmark: semantic theme cache lookup latency at scale.
+
+Fills a SemanticThemeCache with synthetic themes and times lookups:
+    python benchmarks/bench_semantic_cache.py [entries] [lookups]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticThemeCache  # noqa: E402
+
+SUBJECTS = ["AI", "remote work", "sustainable living", "personal finance", "cloud computing", "nutrition",
+            "cybersecurity", "travel", "parenting", "climate change", "startups", "photography", "gaming"]
+CONTEXTS = ["education", "healthcare", "small businesses", "students", "retirees", "developers",
+            "marketing", "manufacturing", "city life", "the workplace", "rural communities"]
+ANGLES = ["trends", "myths", "beginner guide", "case studies", "tools", "ethics", "future", "mistakes"]
+
+
+def _themes(count, rng):
+    for i in range(count):
+        yield f"{rng.choice(ANGLES)} of {rng.choice(SUBJECTS)} in {rng.choice(CONTEXTS)} {i}"
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    rng = random.Random(42)
+
+    cache = SemanticThemeCache(capacity=entries)
+    topics = [f"Topic {i}" for i in range(5)]
+    start = time.perf_counter()
+    for theme in _themes(entries, rng):
+        cache.add(theme, topics)
+    fill_seconds = time.perf_counter() - start
+
+    queries = list(_themes(lookups, rng))
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        cache.lookup(query, 5)
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    stats = cache.stats()
+    print(f"entries: {stats['entries']}, index size: {stats['index_bytes'] / 2**20:.1f} MiB, "
+          f"insert rate: {entries / fill_seconds:,.0f}/s")
+    print(f"lookup latency over {lookups} queries: p50 {_percentile(samples, 50):.0f} us, "
+          f"p99 {_percentile(samples, 99):.0f} us, hit rate {stats['hit_rate']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
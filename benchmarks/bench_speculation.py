@@ -0,0 +1,108 @@
+"""Benchmark: outline wait time with and without speculative outline pre-generation.
+
+Simulated users ask for topics, read them for four to eight seconds, then request an
+outline for one of them: the first topic 60% of the time, the second 25%,
+another 15%. One in five users changes the target audience, which
+speculation (done for DEFAULT_AUDIENCE) can't anticipate. Every topic run
+returns fresh topics, so only speculation can answer an outline request early.
+
+Each mode runs in a fresh process against the local fake OpenRouter server:
+    python benchmarks/bench_speculation.py [sessions] [latency_seconds] [top_k]
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import DEFAULT_OUTLINE_CONTENT, ReplayLibrary, start_fake_server  # noqa: E402
+
+USERS = 4
+
+
+def _fresh_topics(count: int = 1000) -> ReplayLibrary:
+    """Answer every topic request with topics no earlier request got."""
+    records = [{"kind": "topics", "content": "\n".join(f"{rank}. Topic {rank} of list {index}" for rank in (1, 2, 3))}
+               for index in range(count)]
+    return ReplayLibrary(records + [{"kind": "outline", "content": DEFAULT_OUTLINE_CONTENT}])
+
+
+def _pick(topics: list) -> str:
+    roll = random.random()
+    if roll < 0.60 or len(topics) < 2:
+        return topics[0]
+    if roll < 0.85:
+        return topics[1]
+    return random.choice(topics[2:] or topics)
+
+
+def run_phase(sessions: int, latency: float) -> dict:
+    """Run the sessions in this process and return outline wait times, stats and tokens billed."""
+    random.seed(7)
+    server, url = start_fake_server(latency=latency, replay=_fresh_topics())
+    os.environ.update({"OPENROUTER_API_URL": url, "LLM_CACHE_ENABLED": "false", "SEMANTIC_CACHE_ENABLED": "false"})
+    os.environ.setdefault("NON_REASONING_API_KEY", "fake")
+
+    import api
+    from config import DEFAULT_AUDIENCE
+
+    client = api.app.test_client()
+    api.warm_up()
+
+    def session(index: int) -> float:
+        topics = client.post("/api/topics", json={"theme": f"Theme {index}", "num_topics": 3}).get_json()
+        time.sleep(random.uniform(4.0, 8.0))
+        audience = DEFAULT_AUDIENCE if random.random() >= 0.2 else "startup founders"
+        started = time.perf_counter()
+        response = client.post("/api/outline", json={"selected_topic": _pick(topics["generated_topics"]),
+                                                     "target_audience": audience})
+        assert response.status_code == 200, response.get_json()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=USERS) as pool:
+        waits = list(pool.map(session, range(sessions)))
+    # Let the last speculative rounds finish so their tokens are counted
+    time.sleep(latency * 3)
+    stats = client.get("/api/stats").get_json()["speculative_outlines"]
+    tokens = sum(usage["total_tokens"] for usage in server.usage_log)
+    server.shutdown()
+    return {"waits": waits, "stats": stats, "tokens": tokens}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--phase":
+        print(json.dumps(run_phase(int(sys.argv[2]), float(sys.argv[3]))))
+        return
+
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    top_k = sys.argv[3] if len(sys.argv) > 3 else "2"
+
+    print(f"{sessions} sessions, {USERS} concurrent users, {latency:.1f}s model latency")
+    results = {}
+    for enabled in ("false", "true"):
+        env = {**os.environ, "SPECULATIVE_OUTLINES_ENABLED": enabled, "SPECULATIVE_TOP_K": top_k,
+               "SPECULATIVE_CACHE_PATH": os.path.join(tempfile.mkdtemp(), "speculative.sqlite3"),
+               "CHECKPOINT_PATH": os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite3")}
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--phase", str(sessions), str(latency)],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        results[enabled] = result = json.loads(output.strip().splitlines()[-1])
+        waits = sorted(result["waits"])
+        p95 = waits[int(len(waits) * 0.95) - 1]
+        print(f"  speculation {'on ' if enabled == 'true' else 'off'}  outline wait p50 {statistics.median(waits):5.2f}s  "
+              f"p95 {p95:5.2f}s  tokens billed {result['tokens']}")
+
+    stats = results["true"]["stats"]
+    print(f"  hit rate {stats['hit_rate']:.0%} ({stats['hits']}/{stats['lookups']}, {stats['inflight_hits']} while "
+          f"still generating), wasted token ratio {stats['wasted_token_ratio']:.0%}, "
+          f"extra tokens {results['true']['tokens'] / results['false']['tokens'] - 1:+.0%}")
+
+
+if __name__ == "__main__":
+    main()
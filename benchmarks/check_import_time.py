@@ -0,0 +1,99 @@
+"""Startup regression check based on ``python -X importtime``.
+
+Imports each entry module in fresh interpreters and fails (exit status 1) when
+the median import time is over its budget, or when a module that is supposed
+to load lazily (LangGraph, LangChain, numpy, ...) got imported anyway:
+    python benchmarks/check_import_time.py [--runs 5] [--scale 2] [--budget api=250]
+
+Budgets are in milliseconds for a typical dev machine; ``--scale`` multiplies
+them all for slower CI runners. Over-budget modules list their heaviest imports.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MARKER = "-- measuring --"
+
+HEAVY = ("langgraph", "langchain_core", "numpy")
+
+# Module -> (budget in ms, top-level packages it must not import)
+CHECKS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    # Parsers and graph accessors load their dependencies on first use
+    "agents": (10, HEAVY + ("requests",)),
+    # The API answers /healthz and /api/stats before anything loads a graph
+    "api": (350, HEAVY + ("streamlit",)),
+    # The Streamlit page renders before the API and graphs are imported
+    "app": (700, HEAVY + ("flask",)),
+    # Everything needed before the first LLM call
+    "agents.topic_agent": (1500, ()),
+}
+
+
+def import_profile(module: str) -> List[Tuple[int, int, str]]:
+    """Import ``module`` in a fresh interpreter; return ``(self_us, cumulative_us, name)`` per imported module."""
+    env = {**os.environ, "NON_REASONING_API_KEY": os.environ.get("NON_REASONING_API_KEY") or "fake"}
+    # The marker separates interpreter startup (site, encodings, ...) from the import being measured
+    code = f"import sys; sys.stderr.write('{_MARKER}\\n'); import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    lines = result.stderr.splitlines()
+    for line in lines[lines.index(_MARKER) + 1:]:
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def total_ms(rows: List[Tuple[int, int, str]]) -> float:
+    # Top-level rows (names not indented past the single leading space) include everything they imported
+    return sum(cumulative for _, cumulative, name in rows if not name[1:].startswith(" ")) / 1000
+
+
+def heaviest(rows: List[Tuple[int, int, str]], count: int = 8) -> List[Tuple[str, float]]:
+    """Top-level packages by total self time, in ms."""
+    packages = Counter()
+    for self_us, _, name in rows:
+        packages[name.strip().split(".")[0]] += self_us
+    return [(package, us / 1000) for package, us in packages.most_common(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module; the median counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. 2 on slow CI")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="override or add a module's budget")
+    args = parser.parse_args()
+
+    checks = dict(CHECKS)
+    for override in args.budget:
+        module, ms = override.split("=")
+        checks[module] = (float(ms), checks.get(module, (0, ()))[1])
+
+    failures = 0
+    for module, (budget, forbidden) in checks.items():
+        profiles = [import_profile(module) for _ in range(args.runs)]
+        elapsed = statistics.median(total_ms(rows) for rows in profiles)
+        loaded = {name.strip().split(".")[0] for _, _, name in profiles[0]}
+        unexpected = sorted(package for package in forbidden if package in loaded)
+        over = elapsed > budget * args.scale
+        status = "FAIL" if over or unexpected else "ok"
+        print(f"{status:<4} import {module:<20} {elapsed:7.1f}ms  (budget {budget * args.scale:.0f}ms)")
+        if unexpected:
+            print(f"     imports {', '.join(unexpected)}, which should load lazily")
+        if over:
+            print("     heaviest: " + ", ".join(f"{package} {ms:.0f}ms" for package, ms in heaviest(profiles[0])))
+        failures += status == "FAIL"
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""A local stand-in for the OpenRouter chat completions endpoint.
+
+Used by the benchmarks so they can exercise the real HTTP client code without
+spending API credits. Start it standalone with:
+    python benchmarks/fake_openrouter.py --port 8099 --latency lognormal:0.8,0.4
+and point the app at it with OPENROUTER_API_URL=http://127.0.0.1:8099/api/v1/chat/completions
+
+Real completions can be recorded once by proxying to OpenRouter and replayed
+afterwards, with their original latencies:
+    python benchmarks/fake_openrouter.py --record recorded.jsonl --upstream https://openrouter.ai/api/v1/chat/completions
+    python benchmarks/fake_openrouter.py --replay recorded.jsonl --replay-latency
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+Latency = Union[float, Callable[[], float]]
+
+DEFAULT_CONTENT = "1. First topic\n2. Second topic\n3. Third topic"
+DEFAULT_OUTLINE_CONTENT = json.dumps({
+    "title_suggestion": "A Fake Outline",
+    "introduction_hook": "Open with a question.",
+    "sections": [
+        {"heading": "Background", "key_points": ["Point one", "Point two"]},
+        {"heading": "Details", "key_points": ["Point three", "Point four"]},
+    ],
+    "conclusion_summary": "Wrap up the key takeaways.",
+    "call_to_action": "Share your thoughts.",
+})
+
+
+def usage_for(request: dict, content: str) -> dict:
+    """Approximate OpenRouter's usage block at ~4 characters per token."""
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4 + 1
+    completion_tokens = len(content) // 4 + 1
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _is_outline_request(request: dict) -> bool:
+    """Outline prompts ask for JSON; topic prompts ask for a numbered list."""
+    return any("JSON" in str(m.get("content", "")) for m in request.get("messages", []))
+
+
+def request_kind(request: dict) -> str:
+    return "outline" if _is_outline_request(request) else "topics"
+
+
+def parse_latency(spec: Union[str, float, None]) -> Latency:
+    """
+    Turn a latency spec into seconds or a sampler returning seconds:
+
+    - ``"0.5"``: always 0.5s
+    - ``"uniform:LOW,HIGH"``
+    - ``"exp:MEAN"``: exponential
+    - ``"lognormal:MEDIAN,SIGMA"``: the usual shape of LLM latencies
+    - ``"bimodal:FAST,SLOW,P_SLOW"``: mostly FAST, SLOW with probability P_SLOW
+    """
+    if spec is None or isinstance(spec, (int, float)):
+        return float(spec or 0.0)
+    kind, _, args = spec.partition(":")
+    if not args:
+        return float(kind)
+    values = [float(value) for value in args.split(",")]
+    if kind == "uniform":
+        low, high = values
+        return lambda: random.uniform(low, high)
+    if kind == "exp":
+        mean, = values
+        return lambda: random.expovariate(1.0 / mean)
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    if kind == "bimodal":
+        fast, slow, p_slow = values
+        return lambda: slow if random.random() < p_slow else fast
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _sample(latency: Latency) -> float:
+    return latency() if callable(latency) else latency
+
+
+def _prompt_key(messages: List[Dict[str, Any]]) -> str:
+    """Identify a prompt by its messages only, so recordings replay under any model."""
+    canonical = json.dumps([[m.get("role"), m.get("content")] for m in messages], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ReplayLibrary:
+    """
+    Recorded completions, one JSON object per line with ``kind``
+    ("topics"/"outline"), ``content``, optional ``messages`` and ``latency``.
+
+    A request whose messages were recorded gets that exact completion; any
+    other request gets the recordings of its kind in rotation.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.exact: Dict[str, Dict[str, Any]] = {}
+        by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            if record.get("messages"):
+                self.exact[_prompt_key(record["messages"])] = record
+            by_kind.setdefault(record["kind"], []).append(record)
+        self._rotations = {kind: itertools.cycle(items) for kind, items in by_kind.items()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayLibrary":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def match(self, request: dict) -> Optional[Dict[str, Any]]:
+        record = self.exact.get(_prompt_key(request.get("messages", [])))
+        if record is not None:
+            return record
+        rotation = self._rotations.get(request_kind(request))
+        if rotation is None:
+            return None
+        with self._lock:
+            return next(rotation)
+
+
+class FakeOpenRouterHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a canned chat completion."""
+
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.server.upstream:
+            self._proxy(request)
+            return
+
+        replayed = self.server.replay.match(request) if self.server.replay else None
+        if replayed is not None and self.server.replay_latency and replayed.get("latency") is not None:
+            latency = replayed["latency"]
+        else:
+            latency = _sample(self.server.model_latency.get(request.get("model"), self.server.latency))
+        if latency:
+            time.sleep(latency)
+
+        status = self.server.next_status()
+        if status != 200:
+            self._send_error(status)
+            return
+
+        content = replayed["content"] if replayed is not None else self._content_for(request)
+        self._send_completion(request, content)
+
+    def _send_completion(self, request: dict, content: str):
+        if request.get("stream"):
+            self._send_stream(request, content)
+            return
+
+        with self.server.status_lock:
+            self.server.usage_log.append(usage_for(request, content))
+        if self.server.token_latency:
+            # Simulate generation time for non-streamed responses too
+            time.sleep(self.server.token_latency * len(content) / self.server.chunk_chars)
+
+        body = json.dumps({
+            "id": "fake-completion",
+            "model": request.get("model", "fake/model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+            "usage": usage_for(request, content),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int):
+        """Send an OpenRouter-style error body, with Retry-After if configured."""
+        body = json.dumps({"error": {"code": status, "message": f"Injected error {status}"}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.retry_after is not None:
+            self.send_header("Retry-After", str(self.server.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request: dict, content: str):
+        """Send the completion as OpenRouter-style server-sent events."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._write_chunk(b": OPENROUTER PROCESSING\n\n")
+
+        step = self.server.chunk_chars
+        sent = 0
+        try:
+            for start in range(0, len(content), step):
+                if self.server.token_latency:
+                    time.sleep(self.server.token_latency)
+                delta = {"choices": [{"index": 0, "delta": {"content": content[start:start + step]}}]}
+                self._write_chunk(f"data: {json.dumps(delta)}\n\n".encode())
+                sent = start + step
+
+            final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage_for(request, content)}
+            self._write_chunk(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+            self._write_chunk(b"")
+        finally:
+            # A client that abandons the stream is only billed for what was generated
+            with self.server.status_lock:
+                self.server.usage_log.append(usage_for(request, content[:sent]))
+
+    def _proxy(self, request: dict):
+        """
+        Record mode: forward the request to the real API (non-streaming),
+        append the prompt, completion and latency to the recording, and answer
+        the client the way it asked, streamed or not.
+        """
+        upstream_request = {key: value for key, value in request.items() if key != "stream"}
+        forwarded = urllib.request.Request(
+            self.server.upstream,
+            data=json.dumps(upstream_request).encode(),
+            headers={"Content-Type": "application/json", "Authorization": self.headers.get("Authorization", "")},
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(forwarded, timeout=300) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            self._send_error(e.code)
+            return
+        content = body["choices"][0]["message"].get("content") or ""
+        record = {"kind": request_kind(request), "model": request.get("model"), "messages": request.get("messages"),
+                  "content": content, "latency": round(time.perf_counter() - started, 3)}
+        with self.server.status_lock:
+            with open(self.server.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._send_completion(request, content)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def _content_for(self, request: dict) -> str:
+        with self.server.status_lock:
+            if self.server.scripted_contents:
+                return self.server.scripted_contents.pop(0)
+        if self.server.content is not None:
+            return self.server.content
+        return DEFAULT_OUTLINE_CONTENT if _is_outline_request(request) else DEFAULT_CONTENT
+
+    def log_message(self, format, *args):
+        """Keep benchmark output clean."""
+
+
+class FakeOpenRouterServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog large enough for load tests."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        """Clients that cancel a request (e.g. a losing hedge) close early; that's expected."""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def next_status(self) -> int:
+        """
+        Pick the status for the next request: scripted statuses are used up
+        first, then ``error_status`` is returned with probability ``error_rate``.
+        """
+        with self.status_lock:
+            self.requests_seen += 1
+            if self.scripted_statuses:
+                return self.scripted_statuses.pop(0)
+        if self.error_rate and random.random() < self.error_rate:
+            return self.error_status
+        return 200
+
+    def script_contents(self, contents: Iterable[str]) -> None:
+        """Queue assistant contents to return, in order, for the next successful requests."""
+        with self.status_lock:
+            self.scripted_contents.extend(contents)
+
+    def script_statuses(self, statuses: Iterable[int]) -> None:
+        """Queue statuses to return, in order, for the next requests."""
+        with self.status_lock:
+            self.scripted_statuses.extend(statuses)
+
+
+def start_fake_server(
+    port: int = 0,
+    latency: Latency = 0.0,
+    content: Optional[str] = None,
+    token_latency: float = 0.0,
+    chunk_chars: int = 4,
+    statuses: Iterable[int] = (),
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    retry_after: Optional[float] = None,
+    model_latency: Optional[Dict[str, Latency]] = None,
+    replay: Optional[ReplayLibrary] = None,
+    replay_latency: bool = False,
+    upstream: Optional[str] = None,
+    record_path: Optional[str] = None,
+) -> Tuple[FakeOpenRouterServer, str]:
+    """
+    Start the fake server in a daemon thread.
+
+    Args:
+        port (int): Port to bind on 127.0.0.1; 0 picks a free one.
+        latency (float or callable): Seconds to sleep before answering each
+            request, or a sampler such as ``parse_latency("lognormal:0.8,0.4")``.
+        content (str, optional): Fixed assistant content to return. By default
+            outline requests get a JSON outline and everything else a topic list.
+        token_latency (float): Seconds to sleep between streamed chunks.
+        chunk_chars (int): Characters of content per streamed chunk.
+        statuses (iterable of int): Statuses to answer the first requests with, in order.
+        error_rate (float): Probability of answering any later request with ``error_status``.
+        error_status (int): Status used for random errors, e.g. 429 or 503.
+        retry_after (float, optional): Retry-After seconds sent with error responses.
+        model_latency (dict, optional): Per-model latency overriding ``latency``;
+            values are seconds or zero-argument callables returning seconds.
+        replay (ReplayLibrary, optional): Recorded completions to answer with.
+        replay_latency (bool): Sleep for each replayed completion's recorded
+            latency instead of ``latency``.
+        upstream (str, optional): Record mode: forward requests to this URL and
+            append each prompt and completion to ``record_path``.
+        record_path (str, optional): JSONL file recordings are appended to.
+
+    Returns:
+        tuple: The running server and its chat completions URL.
+    """
+    server = FakeOpenRouterServer(("127.0.0.1", port), FakeOpenRouterHandler)
+    server.latency = latency
+    server.content = content
+    server.token_latency = token_latency
+    server.chunk_chars = chunk_chars
+    server.scripted_statuses = list(statuses)
+    server.scripted_contents = []
+    # Usage of every completion sent, in order
+    server.usage_log = []
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.retry_after = retry_after
+    server.model_latency = dict(model_latency or {})
+    server.replay = replay
+    server.replay_latency = replay_latency
+    server.upstream = upstream
+    server.record_path = record_path
+    server.status_lock = threading.Lock()
+    server.requests_seen = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+    return server, url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="0", help="seconds of simulated model latency, or a distribution "
+                        "such as uniform:0.2,1 / exp:0.5 / lognormal:0.8,0.4 / bimodal:0.1,2,0.05")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--chunk-chars", type=int, default=4, help="characters of content per streamed chunk")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503, help="status for injected errors, e.g. 429 or 503")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected errors")
+    parser.add_argument("--replay", help="JSONL file of recorded completions to answer with")
+    parser.add_argument("--replay-latency", action="store_true", help="replay each completion's recorded latency")
+    parser.add_argument("--record", help="record mode: JSONL file to append real completions to (needs --upstream)")
+    parser.add_argument("--upstream", help="record mode: the real chat completions URL to forward requests to")
+    parser.add_argument("--seed", type=int, help="seed latency and error sampling for repeatable runs")
+    args = parser.parse_args()
+    if bool(args.record) != bool(args.upstream):
+        parser.error("--record and --upstream must be used together")
+    if args.seed is not None:
+        random.seed(args.seed)
+    server, url = start_fake_server(
+        args.port, parse_latency(args.latency), token_latency=args.token_latency, chunk_chars=args.chunk_chars,
+        error_rate=args.error_rate, error_status=args.error_status, retry_after=args.retry_after,
+        replay=ReplayLibrary.load(args.replay) if args.replay else None, replay_latency=args.replay_latency,
+        upstream=args.upstream, record_path=args.record,
+    )
+    print(f"Fake OpenRouter listening on {url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
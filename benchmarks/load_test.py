@@ -0,0 +1,326 @@
+"""Load test: drive /api/topics and /api/outline at a target request rate.
+
+Starts the fake OpenRouter server and the Flask API as separate processes,
+replays the request bodies in benchmarks/data/api_requests.jsonl against the
+API on a fixed (open-loop) schedule, and reports throughput, p50/p95/p99
+latency per endpoint and the API process's CPU time and memory per request:
+    python benchmarks/load_test.py --rps 20 --duration 30 --latency lognormal:0.8,0.4
+
+Latency is measured from each request's scheduled send time, so a server that
+falls behind shows up as latency instead of silently lowering the rate.
+Save a run with --json and compare later runs against it with --baseline;
+the exit status is 1 if p95 latency, CPU per request or the error rate regressed.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def process_usage(pid: int) -> Optional[Dict[str, float]]:
+    """Return a process's CPU seconds and current/peak RSS in MB from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name; utime and stime are fields 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+        "peak_rss_mb": int(status["VmHWM"].split()[0]) / 1024,
+    }
+
+
+def start_fake_openrouter(args) -> tuple:
+    """Start benchmarks/fake_openrouter.py in its own process; return (process, url)."""
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", "fake_openrouter.py"),
+               "--port", str(_free_port()), "--latency", args.latency,
+               "--token-latency", str(args.token_latency),
+               "--error-rate", str(args.error_rate), "--error-status", str(args.error_status),
+               "--seed", str(args.seed)]
+    if args.replay:
+        command += ["--replay", args.replay]
+    if args.replay_latency:
+        command += ["--replay-latency"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if "listening on" not in line:
+        process.kill()
+        raise RuntimeError(f"Fake OpenRouter server failed to start: {line!r}")
+    return process, line.rsplit(" ", 1)[1].strip()
+
+
+def start_api(openrouter_url: str, args) -> tuple:
+    """Start the Flask API (``flask run``) against the fake server; return (process, base_url)."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "OPENROUTER_API_URL": openrouter_url,
+        "NON_REASONING_API_KEY": os.environ.get("NON_REASONING_API_KEY") or "fake",
+        "LLM_CACHE_ENABLED": "true" if args.cache else "false",
+        "SEMANTIC_CACHE_ENABLED": "true" if args.cache else "false",
+    }
+    process = subprocess.Popen([sys.executable, "-m", "flask", "--app", "api", "run", "--port", str(port)],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/api/stats", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.ConnectionError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("The Flask API did not come up")
+
+
+def load_requests(path: str, endpoints: List[str]) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries = [entry for entry in entries if entry["endpoint"].rsplit("/", 1)[-1] in endpoints]
+    if not entries:
+        raise ValueError(f"No requests for endpoints {endpoints} in {path}")
+    return entries
+
+
+def _unique(body: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Make a request body distinct so caches and single-flight can't collapse the load."""
+    body = dict(body)
+    for field in ("theme", "selected_topic"):
+        if field in body:
+            body[field] = f"{body[field]} (#{index})"
+    return body
+
+
+class LoadDriver:
+    """Sends requests on an open-loop schedule at ``rps`` and records each outcome."""
+
+    def __init__(self, base_url: str, entries: List[Dict[str, Any]], rps: float, unique: bool = True,
+                 max_in_flight: int = 512, timeout: float = 300):
+        self.base_url = base_url
+        self.entries = entries
+        self.rps = rps
+        self.unique = unique
+        self.timeout = timeout
+        self.results: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load")
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _send(self, index: int, entry: Dict[str, Any], scheduled: float) -> None:
+        body = _unique(entry["body"], index) if self.unique else entry["body"]
+        started = time.perf_counter()
+        try:
+            response = self._session().post(self.base_url + entry["endpoint"], json=body, timeout=self.timeout)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        finished = time.perf_counter()
+        with self._lock:
+            self.results.append({
+                "endpoint": entry["endpoint"],
+                "status": status,
+                "latency": finished - scheduled,
+                "service_time": finished - started,
+                "finished": finished,
+            })
+
+    def run(self, total: int) -> float:
+        """Send ``total`` requests and wait for all of them; return the start time."""
+        entries = itertools.cycle(self.entries)
+        start = time.perf_counter()
+        for index in range(total):
+            scheduled = start + index / self.rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._pool.submit(self._send, index, next(entries), scheduled)
+        self._pool.shutdown(wait=True)
+        return start
+
+
+def summarize(results: List[Dict[str, Any]], start: float, target_rps: float,
+              before: Optional[Dict[str, float]], after: Optional[Dict[str, float]]) -> Dict[str, Any]:
+    """Aggregate request outcomes and process usage into the report."""
+    elapsed = max(result["finished"] for result in results) - start
+    ok = [result for result in results if result["status"] == 200]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result["status"] != 200:
+            errors[str(result["status"])] = errors.get(str(result["status"]), 0) + 1
+
+    endpoints = {}
+    for endpoint in sorted({result["endpoint"] for result in results}):
+        latencies = [result["latency"] for result in ok if result["endpoint"] == endpoint]
+        sent = sum(1 for result in results if result["endpoint"] == endpoint)
+        endpoints[endpoint] = {
+            "requests": sent,
+            "ok": len(latencies),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        }
+
+    report = {
+        "target_rps": target_rps,
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": 1 - len(ok) / len(results),
+        "errors": errors,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "elapsed_seconds": elapsed,
+        "endpoints": endpoints,
+    }
+    if before and after:
+        report["process"] = {
+            "cpu_ms_per_request": (after["cpu_seconds"] - before["cpu_seconds"]) * 1000 / len(results),
+            "rss_mb_before": before["rss_mb"],
+            "rss_mb_after": after["rss_mb"],
+            "rss_kb_per_request": (after["rss_mb"] - before["rss_mb"]) * 1024 / len(results),
+            "peak_rss_mb": after["peak_rss_mb"],
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['requests']} requests at {report['target_rps']:g} rps target: "
+          f"{report['throughput_rps']:.2f} rps achieved over {report['elapsed_seconds']:.1f}s, "
+          f"error rate {report['error_rate']:.1%} {report['errors'] or ''}")
+    print(f"{'endpoint':<16} {'ok':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        cells = " ".join(f"{stats[key] * 1000:7.0f}ms" if stats[key] is not None else f"{'-':>9}"
+                         for key in ("p50", "p95", "p99", "max"))
+        print(f"{endpoint:<16} {stats['ok']:>6} {cells}")
+    process = report.get("process")
+    if process:
+        print(f"API process: {process['cpu_ms_per_request']:.2f}ms CPU/request, RSS "
+              f"{process['rss_mb_before']:.0f}MB -> {process['rss_mb_after']:.0f}MB "
+              f"({process['rss_kb_per_request']:+.1f}KB/request), peak {process['peak_rss_mb']:.0f}MB")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every metric that got worse than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+
+    def check(label, current, previous, slack=0.0):
+        if current is not None and previous is not None and current > previous * (1 + tolerance) + slack:
+            regressions.append(f"{label}: {previous:.4g} -> {current:.4g}")
+
+    for endpoint, stats in report["endpoints"].items():
+        previous = baseline["endpoints"].get(endpoint)
+        if previous:
+            check(f"{endpoint} p95 latency (s)", stats["p95"], previous["p95"])
+    if report.get("process") and baseline.get("process"):
+        check("CPU ms/request", report["process"]["cpu_ms_per_request"], baseline["process"]["cpu_ms_per_request"])
+    # A point of absolute slack, so 0% -> 0.2% isn't flagged
+    check("error rate", report["error_rate"], baseline["error_rate"], slack=0.01)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rps", type=float, default=10.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--endpoints", default="topics,outline", help="comma-separated: topics, outline")
+    parser.add_argument("--requests", default=os.path.join(DATA_DIR, "api_requests.jsonl"),
+                        help="JSONL of {\"endpoint\", \"body\"} API requests to replay in rotation")
+    parser.add_argument("--no-unique", action="store_true",
+                        help="send bodies verbatim instead of making each one distinct")
+    parser.add_argument("--warmup", type=int, default=5, help="requests sent before measuring")
+    parser.add_argument("--latency", default="lognormal:0.8,0.4", help="fake model latency (see fake_openrouter.py)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake responses that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--replay", default=os.path.join(DATA_DIR, "recorded_completions.jsonl"),
+                        help="recorded completions for the fake server to answer with ('' for canned ones)")
+    parser.add_argument("--replay-latency", action="store_true", help="use the recordings' latencies")
+    parser.add_argument("--cache", action="store_true", help="leave the response and semantic caches on")
+    parser.add_argument("--target", help="load an already running API at this base URL instead")
+    parser.add_argument("--pid", type=int, help="with --target: the API's PID, for CPU and memory")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="report from an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    entries = load_requests(args.requests, args.endpoints.split(","))
+    processes = []
+    try:
+        if args.target:
+            base_url, pid = args.target.rstrip("/"), args.pid
+        else:
+            fake, openrouter_url = start_fake_openrouter(args)
+            processes.append(fake)
+            api, base_url = start_api(openrouter_url, args)
+            processes.append(api)
+            pid = api.pid
+
+        if args.warmup:
+            LoadDriver(base_url, entries, rps=args.warmup, unique=not args.no_unique).run(args.warmup)
+        before = process_usage(pid) if pid else None
+        driver = LoadDriver(base_url, entries, rps=args.rps, unique=not args.no_unique)
+        start = driver.run(max(1, int(args.rps * args.duration)))
+        after = process_usage(pid) if pid else None
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    report = summarize(driver.results, start, args.rps, before, after)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Durable LangGraph checkpoints, so failed or interrupted runs resume instead of restarting.
+
+Graphs from ``agents.registry`` fetched with ``durable=True`` save their
+state to a local SQLite file after every node, keyed by a run id (LangGraph's
+thread id). Running the same run id again picks up where it stopped: after
+the last completed node if the process died or a node raised, from just
+before the node that reported the error if it failed, and not at all if it
+already succeeded. LLM calls made by completed nodes are not paid for twice.
+
+Checkpoints are written synchronously, so durable graphs are for
+``invoke``/``stream``; ``ainvoke`` callers use the plain graphs.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from config import CHECKPOINTS_ENABLED, CHECKPOINT_PATH, CHECKPOINT_RETENTION_SECONDS
+
+
+class RunConflictError(ValueError):
+    """Raised when a run id is reused for a request with different inputs."""
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+_checkpointer_unavailable = False
+_touches = 0
+
+
+def get_checkpointer():
+    """
+    Return the process-wide SQLite checkpointer, or None if checkpoints are
+    disabled or langgraph-checkpoint-sqlite is not installed.
+
+    Opens the database, so call it after forking, never in gunicorn's master.
+    """
+    global _checkpointer, _checkpointer_unavailable
+    if not CHECKPOINTS_ENABLED or _checkpointer_unavailable:
+        return None
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None and not _checkpointer_unavailable:
+                try:
+                    from langgraph.checkpoint.sqlite import SqliteSaver
+                except ImportError:
+                    print("WARNING: CHECKPOINTS_ENABLED is set but langgraph-checkpoint-sqlite is not installed; "
+                          "runs cannot be resumed")
+                    _checkpointer_unavailable = True
+                    return None
+                directory = os.path.dirname(CHECKPOINT_PATH)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(CHECKPOINT_PATH, check_same_thread=False, timeout=30)
+                saver = SqliteSaver(conn)
+                with saver.cursor() as cursor:
+                    # WAL (set by setup) without an fsync per node: survives a crashed process, which is what resuming is for
+                    cursor.execute("PRAGMA synchronous=NORMAL")
+                    cursor.execute("CREATE TABLE IF NOT EXISTS runs (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)")
+                _checkpointer = saver
+    return _checkpointer
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _touch(saver, run_id: str) -> None:
+    """Record that ``run_id`` was used; every 100 runs, drop runs older than CHECKPOINT_RETENTION_SECONDS."""
+    global _touches
+    now = time.time()
+    with saver.cursor() as cursor:
+        cursor.execute("INSERT OR REPLACE INTO runs (thread_id, updated_at) VALUES (?, ?)", (run_id, now))
+    _touches += 1
+    # Amortise retention like the response cache's eviction
+    if _touches % 100 == 0:
+        with saver.cursor() as cursor:
+            expired = [row[0] for row in cursor.execute(
+                "SELECT thread_id FROM runs WHERE updated_at < ?", (now - CHECKPOINT_RETENTION_SECONDS,)
+            ).fetchall()]
+        for thread_id in expired:
+            saver.delete_thread(thread_id)
+        with saver.cursor() as cursor:
+            cursor.executemany("DELETE FROM runs WHERE thread_id = ?", [(thread_id,) for thread_id in expired])
+
+
+def _run_failed(values: Dict[str, Any]) -> bool:
+    """Whether a finished run's state reports a failure worth retrying, including any pipeline outline."""
+    if values.get("error_message"):
+        return True
+    return any(entry.get("generated_outline") is None for entry in values.get("generated_outlines") or [])
+
+
+def plan_run(graph, inputs: Dict[str, Any], run_id: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Work out how to run ``inputs`` as run ``run_id`` on a durable graph.
+
+    Returns:
+        tuple: ``(input, config, finished)``. Invoke or stream the graph with
+        ``input`` and ``config``, unless ``finished``, the final state of an
+        earlier successful run with this id, is set.
+
+    Raises:
+        RunConflictError: If ``run_id`` belongs to a run with different inputs.
+    """
+    config = {"configurable": {"thread_id": run_id}}
+    if graph.checkpointer is None:
+        return inputs, config, None
+    _touch(graph.checkpointer, run_id)
+
+    snapshot = graph.get_state(config)
+    if snapshot.created_at is None:
+        return inputs, config, None
+    values = snapshot.values
+    if any(key in values and values[key] != value for key, value in inputs.items()):
+        raise RunConflictError("run_id belongs to a run with different inputs")
+    if snapshot.next:
+        # Interrupted, or a node raised: continue after the last completed node
+        return None, config, None
+    if not _run_failed(values):
+        return None, config, values
+    # Finished with an error: fork from the newest checkpoint taken before it went wrong
+    for past in graph.get_state_history(config):
+        if past.next and not _run_failed(past.values):
+            return None, past.config, None
+    return inputs, config, None
+
+
+def invoke_run(graph, inputs: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Invoke a durable graph as run ``run_id`` (a new run if None), resuming it
+    if it ran before; see ``plan_run``.
+
+    Returns:
+        dict: The final state, with the run's id under ``run_id``.
+    """
+    run_id = run_id or new_run_id()
+    graph_input, config, finished = plan_run(graph, inputs, run_id)
+    result = finished if finished is not None else graph.invoke(graph_input, config)
+    return {**result, "run_id": run_id}
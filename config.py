@@ -1,4 +1,5 @@
 """Configuration module for the Agentic Blog App."""
+import json
 import os
 from dotenv import load_dotenv
 
@@ -8,6 +9,133 @@ load_dotenv()
 # API configuration
 API_KEY = os.getenv("NON_REASONING_API_KEY")
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "openai/gpt-4-turbo")
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# Per-task model routing; each task falls back to DEFAULT_MODEL
+TOPIC_MODEL = os.getenv("TOPIC_MODEL") or DEFAULT_MODEL
+OUTLINE_MODEL = os.getenv("OUTLINE_MODEL") or DEFAULT_MODEL
+
+# Hedged requests: if the task's model is slower than its HEDGE_PERCENTILE
+# latency, the same request goes to the hedge model too (empty = no hedging)
+TOPIC_HEDGE_MODEL = os.getenv("TOPIC_HEDGE_MODEL", "")
+OUTLINE_HEDGE_MODEL = os.getenv("OUTLINE_HEDGE_MODEL", "")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "10"))
+HEDGE_POOL_SIZE = int(os.getenv("HEDGE_POOL_SIZE", "32"))
+
+# HTTP transport settings for OpenRouter calls
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+ASYNC_HTTP_POOL_SIZE = int(os.getenv("ASYNC_HTTP_POOL_SIZE", "200"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+
+# Provider-side prompt caching: "auto" adds cache_control breakpoints for
+# Anthropic and Google models (others cache long prefixes automatically), "on"/"off" force it
+PROMPT_CACHE_CONTROL = os.getenv("PROMPT_CACHE_CONTROL", "auto").lower()
+
+# Rate limiting, retries and circuit breaking for OpenRouter calls (0 = unlimited)
+OPENROUTER_REQUESTS_PER_MINUTE = float(os.getenv("OPENROUTER_REQUESTS_PER_MINUTE", "0"))
+OPENROUTER_TOKENS_PER_MINUTE = float(os.getenv("OPENROUTER_TOKENS_PER_MINUTE", "0"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "20"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "50000"))
+
+# Near-duplicate theme cache for topic ideation
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", "10000"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "256"))
+
+# Batch outline generation
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+
+# Combined theme-to-outlines pipeline
+PIPELINE_MAX_CONCURRENCY = int(os.getenv("PIPELINE_MAX_CONCURRENCY", "10"))
+
+# Outline generation: full regenerations allowed after the streamed JSON breaks
+# the schema in a way that neither local nor targeted LLM repair can fix
+OUTLINE_SCHEMA_RETRIES = int(os.getenv("OUTLINE_SCHEMA_RETRIES", "1"))
+
+# Usage accounting: default per-request budgets (0 = unlimited) and prices used
+# when OpenRouter doesn't report a call's cost, as
+# {"model": [USD per million prompt tokens, USD per million completion tokens]}
+REQUEST_MAX_TOKENS = int(os.getenv("REQUEST_MAX_TOKENS", "0"))
+REQUEST_MAX_COST = float(os.getenv("REQUEST_MAX_COST", "0"))
+MODEL_PRICES = json.loads(os.getenv("MODEL_PRICES") or "{}")
+
+# Instrumentation: timing histograms for graph nodes, OpenRouter HTTP phases and
+# parsing (served at /metrics), and optional OpenTelemetry spans (needs opentelemetry-api)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# API server (gunicorn.conf.py): worker processes (0 = one per CPU, at most 8),
+# threads per worker, whether to compile graphs once before forking workers,
+# and how long a stopping worker waits for in-flight requests and LLM calls
+API_BIND = os.getenv("API_BIND", "0.0.0.0:8000")
+API_WORKERS = int(os.getenv("API_WORKERS") or os.getenv("WEB_CONCURRENCY") or "0")
+API_THREADS = int(os.getenv("API_THREADS", "16"))
+API_PRELOAD = os.getenv("API_PRELOAD", "true").lower() in ("1", "true", "yes")
+API_GRACEFUL_TIMEOUT = int(os.getenv("API_GRACEFUL_TIMEOUT", "130"))
+
+# Import and compile everything (LangGraph, LangChain, graphs, LLM clients) when
+# the API module loads instead of on the first request, for platforms that
+# snapshot the initialized process (e.g. AWS Lambda SnapStart) or bill init separately
+STARTUP_PRELOAD = os.getenv("STARTUP_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+# Checkpoints: API and job runs save their LangGraph state after every node, so
+# a failed or interrupted run resumes from its last completed node when it is
+# run again with the same run_id (needs langgraph-checkpoint-sqlite)
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite3")
+CHECKPOINT_RETENTION_SECONDS = float(os.getenv("CHECKPOINT_RETENTION_SECONDS", "604800"))
+
+# Speculative outlines: after a topic run, generate outlines for its first
+# SPECULATIVE_TOP_K topics (for DEFAULT_AUDIENCE) in the background, each round
+# within SPECULATIVE_MAX_TOKENS (0 = unlimited), and keep them in a bounded
+# store so a matching outline request is answered at once
+SPECULATIVE_OUTLINES_ENABLED = os.getenv("SPECULATIVE_OUTLINES_ENABLED", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_TOP_K = int(os.getenv("SPECULATIVE_TOP_K", "2"))
+SPECULATIVE_MAX_TOKENS = int(os.getenv("SPECULATIVE_MAX_TOKENS", "8000"))
+SPECULATIVE_CONCURRENCY = int(os.getenv("SPECULATIVE_CONCURRENCY", "2"))
+SPECULATIVE_CACHE_PATH = os.getenv("SPECULATIVE_CACHE_PATH", ".cache/speculative_outlines.sqlite3")
+SPECULATIVE_CACHE_ENTRIES = int(os.getenv("SPECULATIVE_CACHE_ENTRIES", "1000"))
+SPECULATIVE_TTL_SECONDS = float(os.getenv("SPECULATIVE_TTL_SECONDS", "3600"))
+
+# Fair scheduling of graph runs in each API process: how many run at once, how
+# many of those may be bulk (pipeline, batch, jobs, speculation) so interactive
+# topic/outline requests always find a slot, how long a request waits for one
+# and how many a tenant may have waiting. Tenants are keyed by the X-API-Key
+# header, as {"api key": {"name": ..., "weight": 1, "max_concurrency": 0,
+# "tokens_per_minute": 0}} (0 = unlimited); requests without a key share the
+# "default" tenant
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "16"))
+SCHEDULER_BULK_CONCURRENCY = int(os.getenv("SCHEDULER_BULK_CONCURRENCY", "12"))
+SCHEDULER_QUEUE_TIMEOUT = float(os.getenv("SCHEDULER_QUEUE_TIMEOUT", "30"))
+SCHEDULER_MAX_QUEUED = int(os.getenv("SCHEDULER_MAX_QUEUED", "64"))
+TENANTS = json.loads(os.getenv("TENANTS") or "{}")
+
+# Background jobs (/api/jobs): SQLite queue file, graph-executing worker threads
+# per API process, how long a claimed job stays leased to a worker without a
+# heartbeat before another may take it over, how often a job is tried before
+# it fails, and how long finished jobs are kept
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "604800"))
 
 # Application settings
 DEFAULT_NUM_TOPICS = int(os.getenv("DEFAULT_NUM_TOPICS", "5"))
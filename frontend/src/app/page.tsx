@@ -4,7 +4,7 @@ import { useState } from 'react';
 import ConfigForm from '@/components/ConfigForm';
 import OutlineDisplay from '@/components/OutlineDisplay';
 import Spinner from '@/components/Spinner'; // Import Spinner
-import { fetchTopicSuggestions, fetchBlogOutline, BlogOutlineData } from '@/services/api'; 
+import { streamTopicSuggestions, streamBlogOutline, BlogOutlineData } from '@/services/api';
 
 export default function Home() {
   // State for ConfigForm inputs
@@ -42,7 +42,14 @@ export default function Home() {
     setOutlineError(null); // Clear previous outline error
 
     try {
-      const topics = await fetchTopicSuggestions(theme, numTopics);
+      // Render each topic as soon as the backend finishes its line
+      const topics = await streamTopicSuggestions(theme, numTopics, (topic, index) => {
+        setGeneratedTopics((prev) => {
+          const next = [...prev];
+          next[index] = topic;
+          return next;
+        });
+      });
       setGeneratedTopics(topics);
     } catch (error) {
       if (error instanceof Error) {
@@ -66,7 +73,19 @@ export default function Home() {
     setGeneratedOutline(null); // Clear previous outline
 
     try {
-      const outline = await fetchBlogOutline(selectedTopic, targetAudience);
+      // Render sections as they are parsed; the final outline fills in the rest
+      const outline = await streamBlogOutline(selectedTopic, targetAudience, (section, index) => {
+        setGeneratedOutline((prev) => {
+          const sections = [...(prev?.sections ?? [])];
+          sections[index] = section;
+          return {
+            title_suggestion: prev?.title_suggestion ?? '',
+            introduction_hook: prev?.introduction_hook ?? '',
+            conclusion_summary: prev?.conclusion_summary ?? '',
+            sections,
+          };
+        });
+      });
       setGeneratedOutline(outline);
     } catch (error) {
       if (error instanceof Error) {
@@ -184,7 +203,7 @@ export default function Home() {
               </p>
             )}
             {/* Conditional rendering for outline display */}
-            {generatedOutline && !isLoadingOutline && !outlineError && (
+            {generatedOutline && !outlineError && (
               <OutlineDisplay outline={generatedOutline} />
             )}
           </div>
@@ -145,3 +145,124 @@ export async function fetchBlogOutline(
     throw new Error('An unexpected error occurred while fetching the blog outline.');
   }
 }
+
+// Events emitted by the streaming endpoints, one JSON object per line
+export type TopicStreamEvent =
+  | { type: 'topic'; index: number; topic: string }
+  | { type: 'done'; generated_topics: string[] }
+  | { type: 'error'; error: string };
+
+export type OutlineStreamEvent =
+  | { type: 'section'; index: number; section: OutlineSection }
+  | { type: 'done'; generated_outline: BlogOutlineData }
+  | { type: 'error'; error: string };
+
+/**
+ * POSTs to a streaming endpoint and invokes `onEvent` for each NDJSON line as it arrives.
+ * @throws An error if the request fails before the stream starts.
+ */
+async function postNdjsonStream<T>(
+  url: string,
+  body: unknown,
+  onEvent: (event: T) => void
+): Promise<void> {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(body),
+  });
+
+  if (!response.ok || !response.body) {
+    let errorData: ApiErrorResponse | null = null;
+    try {
+      errorData = await response.json();
+    } catch (e) {
+      // Ignore if error response is not valid JSON
+    }
+    const errorMessage =
+      errorData?.error || `API Error: ${response.status} ${response.statusText}`;
+    throw new Error(errorMessage);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    for (const line of lines) {
+      if (line.trim()) {
+        onEvent(JSON.parse(line) as T);
+      }
+    }
+    if (done) break;
+  }
+  if (buffer.trim()) {
+    onEvent(JSON.parse(buffer) as T);
+  }
+}
+
+/**
+ * Streams topic suggestions from the backend, reporting each topic as soon as it is generated.
+ * @param theme The blog theme or topic area.
+ * @param numTopics The number of topic suggestions desired.
+ * @param onTopic Called with each topic (and its position) as it arrives.
+ * @returns A promise that resolves to the final array of topic strings.
+ * @throws An error if the API request fails or the stream reports an error.
+ */
+export async function streamTopicSuggestions(
+  theme: string,
+  numTopics: number,
+  onTopic: (topic: string, index: number) => void
+): Promise<string[]> {
+  const result: { topics?: string[]; error?: string } = {};
+
+  await postNdjsonStream<TopicStreamEvent>(
+    `${API_BASE_URL}/api/topics/stream`,
+    { theme: theme, num_topics: numTopics },
+    (event) => {
+      if (event.type === 'topic') onTopic(event.topic, event.index);
+      else if (event.type === 'done') result.topics = event.generated_topics;
+      else result.error = event.error;
+    }
+  );
+
+  if (result.error) throw new Error(result.error);
+  if (!result.topics) throw new Error("API Error: Stream ended without 'generated_topics'.");
+  return result.topics;
+}
+
+/**
+ * Streams a blog post outline from the backend, reporting each section as soon as it is parsed.
+ * @param selectedTopic The topic for which to generate an outline.
+ * @param targetAudience The target audience for the blog post.
+ * @param onSection Called with each section (and its position) as it arrives.
+ * @returns A promise that resolves to the complete, validated blog outline.
+ * @throws An error if the API request fails or the stream reports an error.
+ */
+export async function streamBlogOutline(
+  selectedTopic: string,
+  targetAudience: string,
+  onSection: (section: OutlineSection, index: number) => void
+): Promise<BlogOutlineData> {
+  const result: { outline?: BlogOutlineData; error?: string } = {};
+
+  await postNdjsonStream<OutlineStreamEvent>(
+    `${API_BASE_URL}/api/outline/stream`,
+    { selected_topic: selectedTopic, target_audience: targetAudience },
+    (event) => {
+      if (event.type === 'section') onSection(event.section, event.index);
+      else if (event.type === 'done') result.outline = event.generated_outline;
+      else result.error = event.error;
+    }
+  );
+
+  if (result.error) throw new Error(result.error);
+  if (!result.outline) throw new Error("API Error: Stream ended without 'generated_outline'.");
+  return result.outline;
+}
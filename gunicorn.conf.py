@@ -0,0 +1,63 @@
+"""
+Gunicorn settings for the API: ``gunicorn -c gunicorn.conf.py api:app``.
+
+Workers are processes running API_THREADS threads each; LLM calls spend their
+time waiting on OpenRouter, so threads carry the concurrency and processes
+only need to cover the CPUs. With API_PRELOAD the master imports the app and
+compiles the graphs once before forking, so workers start immediately and
+share that memory copy-on-write.
+
+On SIGTERM a worker fails /healthz, stops accepting connections and finishes
+the requests it has, then lets its background jobs finish and waits for any
+LLM calls still in flight, all within API_GRACEFUL_TIMEOUT seconds. Jobs still
+running at the deadline go back in the queue for the other workers.
+"""
+import os
+import signal
+
+from config import API_BIND, API_GRACEFUL_TIMEOUT, API_PRELOAD, API_THREADS, API_WORKERS
+
+bind = API_BIND
+workers = API_WORKERS or min(os.cpu_count() or 1, 8)
+worker_class = "gthread"
+threads = API_THREADS
+preload_app = API_PRELOAD
+graceful_timeout = API_GRACEFUL_TIMEOUT
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    if preload_app:
+        import api
+        api.warm_up()
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes
+    from llm_services import close_http_session
+    close_http_session()
+
+
+def post_worker_init(worker):
+    import api
+    from job_queue import start_job_workers
+    if not preload_app:
+        api.warm_up()
+    # Threads don't survive a fork, so each worker starts its own job workers
+    start_job_workers()
+
+    # gunicorn's handler stops the accept loop; also start failing /healthz right away
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def on_sigterm(signum, frame):
+        api.begin_drain()
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+
+def worker_exit(server, worker):
+    import api
+    remaining = api.drain(graceful_timeout)
+    if remaining:
+        server.log.warning("Worker %s exiting with %s LLM calls still in flight", worker.pid, remaining)
@@ -0,0 +1,546 @@
+"""
+Durable background jobs for long-running generations (/api/jobs).
+
+Jobs are rows in a SQLite file, so they survive restarts and are shared by
+every API process on the host. Worker threads claim the highest-priority
+queued job under a lease and renew it while the graph runs; if a worker dies
+its lease lapses and another worker runs the job again, up to
+JOB_MAX_ATTEMPTS times. A worker only records a result while it still holds
+the job's lease, so a job that was taken over is never finished twice.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from checkpointing import plan_run
+from config import (
+    JOB_QUEUE_PATH,
+    JOB_WORKERS,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_RETENTION_SECONDS,
+)
+from llm_cache import bypass_cache
+from scheduler import BULK, DEFAULT_TENANT, scheduled
+from states import TopicIdeationState, OutlineGenerationState, ThemeToOutlinesState
+from usage import track_usage
+import agents
+
+JOB_TYPES = ("topics", "outline", "pipeline")
+FINISHED = ("succeeded", "failed", "cancelled")
+
+# Internal bookkeeping that is not part of a job's public view
+_PRIVATE_COLUMNS = ("request_hash", "worker", "lease_expires")
+
+
+class JobConflictError(ValueError):
+    """Raised when an idempotency key is reused for a different request."""
+
+
+def _request_hash(job_type: str, params: Dict[str, Any]) -> str:
+    """Hash what a job does, so a retried submission can be told apart from a different one."""
+    canonical = json.dumps({"type": job_type, "params": params}, sort_keys=True,
+                           separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = {key: row[key] for key in row.keys() if key not in _PRIVATE_COLUMNS}
+    for field in ("params", "result", "usage", "progress"):
+        if job[field] is not None:
+            job[field] = json.loads(job[field])
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+class JobQueue:
+    """
+    SQLite-backed job table. Safe to share across threads, and across
+    processes using the same file.
+
+    Jobs move from ``queued`` to ``running`` to one of ``FINISHED``; higher
+    ``priority`` runs first, then oldest first.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60, max_attempts: int = 3,
+                 retention_seconds: float = 604800):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Other processes may hold the write lock briefly; wait for it rather than fail
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, type TEXT NOT NULL, params TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "status TEXT NOT NULL, idempotency_key TEXT UNIQUE, request_hash TEXT NOT NULL, "
+            "result TEXT, error TEXT, usage TEXT, progress TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "worker TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL, lease_expires REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+
+    def submit(self, job_type: str, params: Dict[str, Any], priority: int = 0,
+               idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job.
+
+        Returns:
+            tuple: ``(job, created)``; ``created`` is False when
+            ``idempotency_key`` matched an earlier submission, whose job is returned.
+
+        Raises:
+            JobConflictError: If ``idempotency_key`` was used for a different request.
+        """
+        request_hash = _request_hash(job_type, params)
+        job_id = uuid.uuid4().hex
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT INTO jobs (id, type, params, priority, status, idempotency_key, request_hash, created_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (job_id, job_type, json.dumps(params), priority, idempotency_key, request_hash, time.time()),
+                )
+        except sqlite3.IntegrityError:
+            with self._lock:
+                row = self._db.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            if row is None:
+                # Purged in between; the key is free again
+                return self.submit(job_type, params, priority, idempotency_key)
+            if row["request_hash"] != request_hash:
+                raise JobConflictError("Idempotency key was already used for a different request")
+            return _row_to_job(row), False
+        return self.get(job_id), True
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next job to ``worker``: the highest-priority queued job, or a
+        running one whose worker let its lease lapse. Returns None if there is none.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Abandoned jobs that were cancelled, or are out of attempts, are not run again
+                self._db.execute(
+                    "UPDATE jobs SET status = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'failed' END, "
+                    "error = CASE WHEN cancel_requested THEN 'Job cancelled' ELSE ? END, "
+                    "finished_at = ?, worker = NULL, lease_expires = NULL "
+                    "WHERE status = 'running' AND lease_expires < ? AND (cancel_requested OR attempts >= ?)",
+                    (f"Job worker stopped responding {self.max_attempts} times", now, now, self.max_attempts),
+                )
+                candidates = self._db.execute(
+                    "SELECT id, priority, created_at FROM ("
+                    "SELECT id, priority, created_at FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, created_at LIMIT 1) "
+                    "UNION ALL SELECT id, priority, created_at FROM ("
+                    "SELECT id, priority, created_at FROM jobs WHERE status = 'running' AND lease_expires < ? "
+                    "ORDER BY priority DESC, created_at LIMIT 1)",
+                    (now,),
+                ).fetchall()
+                row = None
+                if candidates:
+                    job_id = min(candidates, key=lambda c: (-c["priority"], c["created_at"]))["id"]
+                    row = self._db.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                        "started_at = COALESCE(started_at, ?), lease_expires = ? WHERE id = ? RETURNING *",
+                        (worker, now, now + self.lease_seconds, job_id),
+                    ).fetchone()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return _row_to_job(row) if row is not None else None
+
+    def renew(self, leases: Dict[str, str]) -> Set[str]:
+        """
+        Extend the leases of ``{job_id: worker}``.
+
+        Returns:
+            set: Ids of the jobs that should stop: cancelled, or no longer leased to their worker.
+        """
+        expires = time.time() + self.lease_seconds
+        stop = set()
+        with self._lock:
+            for job_id, worker in leases.items():
+                row = self._db.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running' "
+                    "RETURNING cancel_requested",
+                    (expires, job_id, worker),
+                ).fetchone()
+                if row is None or row[0]:
+                    stop.add(job_id)
+        return stop
+
+    def cancel_requested(self, job_ids: List[str]) -> Set[str]:
+        """Return which of ``job_ids`` have been asked to cancel."""
+        if not job_ids:
+            return set()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id FROM jobs WHERE cancel_requested AND id IN ({','.join('?' * len(job_ids))})",
+                job_ids,
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def set_progress(self, job_id: str, worker: str, progress: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(progress), job_id, worker),
+            )
+
+    def finish(self, job_id: str, worker: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None, usage: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Record a job's outcome.
+
+        Returns:
+            bool: False if ``worker`` no longer held the job, in which case nothing was recorded.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, usage = ?, finished_at = ?, "
+                "worker = NULL, lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error,
+                 json.dumps(usage) if usage is not None else None, time.time(), job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, job_id: str, worker: str) -> bool:
+        """Put a job ``worker`` holds back in the queue without counting the attempt (e.g. on shutdown)."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, worker = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job: a queued one immediately, a running one once its worker
+        notices (see ``JobWorkers``). Finished jobs are left as they are.
+
+        Returns:
+            dict: The job, or None if there is no such job.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', error = 'Job cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (now, job_id),
+            )
+            if cursor.rowcount == 0:
+                self._db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently created jobs first, optionally only those with ``status``."""
+        query, args = "SELECT * FROM jobs", []
+        if status:
+            query, args = query + " WHERE status = ?", [status]
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at DESC LIMIT ?", args + [limit]).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def purge(self) -> int:
+        """Delete jobs that finished more than ``retention_seconds`` ago; return how many."""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - self.retention_seconds,))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._db.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        return {
+            "enabled": True,
+            **{status: counts.get(status, 0) for status in ("queued", "running") + FINISHED},
+            "oldest_queued_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+        }
+
+
+class JobWorkers:
+    """
+    A pool of threads that claim jobs from a ``JobQueue`` and run them.
+
+    ``execute(job, cancelled, report_progress)`` runs one job and returns
+    ``{"status", "result", "error", "usage"}``; it should stop early once the
+    ``cancelled`` event is set. A heartbeat thread renews the leases of
+    running jobs and sets their events when they are cancelled, including
+    from another process.
+    """
+
+    def __init__(self, queue: JobQueue, execute: Callable[..., Dict[str, Any]], size: int = 4,
+                 poll_interval: float = 0.5):
+        self.queue = queue
+        self.execute = execute
+        self.size = size
+        self.poll_interval = poll_interval
+        self._threads: List[threading.Thread] = []
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        # Separate from _stopping: leases must be renewed until running jobs finish or are released
+        self._heartbeat_stopping = threading.Event()
+        self._wakeup = threading.Condition()
+        self._lock = threading.Lock()
+        # Job id -> (worker id holding its lease, cancellation event)
+        self._active: Dict[str, Tuple[str, threading.Event]] = {}
+        self._counters = {"claimed": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "lost_lease": 0}
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self) -> None:
+        for index in range(self.size):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def wake(self) -> None:
+        """Have an idle worker look for a job now instead of at its next poll."""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def cancel_local(self, job_id: str) -> bool:
+        """Stop a job running in this process right away; returns False if it isn't running here."""
+        with self._lock:
+            active = self._active.get(job_id)
+        if active is None:
+            return False
+        active[1].set()
+        return True
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            # A fresh id per claim, so a stalled run can never finish a job that was taken over
+            worker = f"{self._worker_prefix}:{uuid.uuid4().hex[:8]}"
+            try:
+                job = self.queue.claim(worker)
+            except sqlite3.Error as e:
+                print(f"WARNING: Could not claim a job: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(job, worker)
+
+    def _run(self, job: Dict[str, Any], worker: str) -> None:
+        cancelled = threading.Event()
+        if job["cancel_requested"]:
+            cancelled.set()
+        with self._lock:
+            self._active[job["id"]] = (worker, cancelled)
+            self._counters["claimed"] += 1
+
+        def report_progress(progress: Dict[str, Any]) -> None:
+            self.queue.set_progress(job["id"], worker, progress)
+
+        try:
+            outcome = self.execute(job, cancelled, report_progress)
+        except Exception as e:
+            outcome = {"status": "failed", "error": f"Error running job: {str(e)}"}
+        finally:
+            with self._lock:
+                self._active.pop(job["id"], None)
+
+        recorded = self.queue.finish(job["id"], worker, **outcome)
+        with self._lock:
+            self._counters[outcome["status"] if recorded else "lost_lease"] += 1
+
+    def _heartbeat(self) -> None:
+        renew_every = self.queue.lease_seconds / 3
+        last_renewal = last_purge = time.monotonic()
+        while not self._heartbeat_stopping.wait(self.poll_interval):
+            with self._lock:
+                active = dict(self._active)
+            now = time.monotonic()
+            try:
+                if now - last_renewal >= renew_every:
+                    stop = self.queue.renew({job_id: worker for job_id, (worker, _) in active.items()})
+                    last_renewal = now
+                else:
+                    stop = self.queue.cancel_requested(list(active))
+                if now - last_purge >= 3600:
+                    self.queue.purge()
+                    last_purge = now
+            except sqlite3.Error as e:
+                print(f"WARNING: Job heartbeat failed: {e}")
+                continue
+            for job_id in stop:
+                active[job_id][1].set()
+
+    def stop(self, timeout: float = 30) -> int:
+        """
+        Stop claiming jobs and wait up to ``timeout`` seconds for running ones
+        to finish, renewing their leases meanwhile. Jobs still running then
+        are put back in the queue for another process and told to stop.
+
+        Returns:
+            int: The number of jobs put back in the queue.
+        """
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            active = dict(self._active)
+        released = 0
+        for job_id, (worker, cancelled) in active.items():
+            released += self.queue.release(job_id, worker)
+            cancelled.set()
+        self._heartbeat_stopping.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join(self.poll_interval + 5)
+        return released
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"threads": self.size, "running": len(self._active), **self._counters}
+
+
+def _graph_and_inputs(job_type: str, params: Dict[str, Any]) -> tuple:
+    if job_type == "topics":
+        return agents.get_topic_ideation_graph(durable=True), TopicIdeationState(
+            original_theme=params["theme"], num_suggestions=params["num_topics"])
+    if job_type == "outline":
+        return agents.get_outline_generation_graph(durable=True), OutlineGenerationState(
+            selected_topic=params["selected_topic"], target_audience=params["target_audience"])
+    return agents.get_theme_to_outlines_graph(durable=True), ThemeToOutlinesState(
+        original_theme=params["theme"], num_suggestions=params["num_topics"],
+        target_audience=params["target_audience"])
+
+
+def run_job(job: Dict[str, Any], cancelled: threading.Event,
+            report_progress: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """
+    Run a job's graph, the way ``JobWorkers`` expects.
+
+    Streams the graph to report progress (the node producing output and the
+    characters streamed so far) at most once a second, and stops between
+    events, between LLM calls and between streamed chunks once ``cancelled`` is set.
+    The graph runs in a bulk scheduler slot of the tenant that submitted the
+    job, waiting for one as long as it takes.
+    The job id is the run's checkpoint id, so a job retried after its worker
+    died continues from the last node that completed.
+    Results have the same shape as the matching synchronous endpoint's response.
+    """
+    job_type, params = job["type"], job["params"]
+    graph, inputs = _graph_and_inputs(job_type, params)
+    progress = {"node": None, "completed_nodes": [], "streamed_chars": 0}
+    result, error, last_report = None, None, 0.0
+
+    with bypass_cache(bool(params.get("bypass_cache"))), \
+            track_usage(f"jobs/{job_type}", params.get("max_tokens"), params.get("max_cost"), cancelled=cancelled) as meter:
+        try:
+            graph_input, config, finished = plan_run(graph, inputs, job["id"])
+            if finished is not None:
+                result = finished
+            else:
+                with scheduled(params.get("tenant", DEFAULT_TENANT), BULK, timeout=None, cancelled=cancelled), \
+                        contextlib.closing(graph.stream(graph_input, config,
+                                                        stream_mode=["messages", "updates", "values"])) as events:
+                    for mode, payload in events:
+                        if cancelled.is_set():
+                            break
+                        if mode == "messages":
+                            chunk, metadata = payload
+                            progress["node"] = metadata.get("langgraph_node")
+                            progress["streamed_chars"] += len(chunk.content) if isinstance(chunk.content, str) else 0
+                        elif mode == "updates":
+                            progress["completed_nodes"].extend(payload)
+                        else:
+                            result = payload
+                        if time.monotonic() - last_report >= 1:
+                            report_progress(progress)
+                            last_report = time.monotonic()
+        except Exception as e:
+            error = f"Error running job: {str(e)}"
+    usage = meter.summary()
+
+    if cancelled.is_set():
+        return {"status": "cancelled", "error": "Job cancelled", "usage": usage}
+    if error or result is None or result.get("error_message"):
+        return {"status": "failed", "error": error or (result or {}).get("error_message") or "Job produced no result",
+                "usage": usage}
+    if job_type == "topics":
+        output = {"generated_topics": result.get("generated_topics", [])}
+    elif job_type == "outline":
+        if not result.get("generated_outline"):
+            return {"status": "failed", "error": "Outline generation failed to produce an outline.", "usage": usage}
+        output = {"generated_outline": result["generated_outline"]}
+    else:
+        output = {"generated_topics": result.get("generated_topics", []),
+                  "generated_outlines": result.get("generated_outlines", [])}
+    return {"status": "succeeded", "result": output, "usage": usage}
+
+
+_job_queue: Optional[JobQueue] = None
+_job_workers: Optional[JobWorkers] = None
+_job_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue, opening its SQLite file on first use."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(JOB_QUEUE_PATH, lease_seconds=JOB_LEASE_SECONDS,
+                                      max_attempts=JOB_MAX_ATTEMPTS, retention_seconds=JOB_RETENTION_SECONDS)
+    return _job_queue
+
+
+def start_job_workers() -> Optional[JobWorkers]:
+    """
+    Start this process's job workers if they aren't running yet. Returns None
+    when JOB_WORKERS is 0, which makes the process submit-only.
+
+    Never call this before forking: threads don't survive a fork.
+    """
+    global _job_workers
+    if JOB_WORKERS <= 0:
+        return None
+    queue = get_job_queue()
+    with _job_lock:
+        if _job_workers is None:
+            _job_workers = JobWorkers(queue, run_job, size=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL)
+            _job_workers.start()
+    return _job_workers
+
+
+def get_job_workers() -> Optional[JobWorkers]:
+    """Return this process's job workers, or None if they were never started."""
+    return _job_workers
+
+
+def stop_job_workers(timeout: float = 30) -> int:
+    """Stop this process's job workers (see ``JobWorkers.stop``); returns the number of jobs put back."""
+    workers = _job_workers
+    return workers.stop(timeout) if workers is not None else 0
@@ -0,0 +1,199 @@
+"""Content-addressed cache for OpenRouter chat completion responses."""
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_DISK_ENTRIES,
+)
+
+
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_cache(enabled: bool = True):
+    """
+    Skip cache reads for LLM calls made inside this block.
+
+    Fresh responses are still written back, so the next cached caller sees
+    them. Uses a context variable, so it follows the request into graph nodes
+    and async tasks.
+    """
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def is_cache_bypassed() -> bool:
+    """Return True if the current context asked to skip cache reads."""
+    return _bypass.get()
+
+
+def make_cache_key(model: str, temperature: float, max_tokens: int,
+                   api_messages: List[Dict[str, Any]], stop: Optional[List[str]] = None) -> str:
+    """Hash everything that determines a completion into a stable cache key."""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "messages": api_messages,
+            "stop": stop,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-memory LRU in front of a SQLite file.
+
+    Entries expire after ``ttl_seconds``. The memory tier holds at most
+    ``max_memory_entries``; the disk tier evicts its oldest entries once it
+    exceeds ``max_disk_entries``. Safe to share across threads.
+    """
+
+    def __init__(self, max_memory_entries: int = 1024, path: Optional[str] = None,
+                 ttl_seconds: float = 86400, max_disk_entries: int = 50000):
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "writes": 0, "evictions": 0}
+
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for ``key``, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ? AND created_at > ?",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self._counters["disk_hits"] += 1
+                    return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._counters["writes"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), now),
+                )
+                # Amortise eviction: only check the table size every 100 writes
+                if self._counters["writes"] % 100 == 0:
+                    self._evict_disk(now)
+
+    def record_bypass(self) -> None:
+        """Count a lookup that was skipped because the caller bypassed the cache."""
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def clear(self) -> None:
+        """Drop every cached response from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, key: str, created_at: float, value: Dict[str, Any]) -> None:
+        """Insert into the memory tier, evicting the least recently used entry. Caller holds the lock."""
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        """Delete expired rows and trim the table to ``max_disk_entries``. Caller holds the lock."""
+        expired = self._db.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,)).rowcount
+        overflow = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY created_at LIMIT ?)",
+                (overflow,),
+            )
+        self._counters["evictions"] += expired + max(overflow, 0)
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None if caching is disabled."""
+    global _response_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                    path=LLM_CACHE_PATH or None,
+                    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                    max_disk_entries=LLM_CACHE_MAX_DISK_ENTRIES,
+                )
+    return _response_cache
@@ -1,13 +1,243 @@
 """LLM service providers and client initialization."""
 from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
-from typing import Any, Dict, List, Optional, Union
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
 
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import json
 
-from config import API_KEY, DEFAULT_MODEL
+from config import (
+    API_KEY,
+    OPENROUTER_API_URL,
+    HTTP_POOL_SIZE,
+    ASYNC_HTTP_POOL_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    PROMPT_CACHE_CONTROL,
+)
+from llm_cache import ResponseCache, get_response_cache, is_cache_bypassed, make_cache_key
+from resilience import OpenRouterError, get_openrouter_guard, parse_retry_after
+from metrics import llm_latency
+from usage import CallTicket, record_cache_hit, start_call
+from tracing import TIMING_ENABLED, observe_http, span
+from model_router import HedgedChatModel, route_models
+
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+# Duration of the last new connection opened by this thread, read back by _post
+_connect_timing = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = time.perf_counter() - started
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        # Covers the TCP connect and the TLS handshake
+        started = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = time.perf_counter() - started
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session used for OpenRouter calls.
+
+    The session keeps connections alive and pools up to ``HTTP_POOL_SIZE`` of
+    them, so concurrent LLM calls reuse TCP/TLS connections instead of doing a
+    fresh handshake each time. It is created lazily and shared by every
+    ``SimpleOpenRouter`` instance.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                if TIMING_ENABLED:
+                    # Time connection setup separately from the request itself
+                    adapter.poolmanager.pool_classes_by_scheme = {
+                        "http": _TimedHTTPConnectionPool,
+                        "https": _TimedHTTPSConnectionPool,
+                    }
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                _http_session = session
+    return _http_session
+
+
+def close_http_session() -> None:
+    """Close the shared HTTP session and its pooled connections."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+
+# One async client per event loop: httpx connections are bound to the loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Return the async HTTP client for the running event loop.
+
+    The client pools up to ``ASYNC_HTTP_POOL_SIZE`` keep-alive connections, so a
+    single worker can keep many OpenRouter calls in flight without a thread
+    per call. Must be called from inside a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_HTTP_POOL_SIZE,
+                max_keepalive_connections=ASYNC_HTTP_POOL_SIZE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_http_client() -> None:
+    """Close the running event loop's async HTTP client, if any."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Return an API message's text, whether its content is a string or a list of parts."""
+    content = message["content"]
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return str(content)
+
+
+def _mark_prefix_cacheable(api_messages: List[Dict[str, Any]]) -> None:
+    """Put an ephemeral cache_control breakpoint on the last leading system message."""
+    last_system = None
+    for index, message in enumerate(api_messages):
+        if message["role"] != "system":
+            break
+        last_system = index
+    if last_system is not None:
+        message = api_messages[last_system]
+        message["content"] = [{"type": "text", "text": _message_text(message), "cache_control": {"type": "ephemeral"}}]
+
+
+def use_prompt_cache_control(model: str) -> bool:
+    """Whether requests to ``model`` should carry explicit cache_control breakpoints."""
+    if PROMPT_CACHE_CONTROL == "auto":
+        # OpenAI, DeepSeek and others cache long prefixes automatically
+        return model.startswith(("anthropic/", "google/"))
+    return PROMPT_CACHE_CONTROL in ("1", "true", "yes", "on")
+
+
+class PromptPrefixStats:
+    """
+    Tracks how much of each OpenRouter request is a system prefix that was
+    already sent before, i.e. the share a provider-side prompt cache can
+    reuse, next to the cached tokens providers actually report.
+    """
+
+    def __init__(self, max_prefixes: int = 1024):
+        self.max_prefixes = max_prefixes
+        self._seen: "OrderedDict[Tuple[str, int], None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "prompt_tokens": 0, "prefix_tokens": 0,
+                          "reused_prefix_tokens": 0, "provider_cached_tokens": 0}
+
+    def observe(self, payload: Dict[str, Any]) -> None:
+        """Record a request about to be sent (estimates at ~4 characters per token)."""
+        messages = payload["messages"]
+        prefix = []
+        for message in messages:
+            if message["role"] != "system":
+                break
+            prefix.append(_message_text(message))
+        prefix_tokens = sum(map(len, prefix)) // 4
+        prompt_tokens = sum(len(_message_text(m)) for m in messages) // 4
+        key = (payload["model"], hash(tuple(prefix)))
+        with self._lock:
+            reused = key in self._seen
+            if reused:
+                self._seen.move_to_end(key)
+            else:
+                self._seen[key] = None
+                if len(self._seen) > self.max_prefixes:
+                    self._seen.popitem(last=False)
+            self._counters["requests"] += 1
+            self._counters["prompt_tokens"] += prompt_tokens
+            self._counters["prefix_tokens"] += prefix_tokens
+            if reused:
+                self._counters["reused_prefix_tokens"] += prefix_tokens
+
+    def record_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Add the cached prompt tokens reported by the provider, if any."""
+        cached = ((usage or {}).get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        if cached:
+            with self._lock:
+                self._counters["provider_cached_tokens"] += cached
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["distinct_prefixes"] = len(self._seen)
+        stats["reusable_prompt_ratio"] = (
+            stats["reused_prefix_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        )
+        return stats
+
+
+prompt_prefix_stats = PromptPrefixStats()
+
+
+class _StreamRecorder:
+    """Accumulates a streamed completion so it can be cached like a regular one."""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.usage: Dict[str, Any] = {}
+        # Set on the [DONE] sentinel; a stream that ended without it may be truncated and isn't cached
+        self.completed = False
+
+    def add(self, chunk: ChatGenerationChunk) -> None:
+        self.parts.append(chunk.text)
+        if chunk.generation_info:
+            self.usage = chunk.generation_info
+
+    def response_json(self) -> Dict[str, Any]:
+        return {
+            "choices": [{"message": {"role": "assistant", "content": "".join(self.parts)}}],
+            "usage": self.usage,
+        }
 
 
 class SimpleOpenRouter(BaseChatModel):
@@ -17,6 +247,12 @@ class SimpleOpenRouter(BaseChatModel):
     model: str
     temperature: float = 0.7
     max_tokens: int = 1500
+    api_url: str = OPENROUTER_API_URL
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT
+    read_timeout: float = HTTP_READ_TIMEOUT
+    use_cache: bool = True
+    # Add a cache_control breakpoint after the system prefix (Anthropic/Gemini prompt caching)
+    prompt_cache_control: bool = False
     
     def _convert_messages_to_dict(self, messages: List[Any]) -> List[Dict[str, str]]:
         """Convert LangChain message objects to API-compatible dictionaries."""
@@ -51,37 +287,207 @@ class SimpleOpenRouter(BaseChatModel):
                 raise ValueError(f"Unsupported message format: {message}")
         return result
     
-    def _generate(self, messages: List[Union[Dict, HumanMessage, SystemMessage, AIMessage]], stop: Optional[List[str]] = None, **kwargs) -> ChatResult:
-        """Generate chat response using OpenRouter API."""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
+    def _build_payload(self, messages: List[Any], stop: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the JSON body for a chat completions request."""
         # Convert messages to format expected by OpenRouter API
         api_messages = self._convert_messages_to_dict(messages)
+        if self.prompt_cache_control:
+            _mark_prefix_cacheable(api_messages)
         
         payload = {
             "model": self.model,
             "messages": api_messages,
             "temperature": self.temperature,
-            "max_tokens": self.max_tokens
+            "max_tokens": self.max_tokens,
+            # Ask OpenRouter to report each call's cost alongside its token counts
+            "usage": {"include": True},
         }
         
         if stop:
             payload["stop"] = stop
-            
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            data=json.dumps(payload)
+
+        return payload
+
+    def _request_kwargs(self, payload: Dict[str, Any], stream: bool = False) -> Dict[str, Any]:
+        """Return the headers and serialized body for posting ``payload``."""
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        if stream:
+            payload = {**payload, "stream": True}
+        return {"headers": headers, "data": json.dumps(payload)}
+
+    def _cache_lookup(self, payload: Dict[str, Any]) -> Tuple[Optional[ResponseCache], Optional[str], Optional[Dict[str, Any]]]:
+        """Return ``(cache, key, cached_response)`` for a payload; all None if caching is off."""
+        cache = get_response_cache() if self.use_cache else None
+        if cache is None:
+            return None, None, None
+        key = make_cache_key(payload["model"], payload["temperature"], payload["max_tokens"],
+                             payload["messages"], payload.get("stop"))
+        if is_cache_bypassed():
+            cache.record_bypass()
+            return cache, key, None
+        return cache, key, cache.get(key)
+
+    def _estimate_prompt_tokens(self, payload: Dict[str, Any]) -> int:
+        """Rough prompt size in tokens (~4 characters per token)."""
+        return sum(len(_message_text(m)) for m in payload["messages"]) // 4
+
+    def _estimate_tokens(self, payload: Dict[str, Any]) -> int:
+        """Rough upper bound on the tokens a request can use, for the tokens/min limiter."""
+        return self._estimate_prompt_tokens(payload) + payload["max_tokens"]
+
+    def _start_call(self, payload: Dict[str, Any], cache: Optional[ResponseCache]) -> Tuple[CallTicket, Optional[ResponseCache]]:
+        """
+        Admit a call against the request's usage budget, lowering the
+        payload's ``max_tokens`` if the budget requires it. A response cut
+        short by the budget isn't cached, so the returned cache is None then.
+        """
+        ticket = start_call(self.model, self._estimate_prompt_tokens(payload), payload["max_tokens"])
+        if ticket.max_tokens < payload["max_tokens"]:
+            payload["max_tokens"] = ticket.max_tokens
+            cache = None
+        return ticket, cache
+
+    def _settle_usage(self, estimated_tokens: int, usage: Optional[Dict[str, Any]]) -> None:
+        """Feed the usage OpenRouter reported back into the rate limiter and prefix stats."""
+        get_openrouter_guard().settle_tokens(estimated_tokens, usage)
+        prompt_prefix_stats.record_usage(usage)
+
+    def _error_from_response(self, status_code: int, headers: Any, body: str) -> OpenRouterError:
+        """Build the error raised for a non-200 OpenRouter response."""
+        try:
+            detail = json.loads(body)
+        except ValueError:
+            detail = body
+        return OpenRouterError(
+            f"Error code: {status_code} - {detail}",
+            status_code=status_code,
+            retry_after=parse_retry_after(headers.get("Retry-After")),
         )
-        
-        if response.status_code != 200:
-            raise ValueError(f"Error code: {response.status_code} - {response.json()}")
-            
-        response_json = response.json()
-        
+
+    def _record_latency(self, seconds: float, stream: bool) -> None:
+        """Record a successful attempt's latency for this model (used to set hedge deadlines)."""
+        llm_latency.observe(seconds, self.model, "first_byte" if stream else "completion")
+
+    def _http_trace(self) -> Tuple[Dict[str, float], Any]:
+        """Return ``(marks, callback)`` for httpx's trace extension, timestamping connection and response events."""
+        marks: Dict[str, float] = {}
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            marks[event] = time.perf_counter()
+
+        return marks, trace
+
+    def _record_async_phases(self, marks: Dict[str, float], started: float) -> None:
+        """Record connect and TTFB from the events collected by ``_http_trace``."""
+        connect_started = marks.get("connection.connect_tcp.started")
+        connected = marks.get("connection.start_tls.complete") or marks.get("connection.connect_tcp.complete")
+        if connect_started and connected:
+            observe_http(self.model, "connect", connected - connect_started)
+        headers = marks.get("http11.receive_response_headers.complete") or marks.get("http2.receive_response_headers.complete")
+        if headers:
+            observe_http(self.model, "ttfb", headers - started)
+
+    def _post(self, payload: Dict[str, Any], estimated_tokens: int, stream: bool = False) -> requests.Response:
+        """
+        POST a chat completion request, applying the shared rate limiter,
+        retry policy and circuit breaker. Returns a 200 response.
+        """
+        guard = get_openrouter_guard()
+        prompt_prefix_stats.observe(payload)
+        attempt = 0
+        while True:
+            attempt += 1
+            wait, probe = guard.before_attempt(estimated_tokens)
+            try:
+                if wait:
+                    time.sleep(wait)
+                started = time.perf_counter()
+                try:
+                    if TIMING_ENABLED:
+                        _connect_timing.seconds = None
+                    with span("openrouter.request", model=self.model, attempt=attempt, stream=stream):
+                        response = get_http_session().post(
+                            self.api_url,
+                            timeout=(self.connect_timeout, self.read_timeout),
+                            stream=stream,
+                            **self._request_kwargs(payload, stream=stream)
+                        )
+                    if TIMING_ENABLED:
+                        if _connect_timing.seconds is not None:
+                            observe_http(self.model, "connect", _connect_timing.seconds)
+                        # requests' elapsed stops once the response headers are parsed
+                        observe_http(self.model, "ttfb", response.elapsed.total_seconds())
+                        if not stream:
+                            observe_http(self.model, "total", time.perf_counter() - started)
+                    if response.status_code != 200:
+                        with response:
+                            raise self._error_from_response(response.status_code, response.headers, response.text)
+                except (requests.ConnectionError, requests.Timeout, OpenRouterError) as e:
+                    delay = guard.on_failure(e, attempt)
+                    if delay is None:
+                        raise
+                    print(f"OpenRouter call failed ({e}); retrying in {delay:.2f}s (attempt {attempt})")
+                    time.sleep(delay)
+                    continue
+                guard.on_success()
+                self._record_latency(time.perf_counter() - started, stream)
+                return response
+            finally:
+                guard.after_attempt(probe)
+
+    async def _apost(self, payload: Dict[str, Any], estimated_tokens: int, stream: bool = False) -> httpx.Response:
+        """
+        Async counterpart of ``_post``. With ``stream=True`` the returned
+        response body is unread and the caller must ``aclose()`` it.
+        """
+        guard = get_openrouter_guard()
+        client = get_async_http_client()
+        prompt_prefix_stats.observe(payload)
+        attempt = 0
+        while True:
+            attempt += 1
+            wait, probe = guard.before_attempt(estimated_tokens)
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                started = time.perf_counter()
+                try:
+                    marks, trace = self._http_trace() if TIMING_ENABLED else (None, None)
+                    request = client.build_request(
+                        "POST",
+                        self.api_url,
+                        timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                        extensions={"trace": trace} if trace else None,
+                        **self._request_kwargs(payload, stream=stream)
+                    )
+                    with span("openrouter.request", model=self.model, attempt=attempt, stream=stream):
+                        response = await client.send(request, stream=stream)
+                    if TIMING_ENABLED:
+                        self._record_async_phases(marks, started)
+                        if not stream:
+                            observe_http(self.model, "total", time.perf_counter() - started)
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode("utf-8", errors="replace")
+                        await response.aclose()
+                        raise self._error_from_response(response.status_code, response.headers, body)
+                except (httpx.TransportError, OpenRouterError) as e:
+                    delay = guard.on_failure(e, attempt)
+                    if delay is None:
+                        raise
+                    print(f"OpenRouter call failed ({e}); retrying in {delay:.2f}s (attempt {attempt})")
+                    await asyncio.sleep(delay)
+                    continue
+                guard.on_success()
+                self._record_latency(time.perf_counter() - started, stream)
+                return response
+            finally:
+                guard.after_attempt(probe)
+
+    def _create_chat_result(self, response_json: Dict[str, Any]) -> ChatResult:
+        """Turn an OpenRouter response body into a ChatResult."""
         # Extract the generated text
         message = response_json["choices"][0]["message"]
         content = message.get("content", "")
@@ -94,21 +500,218 @@ class SimpleOpenRouter(BaseChatModel):
         
         # Return the ChatResult
         return ChatResult(generations=[generation])
+
+    def _generate(self, messages: List[Union[Dict, HumanMessage, SystemMessage, AIMessage]], stop: Optional[List[str]] = None, **kwargs) -> ChatResult:
+        """Generate chat response using OpenRouter API."""
+        payload = self._build_payload(messages, stop)
+        cache, key, cached = self._cache_lookup(payload)
+        if cached is not None:
+            record_cache_hit(self.model)
+            return self._create_chat_result(cached)
+
+        ticket, cache = self._start_call(payload, cache)
+        try:
+            estimated_tokens = self._estimate_tokens(payload)
+            response_json = self._post(payload, estimated_tokens).json()
+            self._settle_usage(estimated_tokens, response_json.get("usage"))
+            ticket.finish(response_json.get("usage"), completion_text=response_json["choices"][0]["message"].get("content") or "")
+        finally:
+            ticket.close()
+        if cache is not None:
+            cache.set(key, response_json)
+        return self._create_chat_result(response_json)
+
+    async def _agenerate(self, messages: List[Union[Dict, HumanMessage, SystemMessage, AIMessage]], stop: Optional[List[str]] = None, **kwargs) -> ChatResult:
+        """Generate chat response using OpenRouter API without blocking the event loop."""
+        payload = self._build_payload(messages, stop)
+        cache, key, cached = self._cache_lookup(payload)
+        if cached is not None:
+            record_cache_hit(self.model)
+            return self._create_chat_result(cached)
+
+        ticket, cache = self._start_call(payload, cache)
+        try:
+            estimated_tokens = self._estimate_tokens(payload)
+            response = await self._apost(payload, estimated_tokens)
+            response_json = response.json()
+            self._settle_usage(estimated_tokens, response_json.get("usage"))
+            ticket.finish(response_json.get("usage"), completion_text=response_json["choices"][0]["message"].get("content") or "")
+        finally:
+            ticket.close()
+        if cache is not None:
+            cache.set(key, response_json)
+        return self._create_chat_result(response_json)
     
+    def _cached_chunk(self, response_json: Dict[str, Any]) -> ChatGenerationChunk:
+        """Wrap a cached completion as one stream chunk."""
+        generation = self._create_chat_result(response_json).generations[0]
+        return ChatGenerationChunk(
+            message=AIMessageChunk(content=generation.message.content),
+            generation_info=generation.generation_info
+        )
+
+    def _parse_stream_line(self, line: str) -> Optional[ChatGenerationChunk]:
+        """
+        Parse one line of OpenRouter's server-sent event stream.
+
+        Returns None for keep-alive comments, blank lines and events without
+        content. Raises StopIteration on the ``[DONE]`` sentinel.
+        """
+        if not line.startswith("data:"):
+            # Blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            raise StopIteration
+        event = json.loads(data)
+        if "error" in event:
+            raise ValueError(f"Stream error: {event['error']}")
+
+        choices = event.get("choices") or [{}]
+        content = (choices[0].get("delta") or {}).get("content") or ""
+        usage = event.get("usage")
+        if not content and not usage:
+            return None
+        return ChatGenerationChunk(
+            message=AIMessageChunk(content=content),
+            generation_info=usage
+        )
+
+    def _stream(self, messages: List[Union[Dict, HumanMessage, SystemMessage, AIMessage]], stop: Optional[List[str]] = None, run_manager: Optional[Any] = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """Stream chat response tokens from OpenRouter as they are generated."""
+        payload = self._build_payload(messages, stop)
+        cache, key, cached = self._cache_lookup(payload)
+        if cached is not None:
+            # Replay the cached completion as a single chunk
+            record_cache_hit(self.model)
+            chunk = self._cached_chunk(cached)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+
+        recorder = _StreamRecorder()
+        ticket, cache = self._start_call(payload, cache)
+        estimated_tokens = self._estimate_tokens(payload)
+        try:
+            # Retries only cover establishing the stream; a failure mid-stream is raised
+            with self._post(payload, estimated_tokens, stream=True) as response:
+                headers_at = time.perf_counter()
+                for raw_line in response.iter_lines():
+                    try:
+                        chunk = self._parse_stream_line(raw_line.decode("utf-8"))
+                    except StopIteration:
+                        recorder.completed = True
+                        break
+                    if chunk is None:
+                        continue
+                    recorder.add(chunk)
+                    ticket.check_cancelled()
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                if TIMING_ENABLED:
+                    observe_http(self.model, "total", time.perf_counter() - headers_at + response.elapsed.total_seconds())
+        finally:
+            # An abandoned stream was still billed for what it generated so far
+            if recorder.parts or recorder.usage:
+                ticket.finish(recorder.usage, completion_text="".join(recorder.parts))
+            ticket.close()
+
+        self._settle_usage(estimated_tokens, recorder.usage)
+        if cache is not None and recorder.completed:
+            cache.set(key, recorder.response_json())
+
+    async def _astream(self, messages: List[Union[Dict, HumanMessage, SystemMessage, AIMessage]], stop: Optional[List[str]] = None, run_manager: Optional[Any] = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream chat response tokens from OpenRouter without blocking the event loop."""
+        payload = self._build_payload(messages, stop)
+        cache, key, cached = self._cache_lookup(payload)
+        if cached is not None:
+            record_cache_hit(self.model)
+            chunk = self._cached_chunk(cached)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+
+        recorder = _StreamRecorder()
+        ticket, cache = self._start_call(payload, cache)
+        estimated_tokens = self._estimate_tokens(payload)
+        try:
+            response = await self._apost(payload, estimated_tokens, stream=True)
+        except BaseException:
+            ticket.close()
+            raise
+        try:
+            async for line in response.aiter_lines():
+                try:
+                    chunk = self._parse_stream_line(line)
+                except StopIteration:
+                    recorder.completed = True
+                    break
+                if chunk is None:
+                    continue
+                recorder.add(chunk)
+                ticket.check_cancelled()
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            if TIMING_ENABLED:
+                # httpx's elapsed runs from sending the request until the response is closed
+                await response.aclose()
+                observe_http(self.model, "total", response.elapsed.total_seconds())
+        finally:
+            await response.aclose()
+            if recorder.parts or recorder.usage:
+                ticket.finish(recorder.usage, completion_text="".join(recorder.parts))
+            ticket.close()
+
+        self._settle_usage(estimated_tokens, recorder.usage)
+        if cache is not None and recorder.completed:
+            cache.set(key, recorder.response_json())
+
     def _llm_type(self) -> str:
         """Return type of LLM."""
         return "openrouter"
 
 
-def get_llm(model_name=None):
+def get_response_text(llm_response: Any) -> str:
+    """Extract the generated text from whatever an LLM call returned."""
+    # The response could be a ChatResult, Message, or a string
+    if hasattr(llm_response, 'generations') and llm_response.generations:
+        # It's a ChatResult
+        return llm_response.generations[0].message.content
+    if hasattr(llm_response, 'content'):
+        # It's a Message
+        return llm_response.content
+    # Assume it's a string or something we can convert to string
+    return str(llm_response)
+
+
+def _openrouter_client(model: str) -> SimpleOpenRouter:
+    return SimpleOpenRouter(
+        api_key=API_KEY,
+        model=model,
+        temperature=0.7,
+        max_tokens=1500,
+        prompt_cache_control=use_prompt_cache_control(model),
+    )
+
+
+def get_llm(model_name=None, task=None):
     """
     Initialize and return a LangChain LLM client.
     
     Args:
-        model_name (str, optional): The model to use. Defaults to config.DEFAULT_MODEL.
+        model_name (str, optional): The model to use. Defaults to the task's
+            routed model (config.TOPIC_MODEL / config.OUTLINE_MODEL), then config.DEFAULT_MODEL.
+        task (str, optional): The workflow step the client is for, ``"topics"``
+            or ``"outline"``. Selects the routed model and its hedge model.
     
     Returns:
-        LLM: A LangChain language model client.
+        LLM: A LangChain language model client, built once per process for
+        each model/task and shared. When the task has a hedge model
+        configured this is a HedgedChatModel racing both models.
     
     Raises:
         ValueError: If API_KEY is not set.
@@ -119,11 +722,14 @@ def get_llm(model_name=None):
             "Please set it in your .env file or environment variables."
         )
     
-    model = model_name or DEFAULT_MODEL
-    
-    return SimpleOpenRouter(
-        api_key=API_KEY,
-        model=model,
-        temperature=0.7,
-        max_tokens=1500,
-    ) 
\ No newline at end of file
+    return _routed_llm(model_name, task)
+
+
+@lru_cache(maxsize=None)
+def _routed_llm(model_name: Optional[str], task: Optional[str]) -> BaseChatModel:
+    # Clients only hold configuration, so one per (model, task) is shared by every call
+    model, hedge_model = route_models(task, model_name)
+    llm = _openrouter_client(model)
+    if hedge_model:
+        return HedgedChatModel(primary=llm, hedge=_openrouter_client(hedge_model))
+    return llm
@@ -0,0 +1,154 @@
+"""Lightweight in-process latency histograms with Prometheus text export."""
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Bucket upper bounds in seconds, growing by ~1.5x from 10ms to ~5 minutes
+DEFAULT_BUCKETS: Tuple[float, ...] = tuple(round(0.01 * 1.5 ** i, 4) for i in range(26))
+# Finer bounds for sub-millisecond work (parsing, local nodes, connection setup), 50us to ~70s
+FINE_BUCKETS: Tuple[float, ...] = tuple(round(0.00005 * 1.5 ** i, 6) for i in range(36))
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket histogram of durations in seconds.
+
+    Observing is one ``bisect`` and a counter increment under a lock, so it
+    is cheap enough to record every LLM call. Percentiles are interpolated
+    within a bucket, which is precise enough for picking deadlines.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One extra slot for observations above the last bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the estimated ``pct``-th percentile, or None with no observations."""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+
+        rank = total * pct / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1] * 2
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Return count, mean and p50/p95/p99 for stats endpoints."""
+        with self._lock:
+            count, total = self.count, self.sum
+        return {
+            "count": count,
+            "mean": round(total / count, 4) if count else None,
+            "p50": self._rounded(50),
+            "p95": self._rounded(95),
+            "p99": self._rounded(99),
+        }
+
+    def _rounded(self, pct: float) -> Optional[float]:
+        value = self.percentile(pct)
+        return round(value, 4) if value is not None else None
+
+
+# Families with a name, in registration order, exported by ``render_prometheus``
+REGISTRY: List["HistogramFamily"] = []
+
+
+class HistogramFamily:
+    """
+    A set of histograms keyed by label values, e.g. ``(model, phase)``.
+
+    Families created with a ``name`` are registered for the ``/metrics``
+    endpoint under that Prometheus metric name.
+    """
+
+    def __init__(self, label_names: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 name: Optional[str] = None, description: str = ""):
+        self.label_names = tuple(label_names)
+        self.bucket_bounds = tuple(buckets)
+        self.name = name
+        self.description = description
+        self._histograms: Dict[Tuple[str, ...], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        if name:
+            REGISTRY.append(self)
+
+    def get(self, *labels: str) -> LatencyHistogram:
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(labels, LatencyHistogram(self.bucket_bounds))
+        return histogram
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        self.get(*labels).observe(seconds)
+
+    def items(self):
+        with self._lock:
+            return list(self._histograms.items())
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Return each histogram's summary keyed by its labels joined with '/'."""
+        return {"/".join(labels): histogram.snapshot() for labels, histogram in self.items()}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def render_prometheus(families: Optional[Sequence[HistogramFamily]] = None) -> str:
+    """Render histogram families (default: every registered one) in the Prometheus text format."""
+    lines = []
+    for family in REGISTRY if families is None else families:
+        lines.append(f"# HELP {family.name} {family.description}")
+        lines.append(f"# TYPE {family.name} histogram")
+        for labels, histogram in sorted(family.items()):
+            with histogram._lock:
+                counts, count, total = list(histogram.counts), histogram.count, histogram.sum
+            pairs = list(zip(family.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{family.name}_bucket{_labels(pairs + [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{family.name}_bucket{_labels(pairs + [('le', '+Inf')])} {count}")
+            lines.append(f"{family.name}_sum{_labels(pairs)} {total!r}")
+            lines.append(f"{family.name}_count{_labels(pairs)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def render_gauge(name: str, description: str, label_names: Sequence[str],
+                 samples: Dict[Tuple[str, ...], float]) -> str:
+    """Render one gauge, given as ``{label values: value}``, in the Prometheus text format."""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+    for labels, value in sorted(samples.items()):
+        lines.append(f"{name}{_labels(list(zip(label_names, labels)))} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+# Per-attempt OpenRouter latency: "completion" is the full response of a
+# regular call, "first_byte" the time until a streamed response started.
+llm_latency = HistogramFamily(("model", "phase"), name="llm_attempt_duration_seconds",
+                              description="Successful OpenRouter attempt latency (drives hedge deadlines).")
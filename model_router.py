@@ -0,0 +1,274 @@
+"""Per-task model routing and hedged requests for tail latency."""
+import asyncio
+import contextvars
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from config import (
+    DEFAULT_MODEL,
+    TOPIC_MODEL,
+    OUTLINE_MODEL,
+    TOPIC_HEDGE_MODEL,
+    OUTLINE_HEDGE_MODEL,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_DEFAULT_DELAY,
+    HEDGE_POOL_SIZE,
+)
+from metrics import llm_latency
+
+
+TOPICS = "topics"
+OUTLINE = "outline"
+
+# Task -> (primary model, hedge model); an empty hedge model disables hedging
+TASK_ROUTES: Dict[str, tuple] = {
+    TOPICS: (TOPIC_MODEL, TOPIC_HEDGE_MODEL),
+    OUTLINE: (OUTLINE_MODEL, OUTLINE_HEDGE_MODEL),
+}
+
+
+def route_models(task: Optional[str] = None, model_name: Optional[str] = None) -> tuple:
+    """
+    Return ``(primary_model, hedge_model_or_None)`` for a task.
+
+    An explicit ``model_name`` overrides the task's primary model but keeps
+    its hedge model, so pinned requests still get tail-latency protection.
+    """
+    primary, hedge = TASK_ROUTES.get(task, (DEFAULT_MODEL, ""))
+    primary = model_name or primary or DEFAULT_MODEL
+    return primary, (hedge if hedge and hedge != primary else None)
+
+
+def hedge_delay(model: str, phase: str) -> float:
+    """
+    Seconds to wait for ``model`` before firing the hedge request: its
+    observed ``HEDGE_PERCENTILE`` latency once enough calls were recorded,
+    ``HEDGE_DEFAULT_DELAY`` until then.
+    """
+    histogram = llm_latency.get(model, phase)
+    if histogram.count < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return histogram.percentile(HEDGE_PERCENTILE)
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+_counters = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+_counters_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="llm-hedge")
+    return _hedge_pool
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def hedge_stats() -> Dict[str, Any]:
+    """Return how often hedges fired and how often the hedge model won."""
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["hedge_rate"] = stats["hedged"] / stats["calls"] if stats["calls"] else 0.0
+    return stats
+
+
+def _submit(fn, *args, **kwargs):
+    # Run in a copy of the caller's context so per-request settings such as
+    # bypass_cache() still apply on the pool thread
+    return _get_hedge_pool().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model that sends a request to ``primary`` and, if it hasn't answered
+    within its percentile deadline, the same request to ``hedge``. The first
+    successful answer wins and the other request is cancelled.
+
+    For streams the race is on the first chunk; after that the winner's
+    stream is passed through. Async losers are cancelled outright, which
+    closes their connection; a sync loser is abandoned and its thread stops
+    at the next chunk (or when its response arrives).
+    """
+
+    primary: BaseChatModel
+    hedge: BaseChatModel
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    def _won(self, winner: str, hedged: bool) -> None:
+        if hedged and winner == "hedge":
+            _count("hedge_wins")
+
+    def _generate(self, messages: List[Any], stop: Optional[List[str]] = None, **kwargs) -> ChatResult:
+        _count("calls")
+        kwargs.pop("run_manager", None)
+        futures = {_submit(self.primary._generate, messages, stop=stop, **kwargs): "primary"}
+        done, _ = wait(futures, timeout=hedge_delay(self.primary.model, "completion"))
+        if not done:
+            _count("hedged")
+            futures[_submit(self.hedge._generate, messages, stop=stop, **kwargs)] = "hedge"
+
+        pending = set(futures)
+        errors = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    self._won(futures[future], len(futures) > 1)
+                    return future.result()
+                errors[futures[future]] = future.exception()
+        raise errors.get("primary") or errors["hedge"]
+
+    async def _agenerate(self, messages: List[Any], stop: Optional[List[str]] = None, **kwargs) -> ChatResult:
+        _count("calls")
+        kwargs.pop("run_manager", None)
+        tasks = {asyncio.ensure_future(self.primary._agenerate(messages, stop=stop, **kwargs)): "primary"}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay(self.primary.model, "completion"))
+            if not done:
+                _count("hedged")
+                tasks[asyncio.ensure_future(self.hedge._agenerate(messages, stop=stop, **kwargs))] = "hedge"
+
+            pending = set(tasks)
+            errors = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._won(tasks[task], len(tasks) > 1)
+                        return task.result()
+                    errors[tasks[task]] = task.exception()
+            raise errors.get("primary") or errors["hedge"]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _stream(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Optional[Any] = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        _count("calls")
+        events: "queue.Queue" = queue.Queue()
+        cancelled = {"primary": threading.Event(), "hedge": threading.Event()}
+        _DONE = object()
+
+        def pump(name: str, llm: BaseChatModel):
+            stream = llm._stream(messages, stop=stop, **kwargs)
+            try:
+                for chunk in stream:
+                    if cancelled[name].is_set():
+                        return
+                    events.put((name, chunk, None))
+                events.put((name, _DONE, None))
+            except Exception as e:
+                events.put((name, None, e))
+            finally:
+                stream.close()
+
+        _submit(pump, "primary", self.primary)
+        started = ["primary"]
+        winner = None
+        errors = {}
+        try:
+            try:
+                first = events.get(timeout=hedge_delay(self.primary.model, "first_byte"))
+            except queue.Empty:
+                _count("hedged")
+                _submit(pump, "hedge", self.hedge)
+                started.append("hedge")
+                first = events.get()
+
+            # Take the first stream to produce anything; only fail once every stream failed
+            while True:
+                name, item, error = first
+                if error is None:
+                    winner = name
+                    break
+                errors[name] = error
+                if len(errors) == len(started):
+                    raise errors.get("primary") or errors["hedge"]
+                first = events.get()
+
+            for name in started:
+                if name != winner:
+                    cancelled[name].set()
+            self._won(winner, len(started) > 1)
+
+            while item is not _DONE:
+                if run_manager:
+                    run_manager.on_llm_new_token(item.text, chunk=item)
+                yield item
+                name, item, error = events.get()
+                while name != winner:
+                    name, item, error = events.get()
+                if error is not None:
+                    raise error
+        finally:
+            for event in cancelled.values():
+                event.set()
+
+    async def _astream(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Optional[Any] = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        _count("calls")
+        streams = {"primary": self.primary._astream(messages, stop=stop, **kwargs)}
+        firsts = {asyncio.ensure_future(streams["primary"].__anext__()): "primary"}
+        winner = None
+        try:
+            done, _ = await asyncio.wait(firsts, timeout=hedge_delay(self.primary.model, "first_byte"))
+            if not done:
+                _count("hedged")
+                streams["hedge"] = self.hedge._astream(messages, stop=stop, **kwargs)
+                firsts[asyncio.ensure_future(streams["hedge"].__anext__())] = "hedge"
+
+            pending = set(firsts)
+            errors = {}
+            while winner is None:
+                if not pending:
+                    raise errors.get("primary") or errors["hedge"]
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None or isinstance(error, StopAsyncIteration):
+                        winner, first_task = firsts[task], task
+                        break
+                    errors[firsts[task]] = error
+        finally:
+            # Cancel and close every stream but the winner, releasing its connection
+            for task, name in firsts.items():
+                if name != winner:
+                    task.cancel()
+                    try:
+                        await task
+                    except BaseException:
+                        pass
+                    await streams[name].aclose()
+
+        self._won(winner, len(streams) > 1)
+        if isinstance(first_task.exception(), StopAsyncIteration):
+            return
+        stream = streams[winner]
+        try:
+            chunk = first_task.result()
+            while True:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+        finally:
+            await stream.aclose()
@@ -0,0 +1,162 @@
+"""
+Immutable outlines with memoized exports.
+
+Graph state keeps outlines as plain dicts, which checkpoints and the API
+serialize as JSON. Export paths wrap one in an ``Outline`` instead: building
+it shares the dict's strings rather than copying them, and each export format
+(JSON, Markdown, HTML) is rendered in a single pass the first time it is
+asked for and then served from a cache on the outline.
+"""
+import html
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+# Export format -> (display name, MIME type, file extension)
+EXPORT_FORMATS = {
+    "json": ("JSON", "application/json", "json"),
+    "markdown": ("Markdown", "text/markdown", "md"),
+    "html": ("HTML", "text/html", "html"),
+}
+
+
+class _Frozen:
+    """Base for slotted classes whose attributes can't change after ``__init__``."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class Section(_Frozen):
+    """One outline section: its heading and key points."""
+
+    __slots__ = ("heading", "key_points")
+
+    def __init__(self, heading: str, key_points: Iterable[str]):
+        object.__setattr__(self, "heading", heading)
+        object.__setattr__(self, "key_points", tuple(key_points))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"heading": self.heading, "key_points": list(self.key_points)}
+
+
+class Outline(_Frozen):
+    """
+    A blog outline with the fields of ``agents.outline_agent.BlogOutline``.
+
+    Outlines are immutable, so an export never goes stale: ``to_json``,
+    ``to_markdown`` and ``to_html`` each render once per outline.
+    """
+
+    __slots__ = ("title_suggestion", "introduction_hook", "sections", "conclusion_summary", "call_to_action",
+                 "_exports")
+
+    def __init__(self, title_suggestion: str, introduction_hook: str, sections: Iterable[Section],
+                 conclusion_summary: str, call_to_action: Optional[str] = None):
+        object.__setattr__(self, "title_suggestion", title_suggestion)
+        object.__setattr__(self, "introduction_hook", introduction_hook)
+        object.__setattr__(self, "sections", tuple(sections))
+        object.__setattr__(self, "conclusion_summary", conclusion_summary)
+        object.__setattr__(self, "call_to_action", call_to_action)
+        object.__setattr__(self, "_exports", {})
+
+    @classmethod
+    def from_dict(cls, outline: Dict[str, Any]) -> "Outline":
+        """Wrap a validated outline dict, as found in ``generated_outline``."""
+        return cls(
+            outline["title_suggestion"],
+            outline["introduction_hook"],
+            [Section(section["heading"], section["key_points"]) for section in outline["sections"]],
+            outline["conclusion_summary"],
+            outline.get("call_to_action"),
+        )
+
+    @classmethod
+    def coerce(cls, outline: Union["Outline", Dict[str, Any]]) -> "Outline":
+        """Return ``outline`` itself if it already is an Outline, else wrap it."""
+        return outline if isinstance(outline, cls) else cls.from_dict(outline)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a new dict in the shape the graphs and the API use."""
+        return {
+            "title_suggestion": self.title_suggestion,
+            "introduction_hook": self.introduction_hook,
+            "sections": [section.to_dict() for section in self.sections],
+            "conclusion_summary": self.conclusion_summary,
+            "call_to_action": self.call_to_action,
+        }
+
+    def _export(self, key: Any, render: Callable[[], str]) -> str:
+        # Two threads racing on a first render both produce the same string, so no lock
+        value = self._exports.get(key)
+        if value is None:
+            value = self._exports[key] = render()
+        return value
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return self._export(("json", indent), lambda: json.dumps(self.to_dict(), indent=indent))
+
+    def to_markdown(self) -> str:
+        return self._export("markdown", self._render_markdown)
+
+    def to_html(self) -> str:
+        """Return a standalone HTML document."""
+        return self._export("html", self._render_html)
+
+    def render(self, export_format: str) -> str:
+        """
+        Render one of ``EXPORT_FORMATS``.
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        if export_format == "json":
+            return self.to_json()
+        if export_format == "markdown":
+            return self.to_markdown()
+        if export_format == "html":
+            return self.to_html()
+        raise ValueError(f"Unknown export format {export_format!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+
+    def _render_markdown(self) -> str:
+        parts: List[str] = ["# ", self.title_suggestion, "\n\n## Introduction\n", self.introduction_hook, "\n\n"]
+        for section in self.sections:
+            parts += ("## ", section.heading, "\n")
+            for point in section.key_points:
+                parts += ("- ", point, "\n")
+            parts.append("\n")
+        parts += ("## Conclusion\n", self.conclusion_summary, "\n\n")
+        if self.call_to_action:
+            parts += ("### Call to Action\n", self.call_to_action, "\n")
+        return "".join(parts)
+
+    def _render_html(self) -> str:
+        escape = html.escape
+        title = escape(self.title_suggestion)
+        parts: List[str] = [
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n<title>', title,
+            "</title>\n</head>\n<body>\n<h1>", title, "</h1>\n<h2>Introduction</h2>\n<p>",
+            escape(self.introduction_hook), "</p>\n",
+        ]
+        for section in self.sections:
+            parts += ("<h2>", escape(section.heading), "</h2>\n<ul>\n")
+            for point in section.key_points:
+                parts += ("<li>", escape(point), "</li>\n")
+            parts.append("</ul>\n")
+        parts += ("<h2>Conclusion</h2>\n<p>", escape(self.conclusion_summary), "</p>\n")
+        if self.call_to_action:
+            parts += ("<h3>Call to Action</h3>\n<p>", escape(self.call_to_action), "</p>\n")
+        parts.append("</body>\n</html>\n")
+        return "".join(parts)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Outline):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Outline({self.title_suggestion!r}, {len(self.sections)} sections)"
@@ -1,4 +1,12 @@
-"""Centralized prompt templates for all agents."""
+"""Centralized prompt templates for all agents.
+
+System prompts take no per-request parameters, so the start of every request
+for a workflow is byte-identical and can be served from provider-side prompt
+caches; anything request-specific belongs in the human prompt.
+"""
+from functools import lru_cache
+
+from langchain_core.messages import HumanMessage, SystemMessage
 
 # --- Topic Ideation Agent Prompts ---
 
@@ -11,7 +19,7 @@ Consider the following when generating topics:
 - **Uniqueness:** Does it offer a fresh angle or perspective if the theme is common?
 - **SEO Potential (Implicit):** Think about topics that people might be searching for, even if keywords aren't explicitly requested yet.
 
-Output exactly {num_suggestions} topic suggestions.
+Output exactly the number of topic suggestions requested.
 Each suggestion should be a single, concise title or idea.
 Present the suggestions as a numbered list, with each topic on a new line. For example:
 1. Topic one
@@ -47,4 +55,46 @@ Ensure the JSON output is complete and correctly formatted.
 OUTLINE_GENERATION_HUMAN_PROMPT = """
 Blog Post Topic: {topic}
 Target Audience: {audience}
-""" 
\ No newline at end of file
+""" 
+# --- Outline Repair Prompts ---
+
+OUTLINE_REPAIR_SYSTEM_PROMPT = """
+You repair malformed JSON produced for a blog post outline.
+Reply with only the requested JSON object: no explanations and no markdown code fences.
+Keep the original wording wherever it is usable.
+"""
+
+OUTLINE_SECTION_REPAIR_PROMPT = """
+This fragment was meant to be one section of a blog post outline, but it is invalid.
+Error: {error}
+
+Fragment:
+{fragment}
+
+Return the corrected section as a JSON object with a "heading" string and a "key_points" array of strings.
+"""
+
+OUTLINE_FIELDS_REPAIR_PROMPT = """
+A blog post outline for the topic "{topic}" with the sections {headings} is missing these fields:
+{fields}
+
+Return a JSON object containing exactly these fields, each as a string.
+"""
+
+
+# --- Precompiled messages ---
+
+@lru_cache(maxsize=None)
+def system_message(template: str, **params) -> SystemMessage:
+    """
+    Return the formatted system message for a template, built once per
+    parameter set. The message is shared between requests and must not be
+    mutated.
+    """
+    return SystemMessage(content=template.format(**params))
+
+
+@lru_cache(maxsize=4096)
+def human_message(template: str, **params) -> HumanMessage:
+    """Return the formatted human message for a template, cached per parameter set. Must not be mutated."""
+    return HumanMessage(content=template.format(**params))
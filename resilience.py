@@ -0,0 +1,254 @@
+"""Client-side rate limiting, retries and circuit breaking for OpenRouter calls."""
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import (
+    OPENROUTER_REQUESTS_PER_MINUTE,
+    OPENROUTER_TOKENS_PER_MINUTE,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RECOVERY_SECONDS,
+)
+
+
+# Statuses worth retrying: throttling, timeouts and transient server errors
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class OpenRouterError(ValueError):
+    """A non-200 response from OpenRouter. Subclasses ValueError for existing callers."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in RETRYABLE_STATUS_CODES
+
+
+class CircuitOpenError(OpenRouterError):
+    """Raised without calling OpenRouter while the circuit breaker is open."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at ``rate_per_minute``.
+
+    ``reserve`` takes tokens immediately, letting the balance go negative, and
+    returns how long the caller must wait before proceeding. That keeps the
+    sync and async paths identical: one sleeps with ``time.sleep``, the other
+    with ``asyncio.sleep``.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens and return the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Never demand more than a full bucket, or a huge request could wait forever
+            self._tokens -= min(amount, self.capacity)
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def refund(self, amount: float) -> None:
+        """Return over-reserved tokens, e.g. when a call used fewer than estimated."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class CircuitBreaker:
+    """
+    Fails fast after ``failure_threshold`` consecutive provider failures.
+
+    After ``recovery_timeout`` seconds one probe call is let through
+    (half-open); its success closes the circuit, its failure re-opens it.
+    A probe that ends with neither, e.g. because it was cancelled, is
+    released so the next call probes again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # Increments with every probe, so only the current probe can release the half-open state
+        self._probe = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def before_call(self) -> Optional[int]:
+        """
+        Raise CircuitOpenError unless a call may go out now.
+
+        Returns:
+            int: A token for ``release_probe`` if this call is the half-open probe, else None.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return None
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe += 1
+                return self._probe
+            self.rejected += 1
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(f"OpenRouter circuit is open; retry in {retry_in:.1f}s", retry_after=retry_in)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release_probe(self, probe: Optional[int]) -> None:
+        """Let the next call probe again if the probe ``before_call`` returned ended without an outcome."""
+        with self._lock:
+            if probe is not None and probe == self._probe and self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic() - self.recovery_timeout
+
+
+class OpenRouterGuard:
+    """
+    Process-wide policy applied around every OpenRouter request: a shared
+    requests/min and tokens/min limiter, jittered exponential retry that
+    honours Retry-After, and a circuit breaker.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 20.0,
+                 failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "throttled_seconds": 0.0, "failures": 0}
+
+    def before_attempt(self, estimated_tokens: int) -> Tuple[float, Optional[int]]:
+        """
+        Check the breaker and reserve rate-limit capacity.
+
+        Returns:
+            tuple: The seconds to wait first, and the breaker's probe token (see ``CircuitBreaker.before_call``).
+        """
+        probe = self.breaker.before_call()
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["throttled_seconds"] += wait
+        return wait, probe
+
+    def settle_tokens(self, estimated_tokens: int, usage: Optional[Dict[str, Any]]) -> None:
+        """Refund the difference between the reserved estimate and the tokens actually used."""
+        if self.token_bucket and usage and usage.get("total_tokens"):
+            unused = estimated_tokens - usage["total_tokens"]
+            if unused > 0:
+                self.token_bucket.refund(unused)
+
+    def on_success(self) -> None:
+        self.breaker.record_success()
+
+    def after_attempt(self, probe: Optional[int]) -> None:
+        """Call once an attempt is over, however it ended, so an abandoned probe can't hold the circuit half-open."""
+        self.breaker.release_probe(probe)
+
+    def on_failure(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Record a failed attempt and return the delay before retrying, or None
+        if the error should be raised to the caller.
+        """
+        status = getattr(error, "status_code", None)
+        # Throttling and client errors mean the provider is up; only outages count against the breaker
+        if status is None or (status != 429 and status in RETRYABLE_STATUS_CODES):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        with self._lock:
+            self._counters["failures"] += 1
+
+        retryable = getattr(error, "retryable", True) and not isinstance(error, CircuitOpenError)
+        if not retryable or attempt >= self.max_attempts:
+            return None
+
+        # Full jitter, but never earlier than the server asked for
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        with self._lock:
+            self._counters["retries"] += 1
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 3)
+        stats["circuit_state"] = self.breaker.state
+        stats["circuit_rejections"] = self.breaker.rejected
+        return stats
+
+
+_guard: Optional[OpenRouterGuard] = None
+_guard_lock = threading.Lock()
+
+
+def get_openrouter_guard() -> OpenRouterGuard:
+    """Return the process-wide guard shared by every SimpleOpenRouter instance."""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = OpenRouterGuard(
+                    requests_per_minute=OPENROUTER_REQUESTS_PER_MINUTE,
+                    tokens_per_minute=OPENROUTER_TOKENS_PER_MINUTE,
+                    max_attempts=RETRY_MAX_ATTEMPTS,
+                    base_delay=RETRY_BASE_DELAY,
+                    max_delay=RETRY_MAX_DELAY,
+                    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                    recovery_timeout=CIRCUIT_RECOVERY_SECONDS,
+                )
+    return _guard
@@ -0,0 +1,352 @@
+"""
+Weighted fair scheduling of graph runs across tenants.
+
+Every graph run the API starts (topics, outline, pipeline, batch item,
+background job, speculative outline) first takes one of
+SCHEDULER_CONCURRENCY slots in its process. Waiting runs are queued per
+tenant, the client identified by its X-API-Key header (see TENANTS), in two
+classes: interactive (/api/topics, /api/outline and their streams) and bulk
+(everything else). A free slot goes to an interactive run if one waits, and
+bulk runs never hold more than SCHEDULER_BULK_CONCURRENCY slots, so a
+busy batch client can't keep interactive users waiting.
+
+Within a class, slots are shared by weighted fair queuing on tokens: each
+tenant's virtual time advances by the tokens its runs use (plus a small
+per-run overhead) divided by its weight, and the waiting tenant with the
+lowest virtual time goes next. A tenant may also be capped at
+``max_concurrency`` running graphs and ``tokens_per_minute``. Limits apply
+per API process.
+"""
+import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from config import (
+    SCHEDULER_ENABLED,
+    SCHEDULER_CONCURRENCY,
+    SCHEDULER_BULK_CONCURRENCY,
+    SCHEDULER_QUEUE_TIMEOUT,
+    SCHEDULER_MAX_QUEUED,
+    TENANTS,
+)
+from metrics import HistogramFamily, render_gauge
+from resilience import TokenBucket
+from usage import RequestCancelledError, track_usage
+
+INTERACTIVE, BULK = "interactive", "bulk"
+# In the order free slots are offered
+PRIORITIES = (INTERACTIVE, BULK)
+DEFAULT_TENANT = "default"
+
+# Tokens a run is charged when it starts, until its actual usage is known
+NOMINAL_RUN_TOKENS = 1000
+# Added to every run's usage, so runs answered from a cache still count for the slot time they took
+RUN_OVERHEAD_TOKENS = 100
+# How often a waiting run re-checks its deadline, cancellation and refilled quotas
+_POLL_INTERVAL = 0.25
+
+scheduler_wait = HistogramFamily(("tenant", "priority"), name="scheduler_wait_seconds",
+                                 description="Time graph runs waited for a scheduler slot, per tenant.")
+
+
+class AdmissionError(RuntimeError):
+    """A graph run the scheduler turned away; ``status_code`` is the HTTP status to answer with."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = round(retry_after, 1) if retry_after is not None else None
+
+
+class QueueFullError(AdmissionError):
+    """Raised when a tenant already has SCHEDULER_MAX_QUEUED runs waiting."""
+
+    status_code = 429
+
+
+class QuotaExceededError(AdmissionError):
+    """Raised when a tenant's token quota won't refill before the run would time out."""
+
+    status_code = 429
+
+
+class QueueTimeoutError(AdmissionError):
+    """Raised when no slot freed up within the run's queue timeout."""
+
+
+class UnknownTenantError(ValueError):
+    """Raised for an API key that belongs to no configured tenant."""
+
+
+class Tenant:
+    """A client's scheduling weight and limits (0 = unlimited)."""
+
+    __slots__ = ("name", "weight", "max_concurrency", "tokens_per_minute")
+
+    def __init__(self, name: str, weight: float = 1.0, max_concurrency: int = 0, tokens_per_minute: float = 0):
+        if weight <= 0:
+            raise ValueError(f"Tenant {name} needs a positive weight")
+        self.name = name
+        self.weight = float(weight)
+        self.max_concurrency = int(max_concurrency)
+        self.tokens_per_minute = float(tokens_per_minute)
+
+
+def load_tenants(config: Dict[str, Dict[str, Any]]) -> Dict[str, Tenant]:
+    """
+    Build tenants from the TENANTS setting, keyed by API key. Tenants without
+    a ``name`` are named after a hash of their key, so keys never show up in metrics.
+    """
+    tenants = {}
+    for api_key, spec in config.items():
+        name = spec.get("name") or f"tenant-{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]}"
+        tenants[api_key] = Tenant(name, spec.get("weight", 1.0), spec.get("max_concurrency", 0),
+                                  spec.get("tokens_per_minute", 0))
+    return tenants
+
+
+_tenants_by_key = load_tenants(TENANTS)
+
+
+def resolve_tenant(api_key: Optional[str]) -> str:
+    """
+    Return the name of the tenant an API key belongs to. Requests without a
+    key, and every request while no tenants are configured, use DEFAULT_TENANT.
+
+    Raises:
+        UnknownTenantError: If tenants are configured and none has this key.
+    """
+    if not api_key or not _tenants_by_key:
+        return DEFAULT_TENANT
+    tenant = _tenants_by_key.get(api_key)
+    if tenant is None:
+        raise UnknownTenantError("Unknown API key")
+    return tenant.name
+
+
+class _Waiter:
+    """A run waiting for a slot; ``granted`` is set when it gets one."""
+
+    __slots__ = ("enqueued", "granted")
+
+    def __init__(self):
+        self.enqueued = time.monotonic()
+        self.granted = threading.Event()
+
+
+class _TenantState:
+    __slots__ = ("tenant", "queues", "running", "virtual_time", "quota", "counters")
+
+    def __init__(self, tenant: Tenant):
+        self.tenant = tenant
+        self.queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        self.running = {priority: 0 for priority in PRIORITIES}
+        self.virtual_time = 0.0
+        self.quota = TokenBucket(tenant.tokens_per_minute) if tenant.tokens_per_minute > 0 else None
+        self.counters = {"admitted": 0, "rejected_queue_full": 0, "rejected_quota": 0, "timed_out": 0,
+                         "cancelled": 0, "tokens": 0}
+
+    def idle(self) -> bool:
+        return not any(self.queues.values()) and not any(self.running.values())
+
+    def throttled(self) -> bool:
+        return self.quota is not None and self.quota.reserve(0) > 0
+
+
+class FairScheduler:
+    """
+    Hands out ``concurrency`` slots for graph runs, at most
+    ``bulk_concurrency`` of them to bulk runs, fairly across tenants; see the
+    module docstring. Runs of unknown tenant names count as DEFAULT_TENANT.
+    """
+
+    def __init__(self, tenants: Iterable[Tenant] = (), concurrency: int = 16, bulk_concurrency: int = 12,
+                 max_queued: int = 64):
+        self.concurrency = max(1, concurrency)
+        self.bulk_concurrency = max(1, min(bulk_concurrency, self.concurrency))
+        self.max_queued = max_queued
+        self._tenants = {tenant.name: _TenantState(tenant) for tenant in tenants}
+        self._tenants.setdefault(DEFAULT_TENANT, _TenantState(Tenant(DEFAULT_TENANT)))
+        self._running = {priority: 0 for priority in PRIORITIES}
+        # Virtual time of the last run started; tenants that were idle start from here
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, tenant: str = DEFAULT_TENANT, priority: str = INTERACTIVE, timeout: Optional[float] = None,
+             cancelled: Optional[threading.Event] = None):
+        """
+        Wait for a slot, hold it for the block and charge the tenant for the
+        tokens the block's LLM calls use.
+
+        Args:
+            tenant (str): Tenant name, from ``resolve_tenant``.
+            priority (str): INTERACTIVE or BULK.
+            timeout (float, optional): Seconds to wait at most; None waits until ``cancelled``.
+            cancelled (threading.Event, optional): Stops the wait once set.
+
+        Raises:
+            AdmissionError: If the tenant's queue is full, its quota is used
+                up for longer than ``timeout``, or no slot freed up in time.
+            RequestCancelledError: If ``cancelled`` was set while waiting.
+        """
+        state = self._tenants.get(tenant) or self._tenants[DEFAULT_TENANT]
+        waiter = self._enqueue(state, priority, timeout)
+        self._wait(state, priority, waiter, timeout, cancelled)
+        tokens = 0
+        try:
+            with track_usage() as meter:
+                yield
+            tokens = meter.tokens
+        finally:
+            self._release(state, priority, tokens)
+
+    def _enqueue(self, state: _TenantState, priority: str, timeout: Optional[float]) -> _Waiter:
+        name = state.tenant.name
+        with self._lock:
+            refill = state.quota.reserve(0) if state.quota is not None else 0.0
+            if timeout is not None and refill > timeout:
+                state.counters["rejected_quota"] += 1
+                raise QuotaExceededError(f"Tenant {name} used up its token quota; retry in {refill:.0f}s",
+                                         retry_after=refill)
+            if self.max_queued and sum(len(queue) for queue in state.queues.values()) >= self.max_queued:
+                state.counters["rejected_queue_full"] += 1
+                raise QueueFullError(f"Tenant {name} has too many requests waiting", retry_after=1.0)
+            if state.idle():
+                # No credit for time spent idle
+                state.virtual_time = max(state.virtual_time, self._virtual_time)
+            waiter = _Waiter()
+            state.queues[priority].append(waiter)
+            self._dispatch()
+        return waiter
+
+    def _wait(self, state: _TenantState, priority: str, waiter: _Waiter, timeout: Optional[float],
+              cancelled: Optional[threading.Event]) -> None:
+        deadline = None if timeout is None else waiter.enqueued + timeout
+        while not waiter.granted.wait(_POLL_INTERVAL if deadline is None
+                                      else max(0.0, min(_POLL_INTERVAL, deadline - time.monotonic()))):
+            with self._lock:
+                # Quotas refill without an event of their own
+                self._dispatch()
+                if waiter.granted.is_set():
+                    break
+                timed_out = deadline is not None and time.monotonic() >= deadline
+                if not timed_out and not (cancelled is not None and cancelled.is_set()):
+                    continue
+                state.queues[priority].remove(waiter)
+                state.counters["timed_out" if timed_out else "cancelled"] += 1
+            if timed_out:
+                raise QueueTimeoutError(f"No capacity for tenant {state.tenant.name} within {timeout:.0f}s",
+                                        retry_after=timeout)
+            raise RequestCancelledError("Request cancelled")
+        scheduler_wait.observe(time.monotonic() - waiter.enqueued, state.tenant.name, priority)
+
+    def _dispatch(self) -> None:
+        """Start waiting runs while slots are free. Call with ``_lock`` held."""
+        throttled = {name for name, state in self._tenants.items() if any(state.queues.values()) and state.throttled()}
+        while sum(self._running.values()) < self.concurrency:
+            picked = None
+            for priority in PRIORITIES:
+                if priority == BULK and self._running[BULK] >= self.bulk_concurrency:
+                    continue
+                best = None
+                for name, state in self._tenants.items():
+                    queue = state.queues[priority]
+                    if not queue or name in throttled:
+                        continue
+                    cap = state.tenant.max_concurrency
+                    if cap and sum(state.running.values()) >= cap:
+                        continue
+                    if best is None or (state.virtual_time, queue[0].enqueued) < \
+                            (best.virtual_time, best.queues[priority][0].enqueued):
+                        best = state
+                if best is not None:
+                    picked = best, priority
+                    break
+            if picked is None:
+                return
+            state, priority = picked
+            waiter = state.queues[priority].popleft()
+            state.running[priority] += 1
+            state.counters["admitted"] += 1
+            self._running[priority] += 1
+            self._virtual_time = state.virtual_time
+            state.virtual_time += NOMINAL_RUN_TOKENS / state.tenant.weight
+            waiter.granted.set()
+
+    def _release(self, state: _TenantState, priority: str, tokens: int) -> None:
+        with self._lock:
+            state.running[priority] -= 1
+            self._running[priority] -= 1
+            # Replace the nominal charge with what the run actually used
+            state.virtual_time += (tokens + RUN_OVERHEAD_TOKENS - NOMINAL_RUN_TOKENS) / state.tenant.weight
+            state.counters["tokens"] += tokens
+            if state.quota is not None and tokens:
+                state.quota.reserve(tokens)
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report slot usage, and per tenant its queue depth, counters and wait times."""
+        with self._lock:
+            tenants = {
+                name: {
+                    "weight": state.tenant.weight,
+                    "max_concurrency": state.tenant.max_concurrency,
+                    "tokens_per_minute": state.tenant.tokens_per_minute,
+                    "running": dict(state.running),
+                    "queued": {priority: len(queue) for priority, queue in state.queues.items()},
+                    **state.counters,
+                }
+                for name, state in self._tenants.items()
+            }
+            running = dict(self._running)
+        for (name, priority), histogram in scheduler_wait.items():
+            if name in tenants:
+                tenants[name].setdefault("wait", {})[priority] = histogram.snapshot()
+        return {"enabled": True, "concurrency": self.concurrency, "bulk_concurrency": self.bulk_concurrency,
+                "running": running, "tenants": tenants}
+
+    def render_prometheus(self) -> str:
+        """Export running and queued runs per tenant and priority as Prometheus gauges."""
+        with self._lock:
+            running = {(name, priority): float(count) for name, state in self._tenants.items()
+                       for priority, count in state.running.items()}
+            queued = {(name, priority): float(len(queue)) for name, state in self._tenants.items()
+                      for priority, queue in state.queues.items()}
+        labels = ("tenant", "priority")
+        return (render_gauge("scheduler_running_runs", "Graph runs holding a scheduler slot.", labels, running)
+                + render_gauge("scheduler_queue_depth", "Graph runs waiting for a scheduler slot.", labels, queued))
+
+
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Optional[FairScheduler]:
+    """Return the process-wide scheduler, or None if SCHEDULER_ENABLED is off."""
+    global _scheduler
+    if not SCHEDULER_ENABLED:
+        return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler(_tenants_by_key.values(), concurrency=SCHEDULER_CONCURRENCY,
+                                           bulk_concurrency=SCHEDULER_BULK_CONCURRENCY,
+                                           max_queued=SCHEDULER_MAX_QUEUED)
+    return _scheduler
+
+
+def scheduled(tenant: str = DEFAULT_TENANT, priority: str = INTERACTIVE,
+              timeout: Optional[float] = SCHEDULER_QUEUE_TIMEOUT, cancelled: Optional[threading.Event] = None):
+    """
+    Return a context that holds a scheduler slot for a graph run (see
+    ``FairScheduler.slot``), or a no-op context with scheduling disabled.
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return nullcontext()
+    return scheduler.slot(tenant, priority, timeout, cancelled)
@@ -0,0 +1,191 @@
+"""Near-duplicate cache for topic ideation results, keyed by theme similarity.
+
+Themes are normalized (including common abbreviations) and embedded locally
+as hashed, TF-IDF weighted character n-grams, so "AI in education" and
+"Artificial intelligence in education" land close together without calling
+an embedding API.
+"""
+import math
+import re
+import threading
+import zlib
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_CAPACITY,
+    SEMANTIC_CACHE_DIM,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Common long forms collapsed to the abbreviation people also type
+_ABBREVIATIONS = {
+    "artificial intelligence": "ai",
+    "machine learning": "ml",
+    "deep learning": "dl",
+    "natural language processing": "nlp",
+    "large language models": "llms",
+    "large language model": "llm",
+    "internet of things": "iot",
+    "search engine optimization": "seo",
+    "user experience": "ux",
+    "user interface": "ui",
+    "virtual reality": "vr",
+    "augmented reality": "ar",
+    "software as a service": "saas",
+    "return on investment": "roi",
+    "do it yourself": "diy",
+}
+_ABBREVIATION_PATTERN = re.compile(r"\b(" + "|".join(sorted(_ABBREVIATIONS, key=len, reverse=True)) + r")\b")
+_STOPWORDS = frozenset({"a", "an", "and", "the", "of", "in", "on", "for", "to", "with", "at", "by", "from", "vs", "or"})
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_theme(theme: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace and abbreviate common long forms."""
+    normalized = " ".join(_NON_WORD.sub(" ", theme.lower()).split())
+    return _ABBREVIATION_PATTERN.sub(lambda m: _ABBREVIATIONS[m.group(1)], normalized)
+
+
+def theme_features(theme: str) -> List[str]:
+    """
+    Return the hashed features for a normalized theme.
+
+    Features are character 3-grams of each content word (with boundary
+    markers) plus the content words themselves.
+    """
+    words = [w for w in theme.split() if w not in _STOPWORDS] or theme.split()
+    features = []
+    for word in words:
+        padded = f" {word} "
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        features.append(f"w:{word}")
+    return features
+
+
+class SemanticThemeCache:
+    """
+    Bounded similarity index from themes to previously generated topics.
+
+    Vectors live in a preallocated ``(capacity, dim)`` float32 matrix that is
+    reused as a ring buffer: once full, the oldest entry is overwritten. IDF
+    weights are updated incrementally as themes are added; stored vectors keep
+    the weights they were inserted with. Safe to share across threads.
+    """
+
+    def __init__(self, capacity: int = 10000, dim: int = 256, threshold: float = 0.85):
+        self.capacity = capacity
+        self.dim = dim
+        self.threshold = threshold
+        # numpy is imported on first use, so processes with the cache disabled never load it
+        import numpy as np
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._topic_counts = np.zeros(capacity, dtype=np.int32)
+        self._themes: List[Optional[str]] = [None] * capacity
+        self._topics: List[Optional[List[str]]] = [None] * capacity
+        self._doc_freq = np.zeros(dim, dtype=np.float64)
+        self._num_docs = 0
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "inserts": 0, "evictions": 0}
+
+    def _term_counts(self, theme: str) -> "np.ndarray":
+        import numpy as np
+        counts = np.zeros(self.dim, dtype=np.float64)
+        for feature in theme_features(theme):
+            counts[zlib.crc32(feature.encode("utf-8")) % self.dim] += 1.0
+        return counts
+
+    def _vectorize(self, counts: "np.ndarray") -> "np.ndarray":
+        """Apply sublinear TF and the current IDF weights, then L2-normalize."""
+        import numpy as np
+        present = counts > 0
+        weights = np.zeros(self.dim, dtype=np.float64)
+        idf = np.log((1.0 + self._num_docs) / (1.0 + self._doc_freq[present])) + 1.0
+        weights[present] = (1.0 + np.log(counts[present])) * idf
+        norm = math.sqrt(float(weights @ weights))
+        if norm:
+            weights /= norm
+        return weights.astype(np.float32)
+
+    def lookup(self, theme: str, num_suggestions: int) -> Optional[List[str]]:
+        """
+        Return cached topics for the most similar theme, if it is similar enough.
+
+        Only entries holding at least ``num_suggestions`` topics are considered;
+        the first ``num_suggestions`` of them are returned.
+        """
+        import numpy as np
+        normalized = normalize_theme(theme)
+        with self._lock:
+            if self._size:
+                query = self._vectorize(self._term_counts(normalized))
+                scores = self._vectors[:self._size] @ query
+                scores[self._topic_counts[:self._size] < num_suggestions] = -1.0
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._counters["hits"] += 1
+                    return list(self._topics[best][:num_suggestions])
+            self._counters["misses"] += 1
+            return None
+
+    def add(self, theme: str, topics: List[str]) -> None:
+        """Index the topics generated for a theme."""
+        normalized = normalize_theme(theme)
+        if not normalized or not topics:
+            return
+        with self._lock:
+            counts = self._term_counts(normalized)
+            slot = self._next
+            if self._themes[slot] is not None:
+                # Ring buffer is full: forget the oldest theme's document frequencies
+                self._doc_freq -= self._term_counts(self._themes[slot]) > 0
+                self._num_docs -= 1
+                self._counters["evictions"] += 1
+            self._doc_freq += counts > 0
+            self._num_docs += 1
+
+            self._vectors[slot] = self._vectorize(counts)
+            self._topic_counts[slot] = len(topics)
+            self._themes[slot] = normalized
+            self._topics[slot] = list(topics)
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self._counters["inserts"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, size and index memory footprint."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = self._size
+        stats["capacity"] = self.capacity
+        stats["threshold"] = self.threshold
+        stats["index_bytes"] = self._vectors.nbytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_semantic_cache: Optional[SemanticThemeCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticThemeCache]:
+    """Return the process-wide theme cache, or None if it is disabled."""
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticThemeCache(
+                    capacity=SEMANTIC_CACHE_CAPACITY,
+                    dim=SEMANTIC_CACHE_DIM,
+                    threshold=SEMANTIC_CACHE_THRESHOLD,
+                )
+    return _semantic_cache
@@ -0,0 +1,67 @@
+"""In-flight deduplication ("single-flight") for identical concurrent calls."""
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for and share its result (or exception). Once it
+    finishes the key is forgotten, so later calls run again. Safe to share
+    across threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run ``fn`` once for all concurrent callers using ``key``.
+
+        Followers receive a deep copy of the leader's result so they can't
+        affect each other by mutating it.
+        """
+        with self._lock:
+            self._counters["calls"] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self._counters["executions"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call, execution and coalescing counters."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._in_flight)
+        stats["coalesced_ratio"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+
+# Lives at module level here rather than in app.py: Streamlit re-executes the
+# app script on every rerun, but imported modules are only loaded once.
+generation_flights = SingleFlight()
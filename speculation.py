@@ -0,0 +1,291 @@
+"""
+Speculative outline pre-generation.
+
+Users nearly always pick one of the first few suggested topics and then wait
+for its outline. With SPECULATIVE_OUTLINES_ENABLED, every successful topic run
+queues outlines for its first SPECULATIVE_TOP_K topics (for DEFAULT_AUDIENCE)
+on a small background pool, within a token budget per round. Finished
+outlines are kept in a bounded SQLite store shared by all API processes, so a
+matching outline request is answered without calling the model.
+
+A request for an outline that is still being generated in this process waits
+for it; one that was queued but not started takes it over instead.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from checkpointing import invoke_run
+from scheduler import BULK, DEFAULT_TENANT, scheduled
+from config import (
+    DEFAULT_AUDIENCE,
+    SPECULATIVE_OUTLINES_ENABLED,
+    SPECULATIVE_TOP_K,
+    SPECULATIVE_MAX_TOKENS,
+    SPECULATIVE_CONCURRENCY,
+    SPECULATIVE_CACHE_PATH,
+    SPECULATIVE_CACHE_ENTRIES,
+    SPECULATIVE_TTL_SECONDS,
+)
+from states import OutlineGenerationState
+from usage import track_usage
+import agents
+
+
+def outline_key(selected_topic: str, target_audience: str) -> str:
+    """Key an outline by its topic and audience, ignoring case and surrounding whitespace."""
+    canonical = json.dumps([selected_topic.strip().casefold(), target_audience.strip().casefold()],
+                           ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SpeculativeOutlineStore:
+    """
+    Bounded SQLite store of speculatively generated outlines.
+
+    Entries expire after ``ttl_seconds``; past ``max_entries`` the oldest are
+    evicted. Each entry remembers whether it was ever served, so its tokens
+    count as used exactly once, whichever process serves it.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS speculative_outlines ("
+            "key TEXT PRIMARY KEY, outline TEXT NOT NULL, run_id TEXT, tokens INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, served INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS speculative_outlines_created_at "
+                         "ON speculative_outlines (created_at)")
+
+    def put(self, key: str, outline: Dict[str, Any], run_id: Optional[str], tokens: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO speculative_outlines (key, outline, run_id, tokens, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(outline), run_id, tokens, now),
+            )
+            self._writes += 1
+            # Amortise eviction like the response cache
+            if self._writes % 50 == 0:
+                self._db.execute("DELETE FROM speculative_outlines WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._db.execute(
+                    "DELETE FROM speculative_outlines WHERE key IN (SELECT key FROM speculative_outlines "
+                    "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM speculative_outlines WHERE key = ? AND created_at > ?",
+                                   (key, time.time() - self.ttl_seconds)).fetchone()
+        return row is not None
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[str], int]]:
+        """
+        Return ``(outline, run_id, newly_used_tokens)`` for a live entry, or None.
+        ``newly_used_tokens`` is the entry's tokens the first time it is served, then 0.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT outline, run_id, tokens FROM speculative_outlines WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            first = self._db.execute("UPDATE speculative_outlines SET served = 1 WHERE key = ? AND served = 0",
+                                     (key,)).rowcount == 1
+        return json.loads(row[0]), row[1], row[2] if first else 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM speculative_outlines").fetchone()[0]
+
+
+class _Pending:
+    """An outline queued for speculation in this process."""
+
+    __slots__ = ("future", "started")
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.started = False
+
+
+class OutlineSpeculator:
+    """
+    Generates outlines for likely-selected topics in the background and
+    serves them to matching outline requests.
+
+    Rounds (the top ``top_k`` topics of one topic run) run on ``concurrency``
+    threads, one outline after another and most likely topic first, each
+    round within ``max_tokens`` (0 = unlimited). At most ``max_queued``
+    rounds wait; further ones are dropped.
+    """
+
+    def __init__(self, store: SpeculativeOutlineStore, top_k: int = 2, max_tokens: int = 0,
+                 concurrency: int = 2, max_queued: Optional[int] = None):
+        self.store = store
+        self.top_k = top_k
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.max_queued = max_queued if max_queued is not None else concurrency * 8
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, _Pending] = {}
+        self._queued_rounds = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._counters = {"rounds": 0, "dropped_rounds": 0, "generated": 0, "failed": 0, "taken_over": 0,
+                          "lookups": 0, "hits": 0, "inflight_hits": 0, "spent_tokens": 0, "used_tokens": 0}
+
+    def schedule(self, topics: List[str], target_audience: str = DEFAULT_AUDIENCE,
+                 tenant: str = DEFAULT_TENANT) -> int:
+        """
+        Queue outlines for the first ``top_k`` topics that aren't stored or
+        queued yet, as bulk work of ``tenant``; return how many.
+        """
+        items = []
+        with self._lock:
+            if self._queued_rounds >= self.max_queued:
+                self._counters["dropped_rounds"] += 1
+                return 0
+            for topic in topics[:self.top_k]:
+                key = outline_key(topic, target_audience)
+                if key in self._pending or self.store.contains(key):
+                    continue
+                self._pending[key] = _Pending()
+                items.append((key, topic))
+            if not items:
+                return 0
+            self._queued_rounds += 1
+            self._counters["rounds"] += 1
+            if self._executor is None:
+                # Created on first use, so never in gunicorn's master before forking
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                    thread_name_prefix="speculative-outline")
+            executor = self._executor
+        executor.submit(self._run_round, items, target_audience, tenant)
+        return len(items)
+
+    def _run_round(self, items: List[Tuple[str, str]], target_audience: str, tenant: str) -> None:
+        with self._lock:
+            self._queued_rounds -= 1
+        # Executor threads don't inherit the topic request's context, so neither its cache bypass nor its budget apply
+        with track_usage("speculative", self.max_tokens) as meter:
+            for key, topic in items:
+                spent_before = meter.tokens
+                pending, outline, run_id = None, None, None
+                try:
+                    # Only "started" once it has a slot, so requests never wait behind the scheduler's queue
+                    with scheduled(tenant, BULK, timeout=None, cancelled=self._stopping):
+                        with self._lock:
+                            pending = self._pending.get(key)
+                            if pending is None:
+                                # A request took it over before it started
+                                continue
+                            pending.started = True
+                        result = invoke_run(agents.get_outline_generation_graph(durable=True),
+                                            OutlineGenerationState(selected_topic=topic, target_audience=target_audience))
+                    if not result.get("error_message"):
+                        outline, run_id = result.get("generated_outline"), result["run_id"]
+                except Exception as e:
+                    print(f"Error in speculative outline: {e}")
+                if pending is None:
+                    # Taken over, or stopped while waiting for a slot (then the next lookup takes it over)
+                    continue
+                tokens = meter.tokens - spent_before
+                if outline:
+                    self.store.put(key, outline, run_id, tokens)
+                with self._lock:
+                    self._counters["generated" if outline else "failed"] += 1
+                    self._counters["spent_tokens"] += tokens
+                    self._pending.pop(key, None)
+                pending.future.set_result(outline is not None)
+
+    def lookup(self, selected_topic: str, target_audience: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a speculatively generated outline as an outline run's final
+        state (with no LLM usage of its own), or None on a miss. Waits for the
+        outline if this process is generating it right now.
+        """
+        key = outline_key(selected_topic, target_audience)
+        with self._lock:
+            self._counters["lookups"] += 1
+            pending = self._pending.get(key)
+            if pending is not None and not pending.started:
+                del self._pending[key]
+                self._counters["taken_over"] += 1
+                pending.future.set_result(False)
+                return None
+        waited = pending is not None and pending.future.result()
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        outline, run_id, newly_used = entry
+        with self._lock:
+            self._counters["hits"] += 1
+            self._counters["inflight_hits"] += waited
+            self._counters["used_tokens"] += newly_used
+        return {"selected_topic": selected_topic, "target_audience": target_audience,
+                "generated_outline": outline, "error_message": None, "llm_usage": [], "run_id": run_id}
+
+    def stop(self) -> None:
+        """Drop queued rounds; the outline being generated, if any, finishes."""
+        self._stopping.set()
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            pending = len(self._pending)
+        spent, used = counters["spent_tokens"], counters["used_tokens"]
+        return {
+            "enabled": True,
+            **counters,
+            "pending": pending,
+            "entries": len(self.store),
+            "hit_rate": round(counters["hits"] / counters["lookups"], 4) if counters["lookups"] else 0.0,
+            # Tokens spent on outlines nobody (yet) asked for
+            "wasted_token_ratio": round(1 - used / spent, 4) if spent else 0.0,
+        }
+
+
+_speculator: Optional[OutlineSpeculator] = None
+_speculator_lock = threading.Lock()
+
+
+def get_speculator() -> Optional[OutlineSpeculator]:
+    """Return the process-wide outline speculator, or None if speculation is disabled."""
+    global _speculator
+    if not SPECULATIVE_OUTLINES_ENABLED:
+        return None
+    if _speculator is None:
+        with _speculator_lock:
+            if _speculator is None:
+                _speculator = OutlineSpeculator(
+                    SpeculativeOutlineStore(SPECULATIVE_CACHE_PATH or ":memory:",
+                                            max_entries=SPECULATIVE_CACHE_ENTRIES,
+                                            ttl_seconds=SPECULATIVE_TTL_SECONDS),
+                    top_k=SPECULATIVE_TOP_K,
+                    max_tokens=SPECULATIVE_MAX_TOKENS,
+                    concurrency=SPECULATIVE_CONCURRENCY,
+                )
+    return _speculator
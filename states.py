@@ -8,6 +8,8 @@ class TopicIdeationState(TypedDict, total=False):
     num_suggestions: int
     generated_topics: Optional[List[str]]
     error_message: Optional[str]
+    # One record per LLM call (model, tokens, cost, latency, cache hit); see usage.summarize_usage
+    llm_usage: Optional[List[Dict[str, Any]]]
 
 
 class OutlineGenerationState(TypedDict, total=False):
@@ -15,4 +17,25 @@ class OutlineGenerationState(TypedDict, total=False):
     selected_topic: str
     target_audience: Optional[str]
     generated_outline: Optional[Dict[str, Any]]
-    error_message: Optional[str] 
\ No newline at end of file
+    error_message: Optional[str]
+    # Repair stage: the parsed-but-defective outline and what is wrong with it
+    outline_draft: Optional[Dict[str, Any]]
+    outline_defects: Optional[List[Dict[str, Any]]]
+    # Error to report to the model when the whole outline is regenerated
+    outline_feedback: Optional[str]
+    outline_attempts: int
+    outline_repairs: Optional[List[Dict[str, str]]]
+    # One record per LLM call (model, tokens, cost, latency, cache hit); see usage.summarize_usage
+    llm_usage: Optional[List[Dict[str, Any]]]
+
+
+class ThemeToOutlinesState(TypedDict, total=False):
+    """State for the combined theme-to-outlines workflow."""
+    original_theme: str
+    num_suggestions: int
+    target_audience: Optional[str]
+    generated_topics: Optional[List[str]]
+    generated_outlines: Optional[List[Dict[str, Any]]]
+    error_message: Optional[str]
+    # One record per LLM call (model, tokens, cost, latency, cache hit); see usage.summarize_usage
+    llm_usage: Optional[List[Dict[str, Any]]]
@@ -0,0 +1,84 @@
+"""Timing instrumentation for graph nodes, OpenRouter HTTP calls and parsing."""
+import inspect
+import time
+from contextlib import nullcontext
+from typing import Any, Callable
+
+from config import METRICS_ENABLED, OTEL_ENABLED
+from metrics import FINE_BUCKETS, HistogramFamily
+
+
+node_latency = HistogramFamily(("node",), FINE_BUCKETS, name="graph_node_duration_seconds",
+                               description="Wall time of each LangGraph node run.")
+# Per attempt: "connect" (new connections only, TCP plus TLS), "ttfb" until the
+# response headers arrived and "total" until the body was fully read
+http_latency = HistogramFamily(("model", "phase"), FINE_BUCKETS, name="openrouter_http_duration_seconds",
+                               description="OpenRouter HTTP request phases: connect, ttfb, total.")
+parse_latency = HistogramFamily(("parser",), FINE_BUCKETS, name="llm_parse_duration_seconds",
+                                description="CPU time spent parsing LLM output, per response.")
+
+_tracer = None
+if OTEL_ENABLED:
+    try:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("agentic-blog-app")
+    except ImportError:
+        print("WARNING: OTEL_ENABLED is set but opentelemetry-api is not installed; spans are disabled")
+
+# Checked on hot paths; with both off, instrumentation reduces to this one branch
+TIMING_ENABLED = METRICS_ENABLED or _tracer is not None
+
+
+def span(name: str, **attributes: Any):
+    """Return an OpenTelemetry span context for ``name``, or a no-op context without a tracer."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def timed_node(name: str, node: Callable) -> Callable:
+    """
+    Wrap a graph node so each run is recorded in ``node_latency`` and, with
+    OpenTelemetry enabled, traced as a span. Works for sync and async nodes.
+
+    With instrumentation disabled the node is returned unchanged, so the
+    graph pays nothing for it.
+    """
+    if not TIMING_ENABLED:
+        return node
+    histogram = node_latency.get(name) if METRICS_ENABLED else None
+
+    if inspect.iscoroutinefunction(node):
+        async def atimed_node(state):
+            started = time.perf_counter()
+            try:
+                with span(f"node {name}", **{"langgraph.node": name}):
+                    return await node(state)
+            finally:
+                if histogram is not None:
+                    histogram.observe(time.perf_counter() - started)
+        return atimed_node
+
+    def timed_node(state):
+        started = time.perf_counter()
+        try:
+            if _tracer is None:
+                return node(state)
+            with span(f"node {name}", **{"langgraph.node": name}):
+                return node(state)
+        finally:
+            if histogram is not None:
+                histogram.observe(time.perf_counter() - started)
+    return timed_node
+
+
+def observe_parse(parser: str, seconds: float) -> None:
+    """Record the time spent parsing one LLM response."""
+    if METRICS_ENABLED:
+        parse_latency.observe(seconds, parser)
+
+
+def observe_http(model: str, phase: str, seconds: float) -> None:
+    """Record one phase of an OpenRouter HTTP attempt."""
+    if METRICS_ENABLED:
+        http_latency.observe(seconds, model, phase)
@@ -0,0 +1,402 @@
+"""Token and cost accounting for LLM calls, with per-request budgets."""
+import contextvars
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import MODEL_PRICES
+
+
+# A call whose budget leaves fewer completion tokens than this is refused
+# rather than sent, since the answer would be cut off almost immediately
+MIN_COMPLETION_TOKENS = 64
+
+
+class BudgetExceededError(ValueError):
+    """Raised before an LLM call that the request's token or cost budget can't cover."""
+
+
+class RequestCancelledError(RuntimeError):
+    """Raised by LLM calls, including streams between chunks, once their request was cancelled."""
+
+
+def cost_of(model: str, usage: Optional[Dict[str, Any]]) -> Optional[float]:
+    """
+    Return the USD cost of one call: the ``cost`` OpenRouter reports when
+    usage accounting is on, else a price from ``MODEL_PRICES``, else None.
+    """
+    if not usage:
+        return None
+    if usage.get("cost") is not None:
+        return float(usage["cost"])
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    prompt_price, completion_price = prices
+    return (usage.get("prompt_tokens", 0) * prompt_price + usage.get("completion_tokens", 0) * completion_price) / 1e6
+
+
+def _estimated_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Worst-case cost of a call before it is sent; 0 for models without a known price."""
+    return cost_of(model, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}) or 0.0
+
+
+# Serializes admission so concurrent calls see each other's reservations
+_admit_lock = threading.Lock()
+
+
+class UsageMeter:
+    """
+    Collects the LLM calls made inside a ``track_usage`` block.
+
+    Meters nest: a call is added to the innermost meter and every meter
+    around it, and must fit within the budget of each. In-flight calls hold a
+    reservation for their worst case (prompt plus ``max_tokens``), so calls
+    running concurrently for one request can't jointly overshoot it.
+    """
+
+    def __init__(self, endpoint: Optional[str] = None, max_tokens: Optional[int] = None,
+                 max_cost: Optional[float] = None, parent: Optional["UsageMeter"] = None,
+                 cancelled: Optional[threading.Event] = None):
+        self.parent = parent
+        self.cancelled = cancelled
+        self.endpoint = endpoint or (parent.endpoint if parent else None)
+        self.max_tokens = max_tokens or None
+        self.max_cost = max_cost or None
+        self.records: List[Dict[str, Any]] = []
+        self.tokens = 0
+        self.cost = 0.0
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+        self._lock = threading.Lock()
+
+    def _chain(self):
+        meter = self
+        while meter is not None:
+            yield meter
+            meter = meter.parent
+
+    def is_cancelled(self) -> bool:
+        """Whether this meter's request, or one enclosing it, was cancelled."""
+        return any(meter.cancelled is not None and meter.cancelled.is_set() for meter in self._chain())
+
+    def admit(self, model: str, prompt_tokens: int, max_completion_tokens: int) -> int:
+        """
+        Reserve budget for a call and return the ``max_tokens`` it may use,
+        lowered so the call fits in what is left.
+
+        Raises:
+            BudgetExceededError: If any enclosing budget can't cover the prompt
+                plus ``MIN_COMPLETION_TOKENS``.
+        """
+        with _admit_lock:
+            allowed = max_completion_tokens
+            for meter in self._chain():
+                allowed = min(allowed, meter._completion_allowance(model, prompt_tokens, allowed))
+            if allowed < min(MIN_COMPLETION_TOKENS, max_completion_tokens):
+                raise BudgetExceededError(
+                    f"Request budget exceeded: {model} needs ~{prompt_tokens} prompt tokens "
+                    f"but only {max(allowed, 0)} completion tokens remain in the budget"
+                )
+            cost = _estimated_cost(model, prompt_tokens, allowed)
+            for meter in self._chain():
+                with meter._lock:
+                    meter._reserved_tokens += prompt_tokens + allowed
+                    meter._reserved_cost += cost
+        return allowed
+
+    def _completion_allowance(self, model: str, prompt_tokens: int, wanted: int) -> int:
+        with self._lock:
+            allowed = wanted
+            if self.max_tokens is not None:
+                allowed = min(allowed, self.max_tokens - self.tokens - self._reserved_tokens - prompt_tokens)
+            if self.max_cost is not None:
+                remaining = self.max_cost - self.cost - self._reserved_cost
+                prices = MODEL_PRICES.get(model)
+                if remaining <= 0:
+                    allowed = 0
+                elif prices and prices[1] > 0:
+                    left = remaining - prompt_tokens * prices[0] / 1e6
+                    allowed = min(allowed, int(left * 1e6 / prices[1]))
+        return allowed
+
+    def release(self, reserved_tokens: int, reserved_cost: float) -> None:
+        for meter in self._chain():
+            with meter._lock:
+                meter._reserved_tokens -= reserved_tokens
+                meter._reserved_cost -= reserved_cost
+
+    def add(self, record: Dict[str, Any]) -> None:
+        for meter in self._chain():
+            with meter._lock:
+                meter.records.append(record)
+                meter.tokens += record["total_tokens"]
+                meter.cost += record["cost"] or 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self.records)
+        return summarize_usage(records)
+
+
+_current_meter = contextvars.ContextVar("usage_meter", default=None)
+
+
+@contextmanager
+def track_usage(endpoint: Optional[str] = None, max_tokens: Optional[int] = None, max_cost: Optional[float] = None,
+                cancelled: Optional[threading.Event] = None):
+    """
+    Record the LLM calls made inside this block and enforce an optional
+    budget on them.
+
+    Uses a context variable like ``llm_cache.bypass_cache``, so calls made in
+    graph nodes, async tasks and hedge threads are attributed to the request.
+
+    Args:
+        endpoint (str, optional): Label calls are aggregated under in ``usage_stats``.
+            Inner blocks inherit it from the enclosing one.
+        max_tokens (int, optional): Prompt plus completion tokens the block may use.
+        max_cost (float, optional): USD the block may spend; only enforced for
+            models with a known price.
+        cancelled (threading.Event, optional): Once set, further LLM calls in
+            the block raise ``RequestCancelledError`` and streams stop at their next chunk.
+    """
+    meter = UsageMeter(endpoint, max_tokens, max_cost, parent=_current_meter.get(), cancelled=cancelled)
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+
+
+def current_meter() -> Optional[UsageMeter]:
+    """Return the innermost active meter, if any."""
+    return _current_meter.get()
+
+
+class InflightCalls:
+    """Number of LLM calls this process has in flight, so shutdown can wait for them."""
+
+    def __init__(self):
+        self._idle = threading.Condition()
+        self.count = 0
+
+    def enter(self) -> None:
+        with self._idle:
+            self.count += 1
+
+    def exit(self) -> None:
+        with self._idle:
+            self.count -= 1
+            if not self.count:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> int:
+        """Wait until no calls are in flight or ``timeout`` passes; return how many still are."""
+        with self._idle:
+            self._idle.wait_for(lambda: not self.count, timeout)
+            return self.count
+
+
+inflight_calls = InflightCalls()
+
+
+class CallTicket:
+    """Budget reservation and timer for one LLM call; see ``start_call``."""
+
+    def __init__(self, model: str, prompt_tokens: int, max_tokens: int, admit: bool = True):
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.meter = _current_meter.get()
+        self.max_tokens = max_tokens
+        self._reserved = (0, 0.0)
+        if admit:
+            self.check_cancelled()
+        if admit and self.meter is not None:
+            try:
+                self.max_tokens = self.meter.admit(model, prompt_tokens, max_tokens)
+            except BudgetExceededError:
+                usage_stats.record_rejection(self.meter.endpoint, model)
+                raise
+            self._reserved = (prompt_tokens + self.max_tokens, _estimated_cost(model, prompt_tokens, self.max_tokens))
+        self._started = time.perf_counter()
+        self._done = False
+        # Cache hits are settled immediately; only admitted calls go out over the network
+        self._inflight = admit
+        if admit:
+            inflight_calls.enter()
+
+    def _end(self) -> None:
+        self._done = True
+        if self._inflight:
+            self._inflight = False
+            inflight_calls.exit()
+
+    def finish(self, usage: Optional[Dict[str, Any]], cache_hit: bool = False,
+               completion_text: str = "") -> Dict[str, Any]:
+        """
+        Record the call. Cache hits cost nothing; without a usage block the
+        tokens are estimated from the text (~4 characters per token).
+        """
+        if self._done:
+            return {}
+        self._end()
+        estimated = not usage and not cache_hit
+        if cache_hit:
+            usage = {}
+        elif not usage:
+            usage = {"prompt_tokens": self.prompt_tokens, "completion_tokens": len(completion_text) // 4}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        record = {
+            "model": self.model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": usage.get("total_tokens") or prompt_tokens + completion_tokens,
+            "cost": 0.0 if cache_hit else cost_of(self.model, {**usage, "prompt_tokens": prompt_tokens,
+                                                                "completion_tokens": completion_tokens}),
+            "latency": round(time.perf_counter() - self._started, 4),
+            "cache_hit": cache_hit,
+        }
+        if estimated:
+            record["estimated"] = True
+        self._release()
+        if self.meter is not None:
+            self.meter.add(record)
+        usage_stats.record(self.meter.endpoint if self.meter else None, record)
+        return record
+
+    def check_cancelled(self) -> None:
+        """
+        Raises:
+            RequestCancelledError: If the call's request was cancelled.
+        """
+        if self.meter is not None and self.meter.is_cancelled():
+            raise RequestCancelledError("Request cancelled")
+
+    def _release(self) -> None:
+        if self.meter is not None and self._reserved[0]:
+            self.meter.release(*self._reserved)
+            self._reserved = (0, 0.0)
+
+    def close(self) -> None:
+        """Drop the reservation of a call that failed or was cancelled before finishing."""
+        if not self._done:
+            self._end()
+            self._release()
+
+
+def start_call(model: str, prompt_tokens: int, max_tokens: int) -> CallTicket:
+    """
+    Start accounting for an LLM call. ``ticket.max_tokens`` is the
+    completion limit the request's budget allows; call ``ticket.finish``
+    with the response's usage, or ``ticket.close`` if it failed.
+
+    Raises:
+        BudgetExceededError: If the active budget can't cover the call.
+    """
+    return CallTicket(model, prompt_tokens, max_tokens)
+
+
+def record_cache_hit(model: str) -> Dict[str, Any]:
+    """Record a call answered from the response cache; it needs no budget."""
+    return CallTicket(model, 0, 0, admit=False).finish(None, cache_hit=True)
+
+
+def summarize_usage(records: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Total a list of call records, overall and per model, for API responses."""
+    def empty():
+        return {"calls": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "total_tokens": 0, "cost": 0.0, "latency": 0.0}
+
+    total, models = empty(), {}
+    for record in records or []:
+        for bucket in (total, models.setdefault(record["model"], empty())):
+            bucket["calls"] += 1
+            bucket["cache_hits"] += int(record["cache_hit"])
+            for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                bucket[field] += record[field]
+            bucket["cost"] += record["cost"] or 0.0
+            bucket["latency"] += record["latency"]
+    for bucket in (total, *models.values()):
+        bucket["cost"] = round(bucket["cost"], 6)
+        bucket["latency"] = round(bucket["latency"], 4)
+    return {**total, "models": models}
+
+
+class UsageStats:
+    """Process-wide usage totals per (endpoint, model), for capacity planning."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def _bucket(self, endpoint: Optional[str], model: str) -> Dict[str, Any]:
+        key = (endpoint or "direct", model)
+        bucket = self._totals.get(key)
+        if bucket is None:
+            bucket = self._totals[key] = {
+                "calls": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cost": 0.0, "unpriced_calls": 0, "latency_sum": 0.0, "budget_rejections": 0,
+            }
+        return bucket
+
+    def record(self, endpoint: Optional[str], record: Dict[str, Any]) -> None:
+        with self._lock:
+            bucket = self._bucket(endpoint, record["model"])
+            bucket["calls"] += 1
+            bucket["cache_hits"] += int(record["cache_hit"])
+            bucket["prompt_tokens"] += record["prompt_tokens"]
+            bucket["completion_tokens"] += record["completion_tokens"]
+            if record["cost"] is None:
+                bucket["unpriced_calls"] += 1
+            else:
+                bucket["cost"] += record["cost"]
+            bucket["latency_sum"] += record["latency"]
+
+    def record_rejection(self, endpoint: Optional[str], model: str) -> None:
+        with self._lock:
+            self._bucket(endpoint, model)["budget_rejections"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Return totals as ``{endpoint: {model: counters}}`` with mean prompt/completion sizes."""
+        with self._lock:
+            items = [(key, dict(bucket)) for key, bucket in self._totals.items()]
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (endpoint, model), bucket in sorted(items):
+            billed = bucket["calls"] - bucket["cache_hits"]
+            bucket["cost"] = round(bucket["cost"], 6)
+            bucket["mean_latency"] = round(bucket.pop("latency_sum") / bucket["calls"], 4) if bucket["calls"] else None
+            bucket["mean_prompt_tokens"] = round(bucket["prompt_tokens"] / billed, 1) if billed else None
+            bucket["mean_completion_tokens"] = round(bucket["completion_tokens"] / billed, 1) if billed else None
+            result.setdefault(endpoint, {})[model] = bucket
+        return result
+
+
+usage_stats = UsageStats()
+
+
+def metered(node: Callable) -> Callable:
+    """
+    Wrap a graph node so the LLM calls it makes are appended to the state's
+    ``llm_usage`` list. Works for sync and async nodes.
+    """
+    def with_usage(state: Dict[str, Any], update: Dict[str, Any], meter: UsageMeter) -> Dict[str, Any]:
+        if meter.records:
+            update = {**update, "llm_usage": list(state.get("llm_usage") or []) + meter.records}
+        return update
+
+    if inspect.iscoroutinefunction(node):
+        async def ametered_node(state):
+            with track_usage() as meter:
+                update = await node(state)
+            return with_usage(state, update, meter)
+        return ametered_node
+
+    def metered_node(state):
+        with track_usage() as meter:
+            update = node(state)
+        return with_usage(state, update, meter)
+    return metered_node